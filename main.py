@@ -1,11 +1,29 @@
 import argparse
 import logging
 import sys
+import time
+import datetime
+from src.core.config import GlobalConfig
 from src.core.logger import configure_logging
 from src.services.daily_flow import DailyFlow
+from src.services.analytics import ScoreAnalytics, load_thresholds
+from src.services.inbox_index import InboxIndex
+from src.services.citation_graph import CitationGraph
+from src.services.worker import QueueWorker
+from src.services.digest import DigestBuilder
+from src.core.models import load_papers
+from src.core.profiler import diff_profiles, find_profiles
 
 # 1. 配置日志 (必须是第一步)
-configure_logging(level=logging.INFO)
+_log_conf = GlobalConfig.get('system.logging', {}) or {}
+configure_logging(
+    level=getattr(logging, str(GlobalConfig.get('system.log_level', 'INFO')).upper(), logging.INFO),
+    rotate=_log_conf.get('rotate', 'size'),
+    max_bytes=int(_log_conf.get('max_mb', 10)) * 1024 * 1024,
+    backup_count=int(_log_conf.get('backup_count', 5)),
+    when=_log_conf.get('when', 'midnight'),
+    json_logs=bool(_log_conf.get('json', True))
+)
 logger = logging.getLogger("main")
 
 def main():
@@ -17,13 +35,67 @@ def main():
     daily_parser.add_argument("--days", type=int, default=1, help="Fetch papers from last N days")
     daily_parser.add_argument("--force-email", action="store_true", help="Send email even if no high scores")
     daily_parser.add_argument("--limit", type=int, default=None, help="Limit number of papers (for testing)")
+    daily_parser.add_argument("--offline", action="store_true", help="Replay cached Arxiv responses only (no network)")
+    daily_parser.add_argument("--distributed", action="store_true", help="Enqueue scoring/download jobs for workers")
+    daily_parser.add_argument("--profile", action="store_true", help="Per-stage cProfile/tracemalloc/RSS artifacts")
+
+    # Command: profile-diff
+    pdiff_parser = subparsers.add_parser("profile-diff", help="Compare two `daily/harvest --profile` runs")
+    pdiff_parser.add_argument("run_a", help="Baseline: run_id, date (YYYY-MM-DD, if only one run) or profile directory")
+    pdiff_parser.add_argument("run_b", help="Candidate: run_id, date (YYYY-MM-DD, if only one run) or profile directory")
+    pdiff_parser.add_argument("--top", type=int, default=15, help="Functions to show per stage")
+
+    # Command: harvest
+    harvest_parser = subparsers.add_parser("harvest", help="Bulk backfill via OAI-PMH, then score like daily")
+    harvest_parser.add_argument("--from", dest="date_from", default=None, help="Start date (YYYY-MM-DD)")
+    harvest_parser.add_argument("--until", dest="date_until", default=None, help="End date (YYYY-MM-DD, default today)")
+    harvest_parser.add_argument("--incremental", action="store_true", help="Continue from last harvested date")
+    harvest_parser.add_argument("--no-score", action="store_true", help="Only harvest metadata to disk")
+    harvest_parser.add_argument("--force-email", action="store_true", help="Send email report for the backfill")
+    harvest_parser.add_argument("--limit", type=int, default=None, help="Limit number of papers (for testing)")
+    harvest_parser.add_argument("--distributed", action="store_true", help="Enqueue scoring/download jobs for workers")
+    harvest_parser.add_argument("--profile", action="store_true", help="Per-stage cProfile/tracemalloc/RSS artifacts")
+
+    # Command: worker
+    worker_parser = subparsers.add_parser("worker", help="Process queued scoring/download jobs (any number of hosts)")
+    worker_parser.add_argument("--kinds", default=None, help="Comma-separated job kinds (default: all)")
+    worker_parser.add_argument("--idle-exit", type=float, default=None, help="Exit after N idle seconds")
+    worker_parser.add_argument("--max-jobs", type=int, default=None, help="Exit after processing N jobs")
+
+    # Command: analyze
+    analyze_parser = subparsers.add_parser("analyze", help="Score distributions, drift and threshold calibration")
+    analyze_parser.add_argument("--days", type=int, default=30, help="Analyze the last N daily reports")
+    analyze_parser.add_argument("--recent", type=int, default=7, help="Recent window (days) for drift detection")
+    analyze_parser.add_argument("--target-downloads", type=float, default=5, help="Desired PDF downloads per day")
+    analyze_parser.add_argument("--target-email", type=float, default=15, help="Desired email items per day")
+    analyze_parser.add_argument("--apply", action="store_true", help="Write suggested thresholds for DailyFlow")
+
+    # Command: digest
+    digest_parser = subparsers.add_parser("digest", help="Weekly/monthly rollup from stored daily reports")
+    digest_parser.add_argument("--period", choices=["week", "month"], default="week", help="Rollup period")
+    digest_parser.add_argument("--date", default=None, help="Any day inside the period (YYYY-MM-DD, default today)")
+    digest_parser.add_argument("--top", type=int, default=None, help="Papers to show (default digest.top_k)")
+    digest_parser.add_argument("--rebuild", action="store_true", help="Ignore saved state and refold every day")
+    digest_parser.add_argument("--send", action="store_true", help="Email the digest")
+
+    # Command: index / search
+    index_parser = subparsers.add_parser("index", help="Incrementally (re)build the inbox full-text index")
+    index_parser.add_argument("--rebuild", action="store_true", help="Drop and rebuild the whole index")
+    search_parser = subparsers.add_parser("search", help="Full-text search over the PDF inbox")
+    search_parser.add_argument("query", help="FTS5 query, e.g. 'route leak' or 'RPKI AND ASPA'")
+    search_parser.add_argument("--limit", type=int, default=10, help="Max number of papers to show")
+
+    # Command: citations
+    cites_parser = subparsers.add_parser("citations", help="Which hits of a day cite papers you rated highly")
+    cites_parser.add_argument("--day", default=None, help="Daily report date (YYYY-MM-DD, default today)")
+    cites_parser.add_argument("--min-score", type=float, default=5.0, help="Score of the cited papers")
 
     args = parser.parse_args()
 
     if args.command == "daily":
         logger.info("🚀 Starting Daily Flow...")
         try:
-            flow = DailyFlow()
+            flow = DailyFlow(offline=args.offline, distributed=args.distributed or None, profile=args.profile)
             flow.run(days_back=args.days, force_email=args.force_email, max_limit=args.limit)
             logger.info("🎉 Daily Flow Completed Successfully.")
         except KeyboardInterrupt:
@@ -31,6 +103,90 @@ def main():
         except Exception as e:
             logger.critical(f"🔥 System Crash: {e}", exc_info=True)
             sys.exit(1)
+    elif args.command == "profile-diff":
+        dirs = []
+        for run in (args.run_a, args.run_b):
+            found = find_profiles(GlobalConfig.data_path / "reports" / "daily_meta", run)
+            if not found:
+                parser.error(f"No profile found for {run}")
+            if len(found) > 1:
+                parser.error(f"{run} matches {len(found)} runs, pass a run_id or directory: "
+                             + ", ".join(d.name for d in found))
+            dirs.append(found[0])
+        print(diff_profiles(dirs[0], dirs[1], top_n=args.top))
+    elif args.command == "harvest":
+        if not args.incremental and not args.date_from:
+            parser.error("harvest requires --from or --incremental")
+        logger.info("🚀 Starting Backfill...")
+        try:
+            flow = DailyFlow(distributed=args.distributed or None, profile=args.profile)
+            flow.run_backfill(
+                date_from=args.date_from,
+                date_until=args.date_until or time.strftime("%Y-%m-%d"),
+                incremental=args.incremental,
+                score=not args.no_score,
+                force_email=args.force_email,
+                max_limit=args.limit
+            )
+            logger.info("🎉 Backfill Completed Successfully.")
+        except KeyboardInterrupt:
+            logger.warning("⚠️ User interrupted process.")
+        except Exception as e:
+            logger.critical(f"🔥 System Crash: {e}", exc_info=True)
+            sys.exit(1)
+    elif args.command == "worker":
+        try:
+            flow = DailyFlow()
+            # 独立 worker 不建索引，内存下载的 PDF 不必再解析 (没人来取 handoff)
+            flow.pdf.parse_in_memory = False
+            QueueWorker(flow).run(
+                kinds=args.kinds.split(",") if args.kinds else None,
+                idle_exit=args.idle_exit,
+                max_jobs=args.max_jobs
+            )
+        except KeyboardInterrupt:
+            logger.warning("⚠️ Worker interrupted (leased job will become visible again after its lease expires).")
+    elif args.command == "analyze":
+        ScoreAnalytics().run(
+            days=args.days,
+            recent_days=args.recent,
+            target_downloads=args.target_downloads,
+            target_email=args.target_email,
+            apply=args.apply
+        )
+    elif args.command == "digest":
+        day = datetime.date.fromisoformat(args.date) if args.date else None
+        DigestBuilder().run(args.period, day=day, rebuild=args.rebuild, send=args.send, top_k=args.top)
+    elif args.command == "index":
+        InboxIndex().update(rebuild=args.rebuild)
+    elif args.command == "search":
+        hl = ("\033[1;31m", "\033[0m") if sys.stdout.isatty() else ("**", "**")
+        results = InboxIndex().search(args.query, limit=args.limit, highlight=hl)
+        if not results:
+            print("No matches.")
+        for i, r in enumerate(results, 1):
+            print(f"{i:>2}. [{r['arxiv_id'] or '-'}] {r['title']}  (p.{r['page']}, score {r['score']})")
+            print(f"    {r['snippet']}")
+            print(f"    {r['path']}")
+    elif args.command == "citations":
+        day = args.day or time.strftime("%Y-%m-%d")
+        report = GlobalConfig.data_path / "reports" / "daily_meta" / f"{day}_daily.json"
+        if not report.exists():
+            print(f"No daily report for {day}.")
+            return
+        # 与 daily 下载同一个阈值 (analyze --apply 校准过的优先)
+        download_threshold = load_thresholds()["download_threshold"]
+        hits = [p for p in load_papers(report) if p.score >= download_threshold]
+        graph = CitationGraph()
+        graph.update()
+        cited = graph.cited_high_scores([p.arxiv_id for p in hits], min_score=args.min_score)
+        for p in hits:
+            if p.arxiv_id in cited:
+                print(f"[{p.score:.1f}] {p.title} ({p.arxiv_id})")
+                for c in cited[p.arxiv_id]:
+                    print(f"    -> [{c['score']:.1f}] {c['title']} ({c['arxiv_id']}, {c['day']})")
+        if not cited:
+            print(f"None of the {len(hits)} hits on {day} cite papers rated >= {args.min_score}.")
     else:
         parser.print_help()
 
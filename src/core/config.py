@@ -33,6 +33,12 @@ class Config:
             print("⚠️ Warning: DEEPSEEK_API_KEY not set in .env")
         
         self._config_data['llm']['api_key'] = api_key
+
+        # 多端点：每个端点的 Key 从各自的环境变量读取 (默认 DEEPSEEK_API_KEY)
+        # 级联打分的快速模型也可以单独配置端点 (llm.cascade.endpoints)
+        cascade_endpoints = (self._config_data['llm'].get('cascade') or {}).get('endpoints') or []
+        for endpoint in (self._config_data['llm'].get('endpoints') or []) + cascade_endpoints:
+            endpoint['api_key'] = os.getenv(endpoint.get('api_key_env', 'DEEPSEEK_API_KEY'))
         
         # --- 2. 邮箱配置 ---
         if 'email' not in self._config_data:
@@ -1,5 +1,19 @@
+# 这些 HTTP 状态码代表"过一会儿再试可能会好"，其余 4xx 重试也不会成功
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def _status_retryable(status_code: int = None) -> bool:
+    """没有状态码 (网络层错误) 或状态码属于临时性错误时可重试"""
+    return status_code is None or status_code in RETRYABLE_STATUS_CODES
+
+
 class ScholarCoreError(Exception):
     """ScholarCore 的基类异常"""
+    # 是否值得重试 (由 src/core/resilience.py 的重试策略读取)。默认不重试：程序错误、配置错误重试没有意义。
+    retryable = False
+    # 服务端要求的等待秒数 (Retry-After)，没有则为 None
+    retry_after = None
+
     def __init__(self, message: str, code: str = "SCHOLARCORE_ERROR", details: dict = None):
         """
         初始化 ScholarCore 异常
@@ -53,7 +67,8 @@ class DriverError(ScholarCoreError):
 
 class LLMError(DriverError):
     """LLM API 调用失败 (网络、401、500等)"""
-    def __init__(self, message: str, api_provider: str = None, status_code: int = None, details: dict = None):
+    def __init__(self, message: str, api_provider: str = None, status_code: int = None, details: dict = None,
+                 retry_after: float = None, retryable: bool = None):
         """
         初始化 LLM 错误
         
@@ -62,6 +77,8 @@ class LLMError(DriverError):
             api_provider: API 提供商（可选）
             status_code: HTTP 状态码（可选）
             details: 详细信息（可选）
+            retry_after: 服务端要求的等待秒数（可选）
+            retryable: 是否可重试（可选，默认按状态码判断）
         """
         code = "LLM_ERROR"
         if api_provider:
@@ -71,6 +88,8 @@ class LLMError(DriverError):
         super().__init__(message, "llm", details)
         self.api_provider = api_provider
         self.status_code = status_code
+        self.retry_after = retry_after
+        self.retryable = _status_retryable(status_code) if retryable is None else retryable
 
 
 class LLMParseError(LLMError):
@@ -85,13 +104,14 @@ class LLMParseError(LLMError):
             details: 详细信息（可选）
         """
         code = "LLM_PARSE_ERROR"
-        super().__init__(message, None, None, details)
+        super().__init__(message, None, None, details, retryable=False)
         self.raw_response = raw_response
 
 
 class FetchError(DriverError):
     """抓取失败 (Arxiv/PDF 下载失败)"""
-    def __init__(self, message: str, resource_url: str = None, status_code: int = None, details: dict = None):
+    def __init__(self, message: str, resource_url: str = None, status_code: int = None, details: dict = None,
+                 retry_after: float = None, retryable: bool = None):
         """
         初始化抓取错误
         
@@ -100,6 +120,8 @@ class FetchError(DriverError):
             resource_url: 资源 URL（可选）
             status_code: HTTP 状态码（可选）
             details: 详细信息（可选）
+            retry_after: 服务端要求的等待秒数（可选）
+            retryable: 是否可重试（可选，默认按状态码判断）
         """
         code = "FETCH_ERROR"
         if resource_url:
@@ -109,6 +131,28 @@ class FetchError(DriverError):
         super().__init__(message, "fetch", details)
         self.resource_url = resource_url
         self.status_code = status_code
+        self.retry_after = retry_after
+        self.retryable = _status_retryable(status_code) if retryable is None else retryable
+
+
+class CircuitOpenError(DriverError):
+    """熔断器处于打开状态，请求被直接拒绝 (不重试，快速失败)"""
+    def __init__(self, message: str, breaker_name: str = None, retry_after: float = None, details: dict = None):
+        """
+        初始化熔断错误
+        
+        Args:
+            message: 错误信息
+            breaker_name: 熔断器名称（可选）
+            retry_after: 距离熔断器允许试探还有多少秒（可选）
+            details: 详细信息（可选）
+        """
+        code = "CIRCUIT_OPEN"
+        if breaker_name:
+            message = f"{message} (熔断器: {breaker_name})"
+        super().__init__(message, "circuit_breaker", details)
+        self.breaker_name = breaker_name
+        self.retry_after = retry_after
 
 
 class ProcessingError(ScholarCoreError):
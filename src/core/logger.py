@@ -1,20 +1,122 @@
 # src/core/logger.py
-import logging
 import sys
+import json
+import uuid
+import queue
+import atexit
+import logging
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
 from pathlib import Path
 
 # 单例标记，防止多次配置导致日志重复打印
 _LOGGING_CONFIGURED = False
+_LISTENER = None
+
+# 结构化字段：run_id 是进程级的；stage / batch 用 contextvars，线程和协程各自独立
+_RUN_ID = uuid.uuid4().hex[:8]
+_STAGE = contextvars.ContextVar("log_stage", default=None)
+_BATCH = contextvars.ContextVar("log_batch", default=None)
+
+# LogRecord 自带的属性，JSON 输出时不当作 extra 字段
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def get_run_id() -> str:
+    return _RUN_ID
+
+
+def set_run_id(run_id: str):
+    global _RUN_ID
+    _RUN_ID = run_id
+
 
-def configure_logging(level=logging.INFO):
+@contextmanager
+def log_context(stage: str = None, batch=None):
+    """
+    在 with 块内给所有日志打上 stage / batch 标签。
+    with log_context(stage="score", batch=3): ...
+    """
+    tokens = []
+    if stage is not None:
+        tokens.append((_STAGE, _STAGE.set(stage)))
+    if batch is not None:
+        tokens.append((_BATCH, _BATCH.set(batch)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """在发日志的线程里 (入队之前) 把上下文字段写进 record"""
+    def filter(self, record):
+        record.run_id = _RUN_ID
+        record.stage = _STAGE.get()
+        record.batch = _BATCH.get()
+        return True
+
+
+class _PreformattedQueueHandler(QueueHandler):
+    """
+    只在调用线程里做最便宜的事：合并 msg % args、序列化异常栈，然后入队。
+    与默认 QueueHandler 不同，这里不把异常栈拼进 msg，JSON sink 能单独输出它。
+    """
+    def prepare(self, record):
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """一行一个 JSON 对象，方便 jq / pandas 做延迟分析"""
+    def format(self, record):
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "run_id": getattr(record, "run_id", None),
+            "stage": getattr(record, "stage", None),
+            "batch": getattr(record, "batch", None),
+            "thread": record.threadName,
+        }
+        # logger.info("...", extra={"duration": 1.2}) 里的自定义字段原样输出
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and key not in payload:
+                payload[key] = value
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def _file_handler(path: Path, rotate: str, max_bytes: int, backup_count: int, when: str):
+    if rotate == "time":
+        return TimedRotatingFileHandler(path, when=when, backupCount=backup_count, encoding='utf-8')
+    return RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+
+
+def configure_logging(level=logging.INFO, log_dir: str = "logs", rotate: str = "size",
+                      max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5, when: str = "midnight",
+                      json_logs: bool = True):
     """
     全局日志配置。只在 main.py 启动时调用一次。
     配置 Root Logger，这样所有模块都能自动使用。
+
+    业务线程只负责把 record 放进队列 (QueueHandler)，
+    格式化和磁盘 / 控制台 I/O 全部由后台 QueueListener 线程完成，
+    并发打分时不会在 handler 锁上排队。
     """
-    global _LOGGING_CONFIGURED
+    global _LOGGING_CONFIGURED, _LISTENER
     if _LOGGING_CONFIGURED:
         return
-    
+
     # 获取 Root Logger (不带参数就是 Root)
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.DEBUG) # 捕获所有，由 Handler 决定显示什么
@@ -29,23 +131,47 @@ def configure_logging(level=logging.INFO):
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(level)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
 
-    # 2. 文件 (File): 记录 DEBUG，用于尸检
-    log_dir = Path("logs")
+    # 2. 文件 (File): 记录 DEBUG，用于尸检；按大小或按时间轮转
+    log_dir = Path(log_dir)
     log_dir.mkdir(exist_ok=True)
-    file_handler = logging.FileHandler(log_dir / "scholar_core.log", encoding='utf-8')
+    file_handler = _file_handler(log_dir / "scholar_core.log", rotate, max_bytes, backup_count, when)
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
-    
+
+    handlers = [console_handler, file_handler]
+
+    # 3. 结构化 JSON Lines (可选): 带 run_id / stage / batch
+    if json_logs:
+        json_handler = _file_handler(log_dir / "scholar_core.jsonl", rotate, max_bytes, backup_count, when)
+        json_handler.setLevel(logging.DEBUG)
+        json_handler.setFormatter(JsonFormatter())
+        handlers.append(json_handler)
+
+    log_queue = queue.Queue(-1)  # 不设上限：宁可多占点内存，也不让业务线程阻塞在日志上
+    queue_handler = _PreformattedQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    root_logger.addHandler(queue_handler)
+
+    _LISTENER = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _LISTENER.start()
+    atexit.register(shutdown_logging)
+
     # 把第三方库的啰嗦日志关掉
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("openai").setLevel(logging.WARNING)
     logging.getLogger("httpx").setLevel(logging.WARNING)
-    
+
     # 🔇 新增：让 arxiv 库闭嘴，除非它报错
-    logging.getLogger("arxiv").setLevel(logging.WARNING) 
+    logging.getLogger("arxiv").setLevel(logging.WARNING)
 
     _LOGGING_CONFIGURED = True
-    # logging.info("📝 Logging system configured successfully.")
\ No newline at end of file
+    # logging.info("📝 Logging system configured successfully.")
+
+
+def shutdown_logging():
+    """把队列里剩余的日志刷完再退出 (atexit 自动调用，也可手动调用)"""
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
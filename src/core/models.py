@@ -0,0 +1,123 @@
+# src/core/models.py
+import sys
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from src.core.exceptions import FileReadError, FileWriteError, ValidationError
+from src.utils.text_utils import arxiv_id_from_url
+
+
+class Paper:
+    """
+    论文记录。贯穿 抓取 -> 打分 -> 下载 -> 报告 全流程。
+
+    用 __slots__ 而不是 dict：
+    - 每条记录省掉一个 __dict__，月级回填 (5 万+ 条) 内存明显下降；
+    - 拼错字段名 (p.socre = 5) 直接 AttributeError，而不是悄悄多出一个 key；
+    - 分类字符串 intern 后，几万篇论文共享同一批 'cs.CR' 对象。
+    Jinja 模板按属性访问 (p.score / p.local_path)，与原 dict 写法兼容。
+    """
+    __slots__ = (
+        "title", "authors", "summary", "published_date", "arxiv_url", "pdf_url",
+        "categories", "journal_ref",
+        # 打分 / 下载阶段回填的字段
+        "score", "reason", "summary_zh", "local_path",
+        # 级联打分时第一级 (快速模型) 的分数；没走级联为 None
+        "triage_score",
+        # 近重复簇：指向簇代表 (或历史上的同一篇) 的 arxiv_id；不是重复为 None
+        "duplicate_of",
+    )
+
+    title: str
+    authors: List[str]
+    summary: str
+    published_date: str
+    arxiv_url: str
+    pdf_url: str
+    categories: tuple
+    journal_ref: str
+    score: float
+    reason: Optional[str]
+    summary_zh: Optional[str]
+    local_path: Optional[str]
+    triage_score: Optional[float]
+    duplicate_of: Optional[str]
+
+    def __init__(self, title: str, authors: Iterable[str], summary: str, published_date: str,
+                 arxiv_url: str, pdf_url: str, categories: Iterable[str] = (), journal_ref: str = "N/A",
+                 score: float = 0.0, reason: str = None, summary_zh: str = None, local_path: str = None,
+                 triage_score: float = None, duplicate_of: str = None):
+        self.title = title
+        self.authors = list(authors)
+        self.summary = summary
+        self.published_date = published_date
+        self.arxiv_url = arxiv_url
+        self.pdf_url = pdf_url
+        self.categories = tuple(sys.intern(c) for c in categories)
+        self.journal_ref = journal_ref or "N/A"
+        self.score = float(score or 0.0)
+        self.reason = reason
+        self.summary_zh = summary_zh
+        self.local_path = local_path
+        self.triage_score = triage_score
+        self.duplicate_of = duplicate_of
+
+    @property
+    def arxiv_id(self) -> str:
+        """不带版本号的 Arxiv ID，去重 / 建索引用"""
+        return arxiv_id_from_url(self.arxiv_url)
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {name: getattr(self, name) for name in self.__slots__}
+        d["categories"] = list(self.categories)
+        return d
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Paper":
+        """
+        从存档 / checkpoint 还原。未知字段直接忽略 (兼容旧版本存档)，
+        缺少必填字段则抛 ValidationError。
+        """
+        try:
+            return cls(**{k: v for k, v in data.items() if k in cls.__slots__})
+        except TypeError as e:
+            raise ValidationError(f"Invalid paper record: {e}", field_name="paper",
+                                  invalid_value=data.get("arxiv_url"))
+
+    def __repr__(self) -> str:
+        return f"Paper({self.arxiv_id!r}, score={self.score}, title={self.title[:40]!r})"
+
+
+def group_duplicates(papers: Iterable[Paper]) -> Tuple[List[Paper], Dict[str, List[Paper]]]:
+    """
+    拆成 (卡片列表, {代表 arxiv_id: [成员...]})：近重复成员挂到同一批里的代表下，不占 top_k 名额。
+    代表不在这批里的 (沿用历史分数的) 照常作为卡片。日报邮件和周报 / 月报共用。
+    """
+    papers = list(papers)
+    present = {p.arxiv_id for p in papers}
+    primary, clusters = [], {}
+    for p in papers:
+        if p.duplicate_of and p.duplicate_of in present:
+            clusters.setdefault(p.duplicate_of, []).append(p)
+        else:
+            primary.append(p)
+    return primary, clusters
+
+
+def dump_papers(papers: Iterable[Paper], path: Path, indent: Optional[int] = 2):
+    """把论文列表写成 JSON 数组 (daily_meta / checkpoint 的存储格式)"""
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([p.to_dict() for p in papers], f, ensure_ascii=False, indent=indent)
+    except OSError as e:
+        raise FileWriteError("Failed to write papers", file_path=str(path), error=e)
+
+
+def load_papers(path: Path) -> List[Paper]:
+    """读取 dump_papers 写出的 JSON 数组"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return [Paper.from_dict(d) for d in json.load(f)]
+    except (OSError, ValueError) as e:
+        raise FileReadError("Failed to read papers", file_path=str(path), error=e)
@@ -0,0 +1,209 @@
+# src/core/profiler.py
+import io
+import json
+import sys
+import time
+import shutil
+import pstats
+import logging
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+try:
+    import resource  # 仅 Unix
+except ImportError:
+    resource = None
+
+logger = logging.getLogger("core.profiler")
+
+SUMMARY_FILE = "summary.json"
+
+
+def peak_rss_mb() -> Optional[float]:
+    """进程峰值 RSS (MB)。Linux 的 ru_maxrss 单位是 KB，macOS 是字节"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * resource.getpagesize() / (1024 * 1024), 1)
+    except (OSError, AttributeError, ValueError, IndexError):
+        return None
+
+
+class StageProfiler:
+    """
+    按阶段 (fetch / score / download / report ...) 采集：
+    - cProfile：每个阶段一份 .prof (可用 snakeviz / pstats 打开) 和按累计时间排序的 .txt；
+    - tracemalloc：阶段边界拍快照，记录本阶段新增内存最多的代码位置，以及阶段内 Python 堆峰值；
+    - 墙钟 / CPU 时间、当前与峰值 RSS。
+    cProfile 只统计进入阶段的那个线程；线程池里的工作 (分片抓取、LLM 对冲) 在这里表现为等待时间。
+    enabled=False 时所有方法都是空操作，调用方不需要判断。
+    """
+    def __init__(self, enabled: bool = False, top_n: int = 25, nframes: int = 5):
+        self.enabled = enabled
+        self.top_n = top_n
+        self.nframes = nframes
+        self.stages: List[Dict[str, Any]] = []
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._active = False
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start(nframes)
+
+    @contextmanager
+    def stage(self, name: str):
+        # 嵌套阶段 (或未启用) 不单独采集，算在外层阶段里
+        if not self.enabled or self._active:
+            yield
+            return
+
+        self._active = True
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        wall, cpu = time.perf_counter(), time.process_time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            self._active = False
+
+            # 同名阶段 (如多次 report) 编号区分
+            key = name if name not in self._profiles else f"{name}_{len(self._profiles)}"
+            self._profiles[key] = profile
+            self.stages.append({
+                "stage": key,
+                "wall_s": round(wall, 3),
+                "cpu_s": round(cpu, 3),
+                "py_heap_mb": round(current / 1e6, 2),
+                "py_heap_peak_mb": round(peak / 1e6, 2),
+                "rss_mb": current_rss_mb(),
+                "rss_peak_mb": peak_rss_mb(),
+                "top_allocations": self._top_allocations(before, after),
+            })
+            logger.info(f"⏱️ Stage [{key}] wall={wall:.2f}s cpu={cpu:.2f}s "
+                        f"heap_peak={peak / 1e6:.1f}MB rss_peak={peak_rss_mb()}MB")
+
+    def _top_allocations(self, before, after) -> List[Dict[str, Any]]:
+        """本阶段净增内存最多的代码位置 (过滤掉 tracemalloc / 本模块自身)"""
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+        top = []
+        for stat in diff[:self.top_n]:
+            frame = stat.traceback[0]
+            top.append({
+                "site": f"{frame.filename}:{frame.lineno}",
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "size_kb": round(stat.size / 1024, 1),
+                "count_diff": stat.count_diff,
+            })
+        return top
+
+    def write(self, out_dir: Path, meta: Dict[str, Any] = None) -> Optional[Path]:
+        """写出 summary.json + 每阶段的 .prof / .txt，返回目录。目录先清空，不混入上一次运行的阶段"""
+        if not self.enabled or not self.stages:
+            return None
+        shutil.rmtree(out_dir, ignore_errors=True)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for key, profile in self._profiles.items():
+            profile.dump_stats(str(out_dir / f"{key}.prof"))
+            buf = io.StringIO()
+            pstats.Stats(profile, stream=buf).sort_stats("cumulative").print_stats(self.top_n * 2)
+            (out_dir / f"{key}.txt").write_text(buf.getvalue(), encoding="utf-8")
+
+        summary = {
+            **(meta or {}),
+            "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": sys.version.split()[0],
+            "rss_peak_mb": peak_rss_mb(),
+            "stages": self.stages,
+        }
+        with open(out_dir / SUMMARY_FILE, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        logger.info(f"📊 Profile written to: {out_dir}")
+        return out_dir
+
+
+# ----------------------------------------------------------------------
+# 对比两次运行
+# ----------------------------------------------------------------------
+def profile_dir_name(day: str, run_id: str, kind: str) -> str:
+    """产物目录名：同一天的多次运行按 run_id 区分"""
+    return f"{day}_{run_id}_{kind}_profile"
+
+
+def find_profiles(root: Path, ref: str) -> List[Path]:
+    """按目录路径、run_id 或日期 (YYYY-MM-DD，可能有多次运行) 找产物目录，按时间从旧到新"""
+    path = Path(ref)
+    if path.is_dir():
+        return [path]
+    found = {d for pattern in (f"*_{ref}_*_profile", f"{ref}_*_profile")
+             for d in root.glob(pattern) if (d / SUMMARY_FILE).exists()}
+    return sorted(found, key=lambda d: (d / SUMMARY_FILE).stat().st_mtime)
+
+
+def _function_times(prof_path: Path) -> Dict[str, float]:
+    """函数 -> 累计时间 (秒)"""
+    stats = pstats.Stats(str(prof_path)).stats
+    return {f"{pstats.func_std_string(func)}": ct for func, (_cc, _nc, _tt, ct, _callers) in stats.items()}
+
+
+def _fmt_delta(a, b, unit: str) -> str:
+    if a is None or b is None:
+        return f"{a} -> {b}"
+    pct = f" ({(b - a) / a:+.0%})" if a else ""
+    return f"{a:.2f}{unit} -> {b:.2f}{unit}{pct}"
+
+
+def diff_profiles(dir_a: Path, dir_b: Path, top_n: int = 15) -> str:
+    """两次 --profile 运行的逐阶段对比：时间、内存，以及累计时间变化最大的函数"""
+    with open(dir_a / SUMMARY_FILE, encoding='utf-8') as f:
+        a = json.load(f)
+    with open(dir_b / SUMMARY_FILE, encoding='utf-8') as f:
+        b = json.load(f)
+
+    lines = [f"A: {dir_a} ({a.get('generated_at')})", f"B: {dir_b} ({b.get('generated_at')})",
+             f"Peak RSS: {_fmt_delta(a.get('rss_peak_mb'), b.get('rss_peak_mb'), 'MB')}", ""]
+    stages_a = {s["stage"]: s for s in a["stages"]}
+    stages_b = {s["stage"]: s for s in b["stages"]}
+    for name in list(stages_a) + [n for n in stages_b if n not in stages_a]:
+        sa, sb = stages_a.get(name), stages_b.get(name)
+        if not (sa and sb):
+            lines.append(f"[{name}] only in {'A' if sa else 'B'}")
+            continue
+        lines.append(f"[{name}]")
+        lines.append(f"  wall      {_fmt_delta(sa['wall_s'], sb['wall_s'], 's')}")
+        lines.append(f"  cpu       {_fmt_delta(sa['cpu_s'], sb['cpu_s'], 's')}")
+        lines.append(f"  heap peak {_fmt_delta(sa['py_heap_peak_mb'], sb['py_heap_peak_mb'], 'MB')}")
+
+        prof_a, prof_b = dir_a / f"{name}.prof", dir_b / f"{name}.prof"
+        if prof_a.exists() and prof_b.exists():
+            fa, fb = _function_times(prof_a), _function_times(prof_b)
+            deltas = sorted(((fb.get(k, 0.0) - fa.get(k, 0.0), k) for k in set(fa) | set(fb)),
+                            key=lambda x: -abs(x[0]))[:top_n]
+            lines.append("  biggest cumulative-time changes:")
+            for delta, func in deltas:
+                if abs(delta) < 1e-3:
+                    break
+                lines.append(f"    {delta:+8.3f}s  {func}")
+
+        sites_b = {s["site"]: s for s in sb.get("top_allocations", [])}
+        grown = [(s["size_diff_kb"], site) for site, s in sites_b.items()][:5]
+        if grown:
+            lines.append("  top allocation sites in B:")
+            for kb, site in grown:
+                lines.append(f"    {kb:+10.1f} KB  {site}")
+        lines.append("")
+    return "\n".join(lines)
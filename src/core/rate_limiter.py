@@ -0,0 +1,51 @@
+# src/core/rate_limiter.py
+import time
+import threading
+import logging
+
+import requests
+
+logger = logging.getLogger("core.rate_limiter")
+
+
+class RateLimiter:
+    """
+    进程内共享的最小间隔限速器 (线程安全)。
+    多个并发 worker 共用一个实例时，保证任意两次放行之间至少间隔 min_interval 秒。
+    Arxiv API 的使用条款要求每 3 秒最多一个请求，这里就是用来守住这条线的。
+    """
+    def __init__(self, min_interval: float = 3.0):
+        self.min_interval = max(0.0, float(min_interval))
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> float:
+        """
+        阻塞直到轮到自己。返回实际等待的秒数。
+        先在锁内"预约"时间槽，再在锁外睡眠，避免一个线程睡觉时堵住其他线程排队。
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+
+        wait = slot - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        return max(wait, 0.0)
+
+
+class RateLimitedSession(requests.Session):
+    """
+    每个真实发出的 HTTP 请求都先向共享 RateLimiter 排队的 Session。
+    用来替换第三方客户端 (如 arxiv.Client) 内部的 session，实现跨客户端的全局限速。
+    """
+    def __init__(self, limiter: RateLimiter = None):
+        super().__init__()
+        self.limiter = limiter
+
+    def request(self, method, url, *args, **kwargs):
+        waited = self.limiter.acquire() if self.limiter else 0.0
+        if waited > 0:
+            logger.debug(f"⏳ Rate limited: waited {waited:.2f}s before {method} {url[:80]}")
+        return super().request(method, url, *args, **kwargs)
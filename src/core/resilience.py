@@ -0,0 +1,224 @@
+# src/core/resilience.py
+import time
+import logging
+import threading
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+import requests
+from tenacity import Retrying, stop_after_attempt, wait_exponential, retry_if_exception
+
+from src.core.config import GlobalConfig
+from src.core.exceptions import ScholarCoreError, CircuitOpenError
+
+logger = logging.getLogger("core.resilience")
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    判断一个异常值不值得重试。
+    - ScholarCoreError 看自身的 retryable 标记 (由状态码决定：429/5xx/网络错误可重试，其余 4xx 不可)；
+    - requests 的连接 / 超时错误可重试；
+    - 其它一律不重试 (TypeError / KeyError 之类是程序错误，重试只会浪费时间)。
+    """
+    if isinstance(exc, ScholarCoreError):
+        return bool(exc.retryable)
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+def retry_after_of(exc: Optional[BaseException]) -> Optional[float]:
+    value = getattr(exc, "retry_after", None)
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """解析 Retry-After 头 (只支持秒数形式；HTTP 日期形式极少见，忽略)"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    三态熔断器 (closed -> open -> half_open -> closed)。
+    - 连续 failure_threshold 次可重试类失败后打开，recovery_timeout 秒内直接拒绝 (CircuitOpenError)；
+    - 服务端给了 Retry-After 时，至少打开那么久；
+    - 冷却结束后放行一个试探请求：成功则关闭，失败则再次打开，冷却时间翻倍 (不超过 max_recovery)。
+    不可重试的错误 (400 之类) 说明是请求本身有问题，不计入依赖的健康度。
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 max_recovery: float = 300.0):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.recovery_timeout = float(recovery_timeout)
+        self.max_recovery = float(max_recovery)
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_until = 0.0
+        self._probing = False
+        # 仅因 Retry-After 而暂停 (还没到失败阈值)：到期后直接恢复 closed，不走试探
+        self._throttled = False
+
+    def remaining(self) -> float:
+        """距离允许试探还有多少秒 (关闭状态为 0)"""
+        return max(0.0, self.opened_until - time.monotonic()) if self.state == self.OPEN else 0.0
+
+    @property
+    def available(self) -> bool:
+        """只读地判断现在能否放行 (不占用试探名额)，供选路使用"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() >= self.opened_until
+            return not (self.state == self.HALF_OPEN and self._probing)
+
+    def before_call(self):
+        """发请求前调用；熔断中抛 CircuitOpenError"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() < self.opened_until:
+                    raise CircuitOpenError("Dependency unavailable", breaker_name=self.name,
+                                           retry_after=self.opened_until - time.monotonic())
+                self.state = self.CLOSED if self._throttled else self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError("Dependency is being probed", breaker_name=self.name,
+                                           retry_after=1.0)
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"🟢 Circuit [{self.name}] closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trips = 0
+            self._probing = False
+            self._throttled = False
+
+    def record_failure(self, exc: BaseException = None):
+        if exc is not None and not is_retryable(exc):
+            with self._lock:
+                self._probing = False
+            return
+        retry_after = retry_after_of(exc)
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            tripping = self.state == self.HALF_OPEN or self.failures >= self.failure_threshold
+            if tripping or retry_after:
+                cooldown = min(self.max_recovery, self.recovery_timeout * 2 ** self.trips) if tripping else 0.0
+                if retry_after:
+                    cooldown = max(cooldown, retry_after)
+                if tripping:
+                    self.trips += 1
+                self._throttled = not tripping
+                self.state = self.OPEN
+                self.opened_until = max(self.opened_until, time.monotonic() + cooldown)
+                logger.warning(f"🔴 Circuit [{self.name}] open for {cooldown:.1f}s "
+                               f"({self.failures} failures, last: {exc})",
+                               extra={"breaker": self.name, "cooldown_s": round(cooldown, 1)})
+
+    def call(self, func: Callable, *args, **kwargs):
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    按依赖名取进程内共享的熔断器 (同名即同一个实例，跨 Driver / 线程共享)。
+    参数来自 resilience.breakers.<name>，缺省用 resilience.breakers.default。
+    名字里带冒号的 (如 llm:deepseek) 会依次回退到前缀 (llm) 的配置。
+    """
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(name)
+        if breaker is None:
+            cfg = dict(GlobalConfig.get('resilience.breakers.default') or {})
+            cfg.update(GlobalConfig.get(f"resilience.breakers.{name.split(':')[0]}") or {})
+            if ':' in name:
+                cfg.update(GlobalConfig.get(f"resilience.breakers.{name.replace(':', '_')}") or {})
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=cfg.get('failure_threshold', 5),
+                recovery_timeout=cfg.get('recovery_timeout', 30.0),
+                max_recovery=cfg.get('max_recovery', 300.0),
+            )
+            _BREAKERS[name] = breaker
+        return breaker
+
+
+def breaker_states() -> Dict[str, str]:
+    with _BREAKERS_LOCK:
+        return {name: b.state for name, b in _BREAKERS.items()}
+
+
+class _wait_retry_after:
+    """指数退避，但不少于服务端要求的 Retry-After"""
+    def __init__(self, min_wait: float, max_wait: float):
+        self._exp = wait_exponential(multiplier=1, min=min_wait, max=max_wait)
+
+    def __call__(self, retry_state) -> float:
+        delay = self._exp(retry_state)
+        outcome = retry_state.outcome
+        exc = outcome.exception() if outcome is not None and outcome.failed else None
+        retry_after = retry_after_of(exc)
+        return max(delay, retry_after) if retry_after else delay
+
+
+def _retry_logger(name: str):
+    def log(retry_state):
+        exc = retry_state.outcome.exception()
+        logger.warning(f"🔁 Retry {retry_state.attempt_number} for {name}: {exc}")
+    return log
+
+
+def resilient(breaker: Optional[str] = None, attempts: int = 3, min_wait: float = 2.0, max_wait: float = 10.0):
+    """
+    装饰器：按错误类型决定是否重试 + (可选) 经过指定依赖的熔断器。
+    - 只有 is_retryable() 的异常才会重试；400 类错误、程序错误、长时间的熔断拒绝都立即抛出；
+    - 等待时间为指数退避与 Retry-After 中的较大者；
+    - 每次尝试都经过熔断器，依赖挂掉后几秒内就快速失败，而不是每个调用方各自退避一轮。
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cb = get_breaker(breaker) if breaker else None
+
+            def should_retry(exc):
+                # 熔断器很快就会放行 (Retry-After 很短 / 正在试探) 时等一等；长时间熔断直接失败
+                if isinstance(exc, CircuitOpenError):
+                    return (exc.retry_after or 0.0) <= max_wait
+                return is_retryable(exc)
+
+            retrying = Retrying(
+                retry=retry_if_exception(should_retry),
+                stop=stop_after_attempt(attempts),
+                wait=_wait_retry_after(min_wait, max_wait),
+                before_sleep=_retry_logger(func.__qualname__),
+                reraise=True,
+            )
+            if cb is None:
+                return retrying(func, *args, **kwargs)
+            return retrying(cb.call, func, *args, **kwargs)
+        return wrapper
+    return decorator
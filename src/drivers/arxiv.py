@@ -1,17 +1,36 @@
 # src/drivers/arxiv.py
 import arxiv
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Any
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from typing import List, Dict, Any, Optional
+
+import requests
 
 from src.core.config import GlobalConfig
 from src.core.exceptions import FetchError
+from src.core.models import Paper
+from src.core.rate_limiter import RateLimiter, RateLimitedSession
+from src.core.resilience import resilient, is_retryable
+from src.drivers.http_cache import CachedSession
 
 logger = logging.getLogger("driver.arxiv")
 
+
+class PoliteClient(arxiv.Client):
+    """
+    arxiv.Client 的薄封装：允许注入自定义 requests.Session。
+    分片模式下多个 Client 并发，各自的 delay_seconds 管不住彼此，
+    所以把限速下沉到共享 RateLimiter 的 Session 里。
+    """
+    def __init__(self, session=None, **kwargs):
+        super().__init__(**kwargs)
+        if session is not None:
+            self._session = session
+
+
 class ArxivDriver:
-    def __init__(self):
+    def __init__(self, offline: bool = False):
         self.config = GlobalConfig
         self.safety_limit = 3000
         self.client_settings = {
@@ -19,62 +38,116 @@ class ArxivDriver:
             "delay_seconds": 3.0,
             "num_retries": 5
         }
+        # 分片抓取配置
+        self.shard_by = self.config.get('arxiv.shard_by', 'subject')
+        self.shard_window_days = max(1, int(self.config.get('arxiv.shard_window_days', 1)))
+        self.max_workers = max(1, int(self.config.get('arxiv.max_workers', 4)))
+        self.min_interval = float(self.config.get('arxiv.min_interval', 3.0))
+        # 最近一次分片抓取的明细 (给上层报告用)
+        self.last_shard_report: List[Dict[str, Any]] = []
+
+        # HTTP 响应缓存 (同一天重跑 / 离线开发)
+        self.cache_enabled = bool(self.config.get('arxiv.cache.enabled', True)) or offline
+        self.cache_dir = self.config.data_path / self.config.get('arxiv.cache.dir', 'http_cache/arxiv')
+        self.cache_ttl = int(self.config.get('arxiv.cache.ttl_seconds', 0))
+        self.offline = offline or bool(self.config.get('arxiv.cache.offline', False))
+        self.cache_stats: Dict[str, int] = {}
 
-    @retry(
-        retry=retry_if_exception_type(Exception), # 捕获所有异常进行重试
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10)
-    )
-    def _fetch_from_client(self, search_obj):
+    @resilient(breaker="arxiv", attempts=3, min_wait=4, max_wait=10)
+    def _fetch_from_client(self, search_obj, client=None):
         """
         受保护的原子操作：连接 Arxiv 并获取生成器。
         注意：Arxiv 是 Lazy Load，这里只是建立了连接意图，真正的网络请求发生在迭代时。
         为了确保 Retry 生效，我们在这里强制转换成 list (虽然这会消耗内存，但对于 daily 任务是安全的)。
+        分片模式下每个分片单独调用本方法，失败只重试自己那一片。
+
+        只有网络错误、429/5xx、空页这类临时性故障才重试 (重试时已抓过的完整页面命中 HTTP 缓存，空页 / 截断页不缓存)；
+        400 类错误、离线缓存未命中、解析代码本身的 bug 立即失败。所有分片共享 "arxiv" 熔断器。
         """
         logger.debug(f"🔌 Connecting to Arxiv API...")
-        client = arxiv.Client(**self.client_settings)
+        if client is None:
+            client = self._make_client(RateLimiter(self.client_settings["delay_seconds"]))
         # 强制消耗生成器，触发网络请求，以便 catch 异常
-        return list(client.results(search_obj))
+        try:
+            return list(client.results(search_obj))
+        except arxiv.HTTPError as e:
+            raise FetchError(f"Arxiv API returned HTTP {e.status}", resource_url=e.url, status_code=e.status) from e
+        except arxiv.UnexpectedEmptyPageError as e:
+            raise FetchError("Arxiv API returned an unexpected empty page", resource_url=e.url,
+                             retryable=True) from e
+        except requests.RequestException as e:
+            raise FetchError(f"Network error: {e}", resource_url="arxiv_api") from e
+
+    def _make_client(self, limiter: RateLimiter) -> PoliteClient:
+        """
+        构造 Client。节流统一交给 session 里的 limiter (delay_seconds=0)，
+        这样缓存命中的页面不会白白等 3 秒。
+        """
+        if self.cache_enabled:
+            session = CachedSession(self.cache_dir, ttl_seconds=self.cache_ttl, offline=self.offline,
+                                    limiter=limiter, stats=self.cache_stats)
+        else:
+            session = RateLimitedSession(limiter)
+        return PoliteClient(
+            session=session,
+            page_size=self.client_settings["page_size"],
+            delay_seconds=0.0,
+            num_retries=self.client_settings["num_retries"],
+        )
+
+    def _log_cache_stats(self):
+        if self.cache_enabled and any(self.cache_stats.values()):
+            mode = " (offline)" if self.offline else ""
+            logger.info(f"📦 HTTP cache{mode}: hit={self.cache_stats.get('hit', 0)}, "
+                        f"revalidated={self.cache_stats.get('revalidated', 0)}, miss={self.cache_stats.get('miss', 0)}")
 
-    def search(self, query: str, days_back: int = 1, limit: int = None) -> List[Dict[str, Any]]:
+    def _build_search(self, query: str, max_results: int):
+        return arxiv.Search(
+            query=query,
+            max_results=max_results,
+            sort_by=arxiv.SortCriterion.SubmittedDate,
+            sort_order=arxiv.SortOrder.Descending
+        )
+
+    def _to_paper_meta(self, result) -> Paper:
+        return Paper(
+            title=result.title.replace("\n", " ").strip(),
+            authors=[a.name for a in result.authors],
+            summary=result.summary.replace("\n", " ").strip(),
+            published_date=result.published.isoformat(),
+            arxiv_url=result.entry_id,
+            pdf_url=result.pdf_url,
+            categories=result.categories,
+            journal_ref=result.journal_ref or "N/A"
+        )
+
+    def _clean_results(self, all_results, cutoff_date: datetime) -> List[Paper]:
+        clean_results = []
+        for result in all_results:
+            # 时间熔断
+            if result.published < cutoff_date:
+                logger.info(f"🛑 Reached cutoff date ({result.published.date()}), stopping.")
+                break
+            clean_results.append(self._to_paper_meta(result))
+        return clean_results
+
+    def search(self, query: str, days_back: int = 1, limit: int = None) -> List[Paper]:
         # logger.info(f"🔍 Searching Arxiv: query='{query}', days_back={days_back}, limit={limit}")
-        
+
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_back)
 
         # 核心逻辑：如果有 limit，就用 limit；否则用 safety_limit
         # 这能防止测试时下载几千篇
         actual_max = limit if limit else self.safety_limit
 
-        search_obj = arxiv.Search(
-            query=query,
-            max_results=actual_max, # <--- 这里生效！
-            sort_by=arxiv.SortCriterion.SubmittedDate,
-            sort_order=arxiv.SortOrder.Descending
-        )
+        search_obj = self._build_search(query, actual_max) # <--- max_results 在这里生效！
 
         try:
             # 调用受保护的方法
             all_results = self._fetch_from_client(search_obj)
-            
-            clean_results = []
-            for result in all_results:
-                # 时间熔断
-                if result.published < cutoff_date:
-                    logger.info(f"🛑 Reached cutoff date ({result.published.date()}), stopping.")
-                    break
-                
-                paper_meta = {
-                    "title": result.title.replace("\n", " ").strip(),
-                    "authors": [a.name for a in result.authors],
-                    "summary": result.summary.replace("\n", " ").strip(),
-                    "published_date": result.published.isoformat(),
-                    "arxiv_url": result.entry_id,
-                    "pdf_url": result.pdf_url,
-                    "categories": result.categories,
-                    "journal_ref": result.journal_ref or "N/A"
-                }
-                clean_results.append(paper_meta)
+            clean_results = self._clean_results(all_results, cutoff_date)
 
+            self._log_cache_stats()
             logger.info(f"✅ Fetched {len(clean_results)} papers from Arxiv.")
             return clean_results
 
@@ -83,5 +156,123 @@ class ArxivDriver:
             raise FetchError(
                 message="Arxiv API unavailable",
                 resource_url="arxiv_api",
-                details={"query": query, "error": str(e)}
-            )
\ No newline at end of file
+                status_code=getattr(e, "status_code", None),
+                details={"query": query, "error": str(e)},
+                retryable=is_retryable(e)
+            ) from e
+
+    # ------------------------------------------------------------------
+    # 分片抓取 (Sharded Fetch)
+    # ------------------------------------------------------------------
+    def _plan_shards(self, subjects: List[str], days_back: int) -> List[Dict[str, str]]:
+        """
+        把一个大查询拆成若干小查询。
+        - subject: 每个学科一个分片
+        - date:    每 shard_window_days 天一个分片 (所有学科 OR 在一起)
+        - both:    学科 x 日期窗口
+        """
+        cat_queries = {s: f"cat:{s}" for s in subjects}
+        all_cats = " OR ".join(cat_queries.values())
+
+        windows: List[Optional[tuple]] = [None]
+        if self.shard_by in ("date", "both"):
+            windows = []
+            # 窗口按 UTC 自然日对齐：同一天内重跑生成的查询 URL 完全一致，才能命中 HTTP 缓存。
+            # 多出来的部分由 cutoff_date 过滤掉。
+            today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+            end = today + timedelta(days=1)
+            start_limit = today - timedelta(days=days_back)
+            while end > start_limit:
+                start = max(start_limit, end - timedelta(days=self.shard_window_days))
+                windows.append((start, end))
+                end = start
+
+        def with_window(q: str, window) -> str:
+            if window is None:
+                return q
+            start, end = window
+            return f"({q}) AND submittedDate:[{start:%Y%m%d%H%M} TO {end:%Y%m%d%H%M}]"
+
+        shards = []
+        if self.shard_by in ("subject", "both"):
+            for s, q in cat_queries.items():
+                for w in windows:
+                    name = s if w is None else f"{s}@{w[1]:%m-%d}"
+                    shards.append({"name": name, "query": with_window(q, w)})
+        else:
+            for w in windows:
+                name = "all" if w is None else f"all@{w[1]:%m-%d}"
+                shards.append({"name": name, "query": with_window(all_cats, w)})
+        return shards
+
+    def _run_shard(self, shard: Dict[str, str], cutoff_date: datetime, max_results: int,
+                   limiter: RateLimiter) -> List[Paper]:
+        # 每个分片独立的 Client + Session，但共享同一个全局限速器
+        client = self._make_client(limiter)
+        search_obj = self._build_search(shard["query"], max_results)
+        all_results = self._fetch_from_client(search_obj, client=client)
+        return self._clean_results(all_results, cutoff_date)
+
+    def search_sharded(self, subjects: List[str], days_back: int = 1, limit: int = None) -> List[Paper]:
+        """
+        并发分片抓取，按 Arxiv ID 去重合并 (跨类论文只保留一份)。
+        单个分片在重试耗尽后失败，只会丢失该分片；全部失败才抛 FetchError。
+        分片明细写入 self.last_shard_report。
+        """
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_back)
+        actual_max = limit if limit else self.safety_limit
+        shards = self._plan_shards(subjects, days_back)
+        limiter = RateLimiter(self.min_interval)
+
+        logger.info(f"🧩 Sharded fetch: {len(shards)} shards (by {self.shard_by}), "
+                    f"{min(self.max_workers, len(shards))} workers, {self.min_interval}s global interval.")
+
+        shard_results: Dict[str, List[Paper]] = {}
+        report: Dict[str, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(shards))) as pool:
+            futures = {
+                pool.submit(self._run_shard, shard, cutoff_date, actual_max, limiter): shard
+                for shard in shards
+            }
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    shard_results[shard["name"]] = future.result()
+                    report[shard["name"]] = {"shard": shard["name"], "fetched": len(shard_results[shard["name"]]),
+                                             "new": 0, "ok": True}
+                except Exception as e:
+                    logger.error(f"❌ Shard [{shard['name']}] failed after retries: {e}")
+                    report[shard["name"]] = {"shard": shard["name"], "fetched": 0, "new": 0,
+                                             "ok": False, "error": str(e)}
+
+        if not shard_results:
+            raise FetchError(
+                message="Arxiv API unavailable (all shards failed)",
+                resource_url="arxiv_api",
+                details={"shards": [s["name"] for s in shards]}
+            )
+
+        # 按计划顺序合并，保证结果可复现
+        merged: Dict[str, Paper] = {}
+        for shard in shards:
+            for paper in shard_results.get(shard["name"], []):
+                key = paper.arxiv_id
+                if key not in merged:
+                    merged[key] = paper
+                    report[shard["name"]]["new"] += 1
+
+        papers = sorted(merged.values(), key=lambda p: p.published_date, reverse=True)
+        if limit:
+            papers = papers[:limit]
+
+        self.last_shard_report = [report[s["name"]] for s in shards]
+        for r in self.last_shard_report:
+            status = "✅" if r["ok"] else "❌"
+            logger.info(f"   {status} [{r['shard']}] fetched={r['fetched']} new={r['new']}")
+        failed = [r["shard"] for r in self.last_shard_report if not r["ok"]]
+        if failed:
+            logger.warning(f"⚠️ {len(failed)} shard(s) failed, results may be incomplete: {failed}")
+        self._log_cache_stats()
+
+        logger.info(f"✅ Fetched {len(papers)} unique papers from {len(shards)} shards.")
+        return papers
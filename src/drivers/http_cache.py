@@ -0,0 +1,182 @@
+# src/drivers/http_cache.py
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from src.core.exceptions import FetchError
+from src.core.rate_limiter import RateLimiter, RateLimitedSession
+
+logger = logging.getLogger("driver.http_cache")
+
+try:
+    from zoneinfo import ZoneInfo
+    _ARXIV_TZ = ZoneInfo("America/New_York")
+except Exception:  # 没装 tzdata 的系统，退化为固定 UTC-5
+    _ARXIV_TZ = timezone(timedelta(hours=-5))
+
+# Arxiv 每周日到周四 20:00 (美东) 发布新论文 (weekday: 周一=0 ... 周日=6)
+ANNOUNCE_HOUR = 20
+ANNOUNCE_WEEKDAYS = {6, 0, 1, 2, 3}
+
+_OPENSEARCH = re.compile(rb"<opensearch:(totalResults|startIndex|itemsPerPage)[^>]*>\s*(\d+)\s*<")
+
+
+def next_announcement(after: datetime) -> datetime:
+    """返回 after 之后的下一个 Arxiv 公告时刻 (UTC)"""
+    local = after.astimezone(_ARXIV_TZ)
+    candidate = local.replace(hour=ANNOUNCE_HOUR, minute=0, second=0, microsecond=0)
+    if candidate <= local:
+        candidate += timedelta(days=1)
+    while candidate.weekday() not in ANNOUNCE_WEEKDAYS:
+        candidate += timedelta(days=1)
+    return candidate.astimezone(timezone.utc)
+
+
+class CachedSession(RateLimitedSession):
+    """
+    带磁盘缓存的 requests.Session (只缓存 GET 200)。
+    - 新鲜期内：直接读盘，不发请求，也不占用限速名额。
+    - 过期后：带 If-None-Match / If-Modified-Since 重新验证，304 则续期复用。
+    - offline=True：只从缓存回放 (无视新鲜度)，未命中直接报错，完全不走网络。
+    新鲜期默认跟随 Arxiv 公告周期 (到下一次公告为止)，ttl_seconds > 0 时改用固定 TTL。
+    """
+    def __init__(self, cache_dir: Path, ttl_seconds: int = 0, offline: bool = False,
+                 limiter: RateLimiter = None, stats: dict = None):
+        super().__init__(limiter)
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.offline = offline
+        # 多个 session 可以共享同一个统计字典
+        self.stats = stats if stats is not None else {}
+        for k in ("hit", "revalidated", "miss"):
+            self.stats.setdefault(k, 0)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.body", self.cache_dir / f"{key}.json"
+
+    def _load(self, url: str):
+        body_path, meta_path = self._paths(url)
+        if not (body_path.exists() and meta_path.exists()):
+            return None, None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            return meta, body_path.read_bytes()
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Corrupted cache entry for {url[:80]}: {e}")
+            return None, None
+
+    def _store(self, url: str, meta: dict, body: Optional[bytes] = None):
+        """写临时文件再原子替换，中途崩溃也不会留下半截缓存"""
+        body_path, meta_path = self._paths(url)
+        try:
+            if body is not None:
+                tmp = body_path.with_suffix(".body.tmp")
+                tmp.write_bytes(body)
+                os.replace(tmp, body_path)
+            tmp = meta_path.with_suffix(".json.tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(tmp, meta_path)
+        except OSError as e:
+            # 缓存是锦上添花，写失败不影响主流程
+            logger.warning(f"⚠️ Failed to write cache entry: {e}")
+
+    def _is_fresh(self, meta: dict) -> bool:
+        fetched_at = datetime.fromtimestamp(meta["fetched_at"], tz=timezone.utc)
+        now = datetime.now(timezone.utc)
+        if self.ttl_seconds and self.ttl_seconds > 0:
+            return now - fetched_at < timedelta(seconds=self.ttl_seconds)
+        return now < next_announcement(fetched_at)
+
+    @staticmethod
+    def _cacheable(body: bytes) -> bool:
+        """
+        Arxiv 偶尔返回空页或截断的 Atom 页 (客户端会用同一个 URL 重试)，这种页面不能缓存，
+        否则重试会一直回放坏页面直到下一次公告。
+        entry 数少于 opensearch 声明的本页条数就不缓存；totalResults 为 0 的真·空结果照常缓存。
+        非 Atom 响应不做检查。
+        """
+        if b"<feed" not in body[:4096]:
+            return True
+        fields = {k.decode(): int(v) for k, v in _OPENSEARCH.findall(body)}
+        entries = body.count(b"<entry")
+        if "totalResults" not in fields:
+            return entries > 0
+        expected = fields["totalResults"] - fields.get("startIndex", 0)
+        if "itemsPerPage" in fields:
+            expected = min(expected, fields["itemsPerPage"])
+        return entries >= max(expected, 0)
+
+    @staticmethod
+    def _build_response(url: str, meta: dict, body: bytes) -> requests.Response:
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = body
+        resp.url = url
+        resp.headers = CaseInsensitiveDict(meta.get("headers", {}))
+        resp.encoding = meta.get("encoding") or "utf-8"
+        resp.from_cache = True
+        return resp
+
+    def request(self, method, url, *args, **kwargs):
+        if method.upper() != "GET":
+            return super().request(method, url, *args, **kwargs)
+
+        meta, body = self._load(url)
+
+        if self.offline:
+            if meta is None:
+                raise FetchError("Offline mode: no cached response", resource_url=url, retryable=False)
+            self.stats["hit"] += 1
+            return self._build_response(url, meta, body)
+
+        if meta is not None and self._is_fresh(meta):
+            self.stats["hit"] += 1
+            logger.debug(f"📦 Cache hit: {url[:80]}")
+            return self._build_response(url, meta, body)
+
+        # 过期或未命中：发条件请求
+        headers = dict(kwargs.pop("headers", None) or {})
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        resp = super().request(method, url, *args, headers=headers, **kwargs)
+
+        if resp.status_code == 304 and meta is not None:
+            self.stats["revalidated"] += 1
+            meta["fetched_at"] = time.time()
+            self._store(url, meta)
+            logger.debug(f"♻️ Cache revalidated (304): {url[:80]}")
+            return self._build_response(url, meta, body)
+
+        self.stats["miss"] += 1
+        if resp.status_code == 200 and not self._cacheable(resp.content):
+            logger.debug(f"🚫 Not caching empty/partial page: {url[:80]}")
+        elif resp.status_code == 200:
+            new_meta = {
+                "url": url,
+                "fetched_at": time.time(),
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "encoding": resp.encoding,
+                "headers": {k: v for k, v in resp.headers.items()
+                            if k.lower() in ("content-type", "etag", "last-modified")},
+            }
+            self._store(url, new_meta, resp.content)
+        resp.from_cache = False
+        return resp
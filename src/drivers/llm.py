@@ -1,72 +1,250 @@
 import time
+import random
 import logging
-from openai import OpenAI, APIError, RateLimitError, APITimeoutError
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Optional, Set
+
+from openai import OpenAI, APIError, APIStatusError
 
 from src.core.config import GlobalConfig
-from src.core.exceptions import LLMError, LLMParseError, ConfigurationError
+from src.core.exceptions import LLMError, LLMParseError, ConfigurationError, CircuitOpenError
+from src.core.resilience import resilient, get_breaker, parse_retry_after
 from src.utils.text_utils import clean_and_parse_json
 
 logger = logging.getLogger("driver.llm")
 
+
+class LLMEndpoint:
+    """
+    一个 OpenAI 兼容端点 (base_url + model + key) 及其健康状态。
+    - 最近 N 次成功延迟，用来估计 p95 (决定何时发对冲请求)；
+    - 健康度交给共享熔断器 llm:<name> (src/core/resilience.py)，熔断期间不参与选路。
+    """
+    def __init__(self, name: str, base_url: str, model: str, api_key: str, weight: float = 1.0,
+                 timeout: float = 60.0, window: int = 50):
+        self.name = name
+        self.model = model
+        self.weight = max(0.0, float(weight))
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.breaker = get_breaker(f"llm:{name}")
+
+    @property
+    def healthy(self) -> bool:
+        return self.breaker.available
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+        self.breaker.record_success()
+
+    def record_failure(self, exc: Exception = None):
+        self.breaker.record_failure(exc)
+
+    def latency_percentile(self, pct: float, min_samples: int = 5) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < min_samples:
+            return None
+        idx = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[idx]
+
+
 class DeepSeekDriver:
-    def __init__(self):
+    def __init__(self, endpoints: List[dict] = None, model: str = None, max_tokens: int = None):
+        """
+        默认读取 llm.endpoints。级联打分的快速模型会传入自己的端点列表，
+        或者只传 model (沿用 llm.endpoints 的 base_url / key，只换模型)。
+        """
         self.config = GlobalConfig
-        api_key = self.config.get('llm.api_key')
-        base_url = self.config.get('llm.base_url')
-        
-        if not api_key:
-            raise ConfigurationError("DeepSeek API Key not found in .env")
-
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
-        self.model = self.config.get('llm.model', 'deepseek-chat')
         # 默认参数
         self.default_temp = self.config.get('llm.temperature', 0.3)
-        self.max_tokens = self.config.get('llm.max_tokens', 8000)
+        self.max_tokens = max_tokens or self.config.get('llm.max_tokens', 8000)
+
+        # 单请求截止时间 & 对冲策略
+        self.request_timeout = float(self.config.get('llm.request_timeout', 90))
+        self.hedge_enabled = bool(self.config.get('llm.hedge.enabled', True))
+        self.hedge_percentile = float(self.config.get('llm.hedge.percentile', 95))
+        self.hedge_min_delay = float(self.config.get('llm.hedge.min_delay', 3.0))
+        self.hedge_default_delay = float(self.config.get('llm.hedge.default_delay', 20.0))
+
+        self.endpoints = self._build_endpoints(endpoints, model)
+        if not self.endpoints:
+            raise ConfigurationError("DeepSeek API Key not found in .env")
+        self.model = self.endpoints[0].model
+
+        # 对冲请求会让同一批次同时占用两个线程
+        self._pool = ThreadPoolExecutor(max_workers=int(self.config.get('llm.max_inflight', 8)),
+                                        thread_name_prefix="llm")
+
+    def _build_endpoints(self, specs: List[dict] = None, model: str = None) -> List[LLMEndpoint]:
+        """
+        llm.endpoints 列表优先；没配置时退化为 llm.base_url / llm.model 单端点 (旧配置兼容)。
+        没有 API Key 的端点直接跳过。指定 model 时覆盖所有端点的模型 (端点名加 @model，熔断器分开统计)。
+        """
+        specs = specs or self.config.get('llm.endpoints') or [{
+            "name": "deepseek",
+            "base_url": self.config.get('llm.base_url'),
+            "model": self.config.get('llm.model', 'deepseek-chat'),
+            "api_key": self.config.get('llm.api_key'),
+        }]
+        endpoints = []
+        for i, spec in enumerate(specs):
+            if not spec.get('api_key'):
+                logger.warning(f"⚠️ LLM endpoint [{spec.get('name', i)}] has no API key, skipped.")
+                continue
+            name = spec.get('name') or f"endpoint{i}"
+            endpoints.append(LLMEndpoint(
+                name=f"{name}@{model}" if model else name,
+                base_url=spec.get('base_url'),
+                model=model or spec.get('model') or self.config.get('llm.model', 'deepseek-chat'),
+                api_key=spec['api_key'],
+                weight=spec.get('weight', 1.0),
+                timeout=self.request_timeout,
+            ))
+        return endpoints
 
     def _log_usage(self, response):
         """记录 Token 消耗，哪怕是粗略的"""
         try:
             usage = response.usage
-            logger.info(f"LLM Usage: In={usage.prompt_tokens}, Out={usage.completion_tokens}, Total={usage.total_tokens}")
+            logger.info(
+                f"LLM Usage: In={usage.prompt_tokens}, Out={usage.completion_tokens}, Total={usage.total_tokens}",
+                extra={"tokens_in": usage.prompt_tokens, "tokens_out": usage.completion_tokens}
+            )
         except AttributeError:
             logger.warning("LLM response missing usage stats.")
 
-    # 使用 Tenacity 库进行重试 (比手写装饰器更稳健)
-    # 重试条件：API错误、限流、超时
-    # 策略：最多试 3 次，指数退避 (2s, 4s, 8s...)
-    @retry(
-        retry=retry_if_exception_type((APIError, RateLimitError, APITimeoutError)),
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        reraise=True
-    )
-    def _call_api(self, messages, json_mode=False):
-        """底层的 API 调用，包裹了重试逻辑"""
+    # ------------------------------------------------------------------
+    # 选路 / 对冲 / 故障转移
+    # ------------------------------------------------------------------
+    def _pick_endpoint(self, exclude: Set[str] = frozenset()) -> Optional[LLMEndpoint]:
+        """按权重随机挑一个健康端点；没有可用的 (都试过或都在熔断) 返回 None"""
+        healthy = [e for e in self.endpoints if e.name not in exclude and e.weight > 0 and e.healthy]
+        if not healthy:
+            return None
+        return random.choices(healthy, weights=[e.weight for e in healthy], k=1)[0]
+
+    def _hedge_delay(self, endpoint: LLMEndpoint) -> float:
+        p = endpoint.latency_percentile(self.hedge_percentile)
+        delay = self.hedge_default_delay if p is None else p
+        return max(self.hedge_min_delay, min(delay, self.request_timeout))
+
+    def _invoke(self, endpoint: LLMEndpoint, messages, json_mode: bool) -> str:
+        """对单个端点发一次请求 (不重试)，顺带更新端点健康状态"""
+        endpoint.breaker.before_call()
+        start_time = time.time()
         try:
-            # ✅ 新增：在请求发出前记录日志 (DEBUG级别，但在调试时很有用)
-            # 如果你觉得太吵，可以把级别改成 DEBUG，但现在为了让你安心，我们用 INFO
-            logger.info(f"🤖 Requesting DeepSeek... (JSON Mode: {json_mode})")
-            
-            start_time = time.time()
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = endpoint.client.chat.completions.create(
+                model=endpoint.model,
                 messages=messages,
                 temperature=self.default_temp,
                 max_tokens=self.max_tokens,
                 stream=False,
                 response_format={"type": "json_object"} if json_mode else None
             )
-            duration = time.time() - start_time
-            logger.info(f"✅ DeepSeek Responded in {duration:.2f}s")
-            
-            self._log_usage(response)
-            return response.choices[0].message.content
         except Exception as e:
-            # 捕获所有 OpenAI 抛出的异常，包装成我们自己的 LLMError
-            # 这样上层逻辑不需要 import openai 就能处理错误
-            logger.error(f"DeepSeek API Error: {str(e)}")
-            raise LLMError(f"DeepSeek connection failed: {str(e)}") from e
+            # 400/401/404 之类不可重试；429/5xx/超时/连接错误可重试；非 OpenAI 异常是我们自己的 bug，不重试
+            response = getattr(e, "response", None) if isinstance(e, APIStatusError) else None
+            error = LLMError(f"{endpoint.name} connection failed: {str(e)}", api_provider=endpoint.name,
+                             status_code=getattr(e, "status_code", None),
+                             retry_after=parse_retry_after(response.headers.get("retry-after")) if response else None,
+                             retryable=None if isinstance(e, APIError) else False)
+            endpoint.record_failure(error)
+            raise error from e
+
+        duration = time.time() - start_time
+        endpoint.record_success(duration)
+        logger.info(f"✅ DeepSeek Responded in {duration:.2f}s", extra={"duration_s": round(duration, 3),
+                                                                       "endpoint": endpoint.name})
+        self._log_usage(response)
+        return response.choices[0].message.content
+
+    def _submit(self, endpoint: LLMEndpoint, messages, json_mode: bool):
+        # 线程池不继承调用方的 contextvars (日志的 stage / batch)，每个请求带一份副本；
+        # 同一个 Context 不能被两个线程同时进入，所以主请求和对冲请求各拷一份
+        return self._pool.submit(contextvars.copy_context().run, self._invoke, endpoint, messages, json_mode)
+
+    def _hedged_call(self, primary: LLMEndpoint, messages, json_mode: bool) -> str:
+        """
+        先发主请求；超过主端点 p95 延迟仍未返回，就向另一个端点 (只有一个端点时向同一端点) 再发一份，
+        谁先成功用谁。整个调用受 request_timeout 截止时间约束，慢请求在后台自然结束，结果丢弃。
+        """
+        deadline = time.monotonic() + self.request_timeout
+        futures = {self._submit(primary, messages, json_mode): primary}
+
+        if self.hedge_enabled:
+            delay = self._hedge_delay(primary)
+            done, _ = wait(futures, timeout=delay)
+            if not done:
+                backup = self._pick_endpoint(exclude={primary.name}) or primary
+                logger.info(f"🪁 [{primary.name}] slower than {delay:.1f}s, hedging to [{backup.name}]",
+                            extra={"hedge_delay_s": round(delay, 3), "endpoint": backup.name})
+                futures[self._submit(backup, messages, json_mode)] = backup
+
+        errors = []
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for f in done:
+                try:
+                    return f.result()
+                except Exception as e:
+                    errors.append(e)
+
+        if errors:
+            # 对冲请求被熔断器拒绝不算真正的错误，优先抛出真实的 API 错误
+            raise next((e for e in errors if not isinstance(e, CircuitOpenError)), errors[-1])
+        error = LLMError(f"Deadline exceeded ({self.request_timeout:.0f}s)", api_provider=primary.name)
+        primary.record_failure(error)
+        raise error
+
+    # 重试策略见 src/core/resilience.py：只重试 429/5xx/超时/连接错误，等待时间遵循 Retry-After；
+    # 最多试 3 次，指数退避 (2s, 4s, 8s...)。所有端点都在熔断时快速失败。
+    @resilient(attempts=3, min_wait=2, max_wait=10)
+    def _call_api(self, messages, json_mode=False):
+        """
+        底层的 API 调用：对冲 + 加权故障转移。
+        某个端点 (连同它的对冲请求) 失败后，换一个还没试过的端点，直到所有端点都试过。
+        不可重试的错误 (如 400 请求格式错误) 换端点也没用，直接抛出。
+        """
+        # ✅ 新增：在请求发出前记录日志 (DEBUG级别，但在调试时很有用)
+        # 如果你觉得太吵，可以把级别改成 DEBUG，但现在为了让你安心，我们用 INFO
+        logger.info(f"🤖 Requesting DeepSeek... (JSON Mode: {json_mode})")
+
+        tried: Set[str] = set()
+        last_error = None
+        while True:
+            endpoint = self._pick_endpoint(exclude=tried)
+            if endpoint is None:
+                break
+            tried.add(endpoint.name)
+            try:
+                return self._hedged_call(endpoint, messages, json_mode)
+            except CircuitOpenError as e:
+                # 选路之后、发请求之前端点刚好熔断 (或正在被别的线程试探)，换下一个
+                last_error = e
+            except LLMError as e:
+                # 捕获所有 OpenAI 抛出的异常，包装成我们自己的 LLMError
+                # 这样上层逻辑不需要 import openai 就能处理错误
+                last_error = e
+                logger.error(f"DeepSeek API Error [{endpoint.name}]: {str(e)}")
+                if not e.retryable:
+                    raise
+                if len(tried) < len(self.endpoints):
+                    logger.warning(f"🔀 Failing over from [{endpoint.name}]...")
+
+        if last_error is None:
+            wait_s = min(e.breaker.remaining() for e in self.endpoints)
+            raise CircuitOpenError("All LLM endpoints unavailable", breaker_name="llm", retry_after=wait_s)
+        raise last_error
 
     def chat(self, system_prompt: str, user_content: str) -> str:
         """
@@ -108,4 +286,4 @@ class DeepSeekDriver:
             # 也可以在这里加入 'Refinement Prompt' 告诉 AI 格式错了，但那是 Phase 3 的事
             time.sleep(1)
             raw_content_retry = self._call_api(messages, json_mode=True)
-            return clean_and_parse_json(raw_content_retry)
\ No newline at end of file
+            return clean_and_parse_json(raw_content_retry)
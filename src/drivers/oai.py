@@ -0,0 +1,283 @@
+# src/drivers/oai.py
+import json
+import time
+import shutil
+import logging
+import xml.etree.ElementTree as ET
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+import requests
+
+from src.core.config import GlobalConfig
+from src.core.exceptions import FetchError
+from src.core.models import Paper
+from src.core.rate_limiter import RateLimiter, RateLimitedSession
+
+logger = logging.getLogger("driver.oai")
+
+NS = {
+    "oai": "http://www.openarchives.org/OAI/2.0/",
+    "arxiv": "http://arxiv.org/OAI/arXiv/",
+}
+
+
+class ArxivOAIDriver:
+    """
+    Arxiv OAI-PMH 批量元数据驱动 (ListRecords + resumptionToken)。
+    用于大批量回填：不受 search API safety_limit=3000 的限制。
+    每一页原始 XML (chunk) 落盘，中断后从最后一个 resumptionToken 续传；
+    输出与 ArxivDriver.search 完全相同的 paper dict，DailyFlow 可以直接复用。
+    """
+    def __init__(self):
+        self.config = GlobalConfig
+        self.base_url = self.config.get('oai.base_url', 'https://oaipmh.arxiv.org/oai')
+        self.set_spec = self.config.get('oai.set', 'cs')
+        self.metadata_prefix = "arXiv"
+        self.timeout = int(self.config.get('oai.timeout', 60))
+        self.max_retries = int(self.config.get('oai.max_retries', 5))
+        # resumptionToken 过期后最多从头重抓几次
+        self.max_restarts = int(self.config.get('oai.max_restarts', 2))
+        self.root_dir = self.config.data_path / self.config.get('oai.dir', 'oai')
+        self.session = RateLimitedSession(RateLimiter(float(self.config.get('oai.min_interval', 3.0))))
+        self.session.headers.update({"User-Agent": "ScholarCore/2.0 (OAI-PMH harvester)"})
+        # 本实例刚抓完的区间：即使包含今天也直接复用 (harvest_incremental 之后 search_range 不再重抓)
+        self._fresh: set = set()
+
+    # ------------------------------------------------------------------
+    # 网络层
+    # ------------------------------------------------------------------
+    def _request(self, params: Dict[str, str]) -> bytes:
+        """
+        发一次 ListRecords 请求。
+        OAI-PMH 的流控是 503 + Retry-After，这里按服务端要求的时间等待后重试。
+        """
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                resp = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                wait = min(60, 2 ** attempt)
+                logger.warning(f"⚠️ OAI network error (try {attempt}/{self.max_retries}): {e}, retry in {wait}s")
+                time.sleep(wait)
+                continue
+
+            if resp.status_code == 200:
+                return resp.content
+            if resp.status_code == 503:
+                retry_after = resp.headers.get("Retry-After", "10")
+                wait = int(retry_after) if retry_after.isdigit() else 10
+                logger.info(f"⏳ OAI flow control (503), sleeping {wait}s...")
+                time.sleep(wait)
+                continue
+            raise FetchError("OAI-PMH request failed", resource_url=self.base_url, status_code=resp.status_code)
+
+        raise FetchError("OAI-PMH request failed after retries", resource_url=self.base_url,
+                         details={"params": params})
+
+    @staticmethod
+    def _parse_chunk(content: bytes):
+        """返回 (records 元素列表, resumptionToken 或 None, OAI 错误码或 None)"""
+        root = ET.fromstring(content)
+        error = root.find("oai:error", NS)
+        if error is not None:
+            return [], None, error.get("code")
+        list_records = root.find("oai:ListRecords", NS)
+        if list_records is None:
+            return [], None, None
+        records = list_records.findall("oai:record", NS)
+        token_el = list_records.find("oai:resumptionToken", NS)
+        token = token_el.text.strip() if token_el is not None and token_el.text else None
+        return records, token, None
+
+    # ------------------------------------------------------------------
+    # 落盘 & 续传
+    # ------------------------------------------------------------------
+    def _harvest_dir(self, date_from: str, date_until: str) -> Path:
+        return self.root_dir / self.set_spec.replace(":", "_") / f"{date_from}_{date_until}"
+
+    @staticmethod
+    def _load_state(state_path: Path) -> Dict[str, Any]:
+        if state_path.exists():
+            with open(state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    @staticmethod
+    def _save_state(state_path: Path, state: Dict[str, Any]):
+        tmp = state_path.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        tmp.replace(state_path)
+
+    def harvest(self, date_from: str, date_until: str) -> Path:
+        """
+        抓取 [date_from, date_until] (YYYY-MM-DD, 按 OAI datestamp) 的全部记录，逐页落盘。
+        已完成的区间直接返回，不再联网；未完成的从上次的 resumptionToken 继续。
+        Token 过期只能清空重来，最多 max_restarts 次，仍然过期则抛 FetchError。
+        """
+        for restart in range(self.max_restarts + 1):
+            harvest_dir = self._harvest_once(date_from, date_until)
+            if harvest_dir is not None:
+                return harvest_dir
+            shutil.rmtree(self._harvest_dir(date_from, date_until), ignore_errors=True)
+            if restart < self.max_restarts:
+                logger.warning(f"⚠️ Resumption token expired, restarting harvest from scratch "
+                               f"({restart + 1}/{self.max_restarts}).")
+        raise FetchError("OAI-PMH resumption token keeps expiring", resource_url=self.base_url,
+                         details={"from": date_from, "until": date_until, "restarts": self.max_restarts})
+
+    def _harvest_once(self, date_from: str, date_until: str) -> Optional[Path]:
+        """一次抓取 (可能是续传)。resumptionToken 过期返回 None"""
+        harvest_dir = self._harvest_dir(date_from, date_until)
+        harvest_dir.mkdir(parents=True, exist_ok=True)
+        state_path = harvest_dir / "state.json"
+        state = self._load_state(state_path)
+
+        # 区间包含今天的话，服务端还会继续长出新记录，不能当作"已完成"直接复用 (本次运行刚抓完的除外)
+        still_open = (date_until >= datetime.now(timezone.utc).date().isoformat()
+                      and harvest_dir not in self._fresh)
+        if state.get("complete") and not still_open:
+            logger.info(f"📦 OAI harvest {date_from}~{date_until} already on disk ({state['chunks']} chunks).")
+            return harvest_dir
+
+        if state.get("resumption_token") and not state.get("complete"):
+            logger.info(f"⏯️ Resuming OAI harvest at chunk {state['chunks'] + 1}...")
+            params = {"verb": "ListRecords", "resumptionToken": state["resumption_token"]}
+        else:
+            for stale in harvest_dir.glob("chunk_*.xml"):
+                stale.unlink()
+            state = {"from": date_from, "until": date_until, "set": self.set_spec,
+                     "chunks": 0, "records": 0, "resumption_token": None, "complete": False}
+            params = {"verb": "ListRecords", "metadataPrefix": self.metadata_prefix,
+                      "set": self.set_spec, "from": date_from, "until": date_until}
+
+        logger.info(f"🌾 OAI harvest: set={self.set_spec}, {date_from} ~ {date_until}")
+        while True:
+            content = self._request(params)
+            records, token, error = self._parse_chunk(content)
+
+            if error == "badResumptionToken" and "resumptionToken" in params:
+                # Token 过期：只能从头再来 (由 harvest 清空目录并限制次数)
+                return None
+            if error and error != "noRecordsMatch":
+                raise FetchError(f"OAI-PMH error: {error}", resource_url=self.base_url, details=params)
+
+            if records:
+                state["chunks"] += 1
+                chunk_path = harvest_dir / f"chunk_{state['chunks']:05d}.xml"
+                chunk_path.write_bytes(content)
+                state["records"] += len(records)
+
+            state["resumption_token"] = token
+            state["complete"] = not token
+            self._save_state(state_path, state)
+            logger.info(f"   📄 Chunk {state['chunks']}: +{len(records)} records (total {state['records']})")
+
+            if not token:
+                break
+            params = {"verb": "ListRecords", "resumptionToken": token}
+
+        logger.info(f"✅ OAI harvest complete: {state['records']} records in {state['chunks']} chunks.")
+        self._fresh.add(harvest_dir)
+        return harvest_dir
+
+    def harvest_incremental(self, date_until: Optional[str] = None, default_days: int = 1) -> Tuple[str, str]:
+        """
+        增量抓取：从上次成功的 until 继续 (水位线存在 watermark.json)。
+        OAI datestamp 粒度是天，所以起点与上次终点重叠一天，重复记录由下游按 ID 去重。
+        返回本次抓取的 (from, until)。
+        """
+        set_dir = self.root_dir / self.set_spec.replace(":", "_")
+        set_dir.mkdir(parents=True, exist_ok=True)
+        watermark_path = set_dir / "watermark.json"
+        watermark = self._load_state(watermark_path)
+
+        until = date_until or datetime.now(timezone.utc).date().isoformat()
+        date_from = watermark.get("until") or (date.fromisoformat(until) - timedelta(days=default_days)).isoformat()
+
+        self.harvest(date_from, until)
+        self._save_state(watermark_path, {"until": until, "updated_at": datetime.now(timezone.utc).isoformat()})
+        return date_from, until
+
+    # ------------------------------------------------------------------
+    # 解析
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _text(el, path: str) -> str:
+        found = el.find(path, NS)
+        if found is None or found.text is None:
+            return ""
+        return " ".join(found.text.split())
+
+    def _to_paper_meta(self, record) -> Optional[Paper]:
+        header = record.find("oai:header", NS)
+        if header is not None and header.get("status") == "deleted":
+            return None
+        meta = record.find("oai:metadata/arxiv:arXiv", NS)
+        if meta is None:
+            return None
+
+        arxiv_id = self._text(meta, "arxiv:id")
+        authors = []
+        for a in meta.findall("arxiv:authors/arxiv:author", NS):
+            name = " ".join(p for p in (self._text(a, "arxiv:forenames"), self._text(a, "arxiv:keyname"),
+                                        self._text(a, "arxiv:suffix")) if p)
+            if name:
+                authors.append(name)
+
+        created = self._text(meta, "arxiv:created")
+        published = datetime.fromisoformat(created).replace(tzinfo=timezone.utc) if created else None
+
+        return Paper(
+            title=self._text(meta, "arxiv:title"),
+            authors=authors,
+            summary=self._text(meta, "arxiv:abstract"),
+            published_date=published.isoformat() if published else "",
+            arxiv_url=f"http://arxiv.org/abs/{arxiv_id}",
+            pdf_url=f"http://arxiv.org/pdf/{arxiv_id}",
+            categories=self._text(meta, "arxiv:categories").split(),
+            journal_ref=self._text(meta, "arxiv:journal-ref") or "N/A"
+        )
+
+    def iter_papers(self, harvest_dir: Path) -> Iterator[Paper]:
+        """逐个 chunk 读盘解析，不需要把所有 XML 一次性装进内存"""
+        for chunk_path in sorted(harvest_dir.glob("chunk_*.xml")):
+            records, _, _ = self._parse_chunk(chunk_path.read_bytes())
+            for record in records:
+                paper = self._to_paper_meta(record)
+                if paper:
+                    yield paper
+
+    def search_range(self, date_from: str, date_until: str, subjects: List[str] = None,
+                     limit: int = None) -> List[Paper]:
+        """
+        回填入口：抓取 (或读取已落盘的) 区间，按学科和提交日期过滤，按 ID 去重。
+        OAI 的 from/until 是记录修改时间，旧论文发新版本也会出现，所以再按 created 日期过滤一次。
+        """
+        try:
+            harvest_dir = self.harvest(date_from, date_until)
+        except FetchError:
+            raise
+        except Exception as e:
+            raise FetchError("OAI harvest failed", resource_url=self.base_url,
+                             details={"from": date_from, "until": date_until, "error": str(e)})
+
+        wanted = set(subjects or [])
+        seen = set()
+        papers = []
+        for paper in self.iter_papers(harvest_dir):
+            if paper.arxiv_id in seen:
+                continue
+            if wanted and not wanted.intersection(paper.categories):
+                continue
+            if not (date_from <= paper.published_date[:10] <= date_until):
+                continue
+            seen.add(paper.arxiv_id)
+            papers.append(paper)
+
+        papers.sort(key=lambda p: p.published_date, reverse=True)
+        if limit:
+            papers = papers[:limit]
+        logger.info(f"✅ Loaded {len(papers)} papers from OAI harvest ({date_from} ~ {date_until}).")
+        return papers
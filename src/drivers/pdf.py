@@ -1,26 +1,110 @@
 import os
+import hashlib
 import requests
 import fitz  # PyMuPDF
 import logging
+import threading
+from collections import OrderedDict
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor, Future
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List, Dict, Tuple, Iterable
 
+from src.core.config import GlobalConfig
 from src.core.exceptions import FetchError, ProcessingError, FileWriteError
+from src.core.resilience import resilient, parse_retry_after
 
 logger = logging.getLogger("driver.pdf")
 
+
+class BufferPool:
+    """
+    下载缓冲区池，总容量 (在用 + 空闲) 不超过 budget 字节。
+    空闲缓冲区容量够就直接复用 (顺序下载时始终是同一块内存)；不够且预算已满时，
+    先释放空闲的缓冲区腾出预算，再不够就等在途的下载 / 写盘 / 解析结束。
+    单个文件超过整个预算时返回 None，由调用方退回流式写盘。
+    """
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.allocated = 0
+        self._free: List[bytearray] = []
+        self._cond = threading.Condition()
+
+    def acquire(self, size: int) -> Optional[bytearray]:
+        if size > self.budget:
+            return None
+        with self._cond:
+            while True:
+                fits = [b for b in self._free if len(b) >= size]
+                if fits:
+                    buf = min(fits, key=len)
+                    self._free.remove(buf)
+                    return buf
+                if self.allocated + size <= self.budget:
+                    self.allocated += size
+                    return bytearray(size)
+                if self._free:
+                    self.allocated -= len(self._free.pop(self._free.index(max(self._free, key=len))))
+                    continue
+                self._cond.wait()
+
+    def release(self, buf: bytearray):
+        with self._cond:
+            self._free.append(buf)
+            self._cond.notify_all()
+
+
+class _Inflight:
+    """一次内存下载的收尾：写盘和解析都结束后才把缓冲区还回池子"""
+    def __init__(self, pool: BufferPool, buf: bytearray, views: List[memoryview], parts: int):
+        self.pool = pool
+        self.buf = buf
+        self.views = views
+        self._left = parts
+        self._lock = threading.Lock()
+
+    def done(self, _future=None):
+        with self._lock:
+            self._left -= 1
+            if self._left:
+                return
+        for v in self.views:
+            v.release()
+        self.pool.release(self.buf)
+
+
 class PDFDriver:
+    # 内存模式下解析好的页面，交给 InboxIndex 建索引时直接使用 (path -> (size, sha1, pages))。
+    # 进程内共享：下载和建索引用的是不同的 PDFDriver 实例
+    _handoff: "OrderedDict[str, Tuple[int, str, List[str]]]" = OrderedDict()
+    _handoff_lock = threading.Lock()
+
     def __init__(self):
+        self.config = GlobalConfig
         # 伪装成浏览器，防止 403 Forbidden
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
+        self.chunk_size = int(self.config.get('pdf.chunk_size_kb', 256)) * 1024
+        # 内存模式：整篇下载进复用的缓冲区，PyMuPDF 直接从内存解析，同时异步写进收件箱
+        self.in_memory = bool(self.config.get('pdf.in_memory', True))
+        self.handoff_max = int(self.config.get('pdf.handoff_max', 256))
+        # 只有本进程随后会建索引 (取走 handoff) 时才在内存里解析；独立 worker 进程由调用方关掉
+        self.parse_in_memory = bool(self.config.get('index.auto_update', True))
+        self._pool: Optional[BufferPool] = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._parser: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, List[Future]] = {}
+        self._pending_lock = threading.Lock()
 
+    @resilient(breaker="arxiv_pdf", attempts=3, min_wait=2, max_wait=10)
     def download(self, url: str, save_path: Path) -> Path:
         """
         下载 PDF 到指定路径。
+        先写 .part 临时文件再改名：中途失败重试时不会把半截文件当成"已存在"跳过。
+        内存模式下返回时文件可能还在异步写入，需要落盘结果的调用方先 flush()。
         """
-        if save_path.exists():
+        if save_path.exists() or self._is_pending(save_path):
             logger.info(f"PDF already exists, skipping download: {save_path.name}")
             return save_path
 
@@ -32,16 +116,20 @@ class PDFDriver:
                 raise FetchError(
                     message="Download failed", 
                     resource_url=url, 
-                    status_code=response.status_code
+                    status_code=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get("Retry-After"))
                 )
             
             # 确保父目录存在
             save_path.parent.mkdir(parents=True, exist_ok=True)
 
-            with open(save_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
+            # 压缩传输时 Content-Length 是压缩后的长度，和解压后的内容对不上，只能流式写盘
+            size = int(response.headers.get("Content-Length") or 0)
+            encoded = response.headers.get("Content-Encoding", "identity").lower() != "identity"
+            if self.in_memory and size and not encoded and self._download_to_memory(response, size, url, save_path):
+                return save_path
+
+            self._stream_to_disk(response.iter_content(chunk_size=self.chunk_size), save_path)
             return save_path
 
         except requests.RequestException as e:
@@ -49,36 +137,166 @@ class PDFDriver:
         except IOError as e:
             raise FileWriteError(f"Failed to write PDF file: {str(e)}", file_path=str(save_path))
 
-    def parse_text(self, pdf_path: Path) -> str:
+    @staticmethod
+    def _stream_to_disk(chunks: Iterable[bytes], save_path: Path):
+        tmp_path = save_path.with_name(save_path.name + ".part")
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, save_path)
+
+    # ------------------------------------------------------------------
+    # 内存模式
+    # ------------------------------------------------------------------
+    def _ensure_workers(self):
+        if self._pool is None:
+            self._pool = BufferPool(int(self.config.get('pdf.inflight_mb', 256)) * 1024 * 1024)
+            self._writer = ThreadPoolExecutor(max_workers=int(self.config.get('pdf.writers', 2)),
+                                              thread_name_prefix="pdf-write")
+            # PyMuPDF 不支持多线程并发使用，解析固定在一个线程上
+            self._parser = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-parse")
+
+    def _download_to_memory(self, response, size: int, url: str, save_path: Path) -> bool:
         """
-        解析 PDF，提取文本并保留图片占位符。
+        按 Content-Length 从池里取缓冲区，分块读满后交给后台：一路写盘 (.part -> 改名)，
+        需要时 (parse_in_memory) 一路 PyMuPDF 解析。超出整个内存预算返回 False (调用方退回流式写盘)；
+        内容比 Content-Length 长就把已读部分连同剩余内容流式写盘；短了是真截断，抛 FetchError (可重试)。
+        """
+        self._ensure_workers()
+        buf = self._pool.acquire(size)
+        if buf is None:
+            logger.info(f"PDF larger than in-flight budget ({size} bytes), streaming to disk: {save_path.name}")
+            return False
+
+        view = memoryview(buf)
+        chunks = response.iter_content(chunk_size=self.chunk_size)
+        overflow = None
+        try:
+            pos = 0
+            for chunk in chunks:
+                end = pos + len(chunk)
+                if end > size:
+                    overflow = [buf[:pos], chunk]
+                    break
+                view[pos:end] = chunk
+                pos = end
+            if overflow is None and pos != size:
+                raise FetchError(f"Truncated download ({pos}/{size} bytes)", resource_url=url, retryable=True)
+        except BaseException:
+            view.release()
+            self._pool.release(buf)
+            raise
+        if overflow is not None:
+            view.release()
+            self._pool.release(buf)
+            logger.info(f"PDF longer than Content-Length ({size} bytes), streaming to disk: {save_path.name}")
+            self._stream_to_disk(chain(overflow, chunks), save_path)
+            return True
+
+        data = view[:size]
+        futures = [self._writer.submit(self._write_file, data, save_path)]
+        if self.parse_in_memory:
+            futures.append(self._parser.submit(self._parse_buffer, data, save_path))
+        inflight = _Inflight(self._pool, buf, [data, view], parts=len(futures))
+        with self._pending_lock:
+            self._pending[str(save_path)] = futures
+        for fut in futures:
+            fut.add_done_callback(inflight.done)
+        return True
+
+    @staticmethod
+    def _write_file(data: memoryview, save_path: Path):
+        tmp_path = save_path.with_name(save_path.name + ".part")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, save_path)
+        except OSError as e:
+            raise FileWriteError(f"Failed to write PDF file: {str(e)}", file_path=str(save_path))
+
+    def _parse_buffer(self, data: memoryview, save_path: Path):
+        """从内存解析，结果放进 handoff 等建索引时取用；解析失败只记日志，建索引时会从磁盘重试"""
+        try:
+            with fitz.open(stream=data, filetype="pdf") as doc:
+                pages = self._extract_pages(doc)
+        except Exception as e:
+            logger.warning(f"⚠️ In-memory parse failed for {save_path.name}, will parse from disk: {e}")
+            return
+        sha1 = hashlib.sha1(data).hexdigest()
+        with self._handoff_lock:
+            self._handoff[str(save_path)] = (len(data), sha1, pages)
+            while len(self._handoff) > self.handoff_max:
+                self._handoff.popitem(last=False)
+
+    def _is_pending(self, save_path: Path) -> bool:
+        with self._pending_lock:
+            futures = self._pending.get(str(save_path))
+        return bool(futures) and not all(f.done() for f in futures)
+
+    def flush(self) -> List[str]:
+        """等待所有异步写盘 / 解析结束，返回写盘失败的路径 (这些文件不存在，下次运行会重新下载)"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        failed = []
+        for path, (write, *parse) in pending.items():
+            for fut in parse:
+                fut.result()
+            try:
+                write.result()
+            except Exception as e:
+                failed.append(path)
+                logger.error(f"❌ Async PDF write failed ({Path(path).name}): {e}")
+        return failed
+
+    @classmethod
+    def take_handoff(cls, pdf_path: Path, size: int) -> Optional[Tuple[str, List[str]]]:
+        """取走内存模式下已解析的 (sha1, pages)；文件大小对不上 (已被替换) 返回 None"""
+        with cls._handoff_lock:
+            entry = cls._handoff.pop(str(pdf_path), None)
+        if entry is None or entry[0] != size:
+            return None
+        return entry[1], entry[2]
+
+    def parse_pages(self, pdf_path: Path) -> List[str]:
+        """
+        按页解析 PDF，返回每页的文本 (已附带图片占位符)。建索引时按页存储用。
         """
         if not pdf_path.exists():
             raise ProcessingError("PDF file not found", details={"path": str(pdf_path)})
 
         logger.info(f"Parsing PDF: {pdf_path.name}")
-        full_text = ""
-        
+
         try:
             with fitz.open(pdf_path) as doc:
-                for page_num, page in enumerate(doc):
-                    # 1. 提取纯文本
-                    text = page.get_text()
-                    
-                    # 2. 检测图片 (Good Taste: 告诉 AI 这里有图，也许很重要)
-                    image_list = page.get_images(full=True)
-                    images_info = ""
-                    if image_list:
-                        images_info = f"\n\n[Page {page_num + 1} contains {len(image_list)} images/diagrams]\n\n"
-                    
-                    # 3. 拼接
-                    full_text += f"--- Page {page_num + 1} ---\n{text}{images_info}\n"
-            
-            return full_text
+                return self._extract_pages(doc)
 
         except Exception as e:
             raise ProcessingError(
                 message="Failed to parse PDF content", 
                 processor_name="PyMuPDF",
                 details={"file": str(pdf_path), "error": str(e)}
-            )
\ No newline at end of file
+            )
+
+    @staticmethod
+    def _extract_pages(doc) -> List[str]:
+        pages = []
+        for page_num, page in enumerate(doc):
+            # 1. 提取纯文本
+            text = page.get_text()
+
+            # 2. 检测图片 (Good Taste: 告诉 AI 这里有图，也许很重要)
+            image_list = page.get_images(full=True)
+            images_info = ""
+            if image_list:
+                images_info = f"\n\n[Page {page_num + 1} contains {len(image_list)} images/diagrams]\n\n"
+
+            pages.append(f"{text}{images_info}")
+        return pages
+
+    def parse_text(self, pdf_path: Path) -> str:
+        """
+        解析 PDF，提取文本并保留图片占位符。
+        """
+        pages = self.parse_pages(pdf_path)
+        # 3. 拼接 (一次 join，避免逐页 += 的平方级拷贝)
+        return "".join(f"--- Page {i + 1} ---\n{text}\n" for i, text in enumerate(pages))
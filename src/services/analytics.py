@@ -0,0 +1,242 @@
+# src/services/analytics.py
+import re
+import json
+import time
+import logging
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from src.core.config import GlobalConfig
+from src.core.models import load_papers
+from src.utils.file_utils import ensure_dir
+
+logger = logging.getLogger("service.analytics")
+
+# 阈值候选网格：0.0, 0.1, ..., 5.0
+THRESHOLD_GRID = np.round(np.arange(0.0, 5.01, 0.1), 1)
+HIST_BINS = np.arange(0.0, 5.51, 0.5)
+_DAILY_FILE = re.compile(r"^(\d{4}-\d{2}-\d{2})_daily\.json$")
+
+
+class ScoreArrays:
+    """
+    历史打分数据的列式表示。
+    scores[i] / day_idx[i] 是第 i 篇论文；(cat_paper[j], cat_code[j]) 是展开后的 论文-分类 对。
+    """
+    def __init__(self, days: List[str], scores: np.ndarray, day_idx: np.ndarray,
+                 categories: List[str], cat_paper: np.ndarray, cat_code: np.ndarray):
+        self.days = days
+        self.scores = scores
+        self.day_idx = day_idx
+        self.categories = categories
+        self.cat_paper = cat_paper
+        self.cat_code = cat_code
+
+    def __len__(self):
+        return len(self.scores)
+
+
+def ks_statistic(a: np.ndarray, b: np.ndarray) -> float:
+    """两样本 Kolmogorov-Smirnov 统计量 (两条经验分布函数的最大距离)"""
+    if len(a) == 0 or len(b) == 0:
+        return 0.0
+    a, b = np.sort(a), np.sort(b)
+    grid = np.concatenate([a, b])
+    cdf_a = np.searchsorted(a, grid, side="right") / len(a)
+    cdf_b = np.searchsorted(b, grid, side="right") / len(b)
+    return float(np.max(np.abs(cdf_a - cdf_b)))
+
+
+def load_thresholds() -> dict:
+    """阈值：settings.yaml 为默认值，analyze --apply 写出的校准结果 (reports/thresholds.json) 优先"""
+    config = GlobalConfig
+    thresholds = {
+        "download_threshold": float(config.get('daily_news.download_threshold', 4.0)),
+        "report_threshold": float(config.get('email.report_threshold', 2.5)),
+        "send_threshold": float(config.get('email.send_threshold', 3.0)),
+        "top_k": int(config.get('email.top_k', 15)),
+    }
+    overrides_path = config.data_path / "reports" / "thresholds.json"
+    if overrides_path.exists():
+        try:
+            with open(overrides_path, 'r', encoding='utf-8') as f:
+                overrides = json.load(f)
+            thresholds.update({k: type(thresholds[k])(v) for k, v in overrides.items() if k in thresholds})
+            logger.info(f"🎯 Using calibrated thresholds ({overrides.get('generated_at', '?')}): {thresholds}")
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable threshold overrides {overrides_path}: {e}")
+    return thresholds
+
+
+class ScoreAnalytics:
+    """
+    基于 data/reports/daily_meta 的历史打分分析：
+    分布统计 (按分类 / 按天)、漂移检测，以及按目标工作量反推阈值。
+    """
+    def __init__(self):
+        self.config = GlobalConfig
+        self.reports_dir = self.config.data_path / "reports" / "daily_meta"
+        self.output_dir = self.config.data_path / "reports" / "analytics"
+        self.overrides_path = self.config.data_path / "reports" / "thresholds.json"
+        self.drift_ks = float(self.config.get('analytics.drift_ks', 0.2))
+        self.drift_mean = float(self.config.get('analytics.drift_mean', 0.5))
+
+    # ------------------------------------------------------------------
+    # 加载
+    # ------------------------------------------------------------------
+    def load(self, days: int = 30) -> ScoreArrays:
+        files = sorted(
+            (m.group(1), f) for f in self.reports_dir.glob("*_daily.json")
+            if (m := _DAILY_FILE.match(f.name))
+        )[-days:]
+
+        day_names, scores, day_idx = [], [], []
+        cat_codes: Dict[str, int] = {}
+        cat_paper, cat_code = [], []
+        offset = 0
+        for d, (day, path) in enumerate(files):
+            papers = load_papers(path)
+            day_names.append(day)
+            for i, p in enumerate(papers):
+                scores.append(p.score)
+                for c in p.categories:
+                    cat_paper.append(offset + i)
+                    cat_code.append(cat_codes.setdefault(c, len(cat_codes)))
+            day_idx.extend([d] * len(papers))
+            offset += len(papers)
+
+        logger.info(f"📊 Loaded {offset} scored papers from {len(day_names)} days.")
+        return ScoreArrays(
+            days=day_names,
+            scores=np.asarray(scores, dtype=np.float32),
+            day_idx=np.asarray(day_idx, dtype=np.int32),
+            categories=list(cat_codes),
+            cat_paper=np.asarray(cat_paper, dtype=np.int64),
+            cat_code=np.asarray(cat_code, dtype=np.int32),
+        )
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _summary(scores: np.ndarray) -> Dict[str, Any]:
+        if len(scores) == 0:
+            return {"count": 0}
+        p50, p90 = np.percentile(scores, [50, 90])
+        return {
+            "count": int(len(scores)),
+            "mean": round(float(scores.mean()), 3),
+            "p50": round(float(p50), 2),
+            "p90": round(float(p90), 2),
+            "ge_3": int((scores >= 3.0).sum()),
+            "ge_4": int((scores >= 4.0).sum()),
+            "hist": np.histogram(scores, bins=HIST_BINS)[0].tolist(),
+        }
+
+    def daily_counts_at(self, data: ScoreArrays) -> np.ndarray:
+        """
+        返回 [天数, len(THRESHOLD_GRID)] 矩阵：每天有多少篇 score >= 各候选阈值。
+        先把分数离散到 0.1 的网格，再用 bincount + 反向累加，一次算完所有阈值。
+        """
+        n_days, n_grid = len(data.days), len(THRESHOLD_GRID)
+        if n_days == 0:
+            return np.zeros((0, n_grid), dtype=np.int64)
+        bucket = np.clip(np.floor(data.scores * 10 + 1e-6).astype(np.int64), 0, n_grid - 1)
+        flat = np.bincount(data.day_idx * n_grid + bucket, minlength=n_days * n_grid)
+        per_bucket = flat.reshape(n_days, n_grid)
+        # score >= t  <=>  bucket >= t 的下标，对每行做"从右往左"的累加
+        return np.cumsum(per_bucket[:, ::-1], axis=1)[:, ::-1]
+
+    def suggest_threshold(self, counts: np.ndarray, target_per_day: float) -> float:
+        """取日均数量不超过目标的最低阈值 (工作量有界，同时尽量不漏)"""
+        if counts.shape[0] == 0:
+            return float("nan")
+        mean_counts = counts.mean(axis=0)
+        ok = np.nonzero(mean_counts <= target_per_day)[0]
+        return float(THRESHOLD_GRID[ok[0]]) if len(ok) else float(THRESHOLD_GRID[-1])
+
+    def detect_drift(self, data: ScoreArrays, recent_days: int) -> Dict[str, Any]:
+        """最近 recent_days 天 vs 更早的基线，KS 统计量或均值偏移超限即判定漂移"""
+        split = len(data.days) - recent_days
+        if split <= 0:
+            return {"drift": False, "note": "not enough history"}
+        recent = data.scores[data.day_idx >= split]
+        baseline = data.scores[data.day_idx < split]
+        ks = ks_statistic(recent, baseline)
+        mean_shift = float(recent.mean() - baseline.mean()) if len(recent) and len(baseline) else 0.0
+        return {
+            "drift": bool(ks > self.drift_ks or abs(mean_shift) > self.drift_mean),
+            "ks": round(ks, 3),
+            "mean_shift": round(mean_shift, 3),
+            "recent_days": recent_days,
+            "baseline_days": split,
+        }
+
+    # ------------------------------------------------------------------
+    # 入口
+    # ------------------------------------------------------------------
+    def run(self, days: int = 30, recent_days: int = 7, target_downloads: float = 5,
+            target_email: float = 15, apply: bool = False) -> Optional[Dict[str, Any]]:
+        data = self.load(days)
+        if len(data) == 0:
+            logger.info("📭 No historical scores found, nothing to analyze.")
+            return None
+
+        per_category = {}
+        for code, cat in enumerate(data.categories):
+            per_category[cat] = self._summary(data.scores[data.cat_paper[data.cat_code == code]])
+        per_day = {day: self._summary(data.scores[data.day_idx == d]) for d, day in enumerate(data.days)}
+
+        drift = self.detect_drift(data, recent_days)
+        counts = self.daily_counts_at(data)
+        if drift.get("drift"):
+            # 分布已经变了，旧数据只会把阈值往回拉：只用近期窗口校准
+            counts = counts[-recent_days:]
+        download_t = self.suggest_threshold(counts, target_downloads)
+        email_t = self.suggest_threshold(counts, target_email)
+
+        suggested = {
+            "download_threshold": download_t,
+            "send_threshold": email_t,
+            "top_k": int(target_email),
+        }
+        report = {
+            "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "days": data.days,
+            "overall": self._summary(data.scores),
+            "per_category": per_category,
+            "per_day": per_day,
+            "drift": drift,
+            "targets": {"downloads_per_day": target_downloads, "email_per_day": target_email},
+            "suggested": suggested,
+        }
+
+        self._log_report(report)
+
+        ensure_dir(self.output_dir)
+        out_path = self.output_dir / f"{time.strftime('%Y-%m-%d')}_analytics.json"
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(f"💾 Analytics report saved to: {out_path}")
+
+        if apply:
+            with open(self.overrides_path, 'w', encoding='utf-8') as f:
+                json.dump({**suggested, "generated_at": report["generated_at"]}, f, ensure_ascii=False, indent=2)
+            logger.info(f"✅ Thresholds applied (DailyFlow will use them from next run): {self.overrides_path}")
+        return report
+
+    def _log_report(self, report: Dict[str, Any]):
+        o = report["overall"]
+        logger.info(f"📈 Overall: n={o['count']} mean={o['mean']} p50={o['p50']} p90={o['p90']} "
+                    f">=4: {o['ge_4']}  >=3: {o['ge_3']}")
+        for cat, st in sorted(report["per_category"].items(), key=lambda kv: -kv[1]["count"])[:15]:
+            logger.info(f"   [{cat:<10}] n={st['count']:<5} mean={st['mean']:<5} p90={st['p90']:<4} >=4: {st['ge_4']}")
+        d = report["drift"]
+        if d.get("drift"):
+            logger.warning(f"⚠️ Score drift detected: KS={d['ks']} mean_shift={d['mean_shift']} "
+                           f"(last {d['recent_days']} days vs previous {d['baseline_days']})")
+        else:
+            logger.info(f"✅ No significant drift ({d})")
+        s = report["suggested"]
+        logger.info(f"🎯 Suggested: download>={s['download_threshold']}, send>={s['send_threshold']}, top_k={s['top_k']}")
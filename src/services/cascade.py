@@ -0,0 +1,181 @@
+# src/services/cascade.py
+import math
+import random
+import logging
+from typing import List, Dict, Any, Callable
+
+from src.core.config import GlobalConfig
+from src.core.logger import log_context
+from src.core.models import Paper
+from src.drivers.llm import DeepSeekDriver
+from src.utils.text_utils import normalize_list
+
+logger = logging.getLogger("service.cascade")
+
+
+def _strong_failed(p: Paper) -> bool:
+    """强模型没给出有效分数 (整批失败或漏掉了这篇)"""
+    reason = p.reason or ""
+    return reason.startswith("Batch Error") or reason == "LLM missed this paper"
+
+
+def agreement_stats(pairs: List[tuple], thresholds: Dict[str, float]) -> Dict[str, Any]:
+    """
+    快速模型 vs 强模型的一致性。pairs = [(triage_score, strong_score), ...]
+    - mae / bias：平均绝对差、强模型相对快速模型的平均偏移；
+    - within_0_5 / within_1：差值在 0.5 / 1 分以内的比例；
+    - decision_*：在下载 / 发送阈值上两者判断一致的比例；
+    - by_triage：按快速模型的整数分桶，强模型给出的平均分 (用来决定区间上下界)。
+    """
+    if not pairs:
+        return {"n": 0}
+    n = len(pairs)
+    diffs = [s - t for t, s in pairs]
+    stats = {
+        "n": n,
+        "mae": round(sum(abs(d) for d in diffs) / n, 3),
+        "bias": round(sum(diffs) / n, 3),
+        "within_0_5": round(sum(abs(d) <= 0.5 for d in diffs) / n, 3),
+        "within_1": round(sum(abs(d) <= 1.0 for d in diffs) / n, 3),
+    }
+    for name in ("download_threshold", "send_threshold"):
+        t = thresholds[name]
+        stats[f"decision_{name.split('_')[0]}"] = round(sum((a >= t) == (b >= t) for a, b in pairs) / n, 3)
+
+    buckets: Dict[int, List[float]] = {}
+    for t, s in pairs:
+        buckets.setdefault(int(math.floor(t)), []).append(s)
+    stats["by_triage"] = {str(k): {"n": len(v), "strong_mean": round(sum(v) / len(v), 2)}
+                          for k, v in sorted(buckets.items())}
+    return stats
+
+
+class ScoringCascade:
+    """
+    两级打分：
+    1. 快速模型 + 精简提示词给所有论文打分 (只输出 id / score)；
+    2. 分数落在不确定区间 [band_low, band_high] 的论文交给强模型 + 完整 rubric 复评。
+       低于区间的直接采用快速模型的分数；高于区间的默认也复评 (数量很少，而且要进邮件，需要 reason / summary_zh)。
+    另外按 audit_rate 随机抽一部分低分论文给强模型复评，用来估计"快速模型漏掉的好论文"比例，指导调区间。
+    """
+    def __init__(self, flow):
+        self.config = GlobalConfig
+        self.flow = flow
+        self.band_low, self.band_high = (float(x) for x in self.config.get('llm.cascade.band', [2.0, 4.0]))
+        self.rescore_above = bool(self.config.get('llm.cascade.rescore_above', True))
+        self.audit_rate = float(self.config.get('llm.cascade.audit_rate', 0.05))
+        self.batch_size = int(self.config.get('llm.cascade.batch_size', 60))
+        self.llm = DeepSeekDriver(
+            endpoints=self.config.get('llm.cascade.endpoints') or None,
+            model=self.config.get('llm.cascade.model'),
+            max_tokens=self.config.get('llm.cascade.max_tokens'),
+        )
+        self.last_report: Dict[str, Any] = {}
+
+    def _prompt(self) -> str:
+        return self.flow._render("prompts/daily_triage.md.j2", {
+            "user_profile": self.config.get('daily_news.user_profile', "General Computer Science"),
+        })
+
+    def _triage_batch(self, batch: List[Paper], system_prompt: str) -> int:
+        """原地写入 triage_score，返回成功打分的篇数。失败 / 漏掉的论文 triage_score 保持 None"""
+        user_content = "Score these papers:\n\n"
+        for j, p in enumerate(batch):
+            user_content += f"ID: {j} | Title: {p.title}\nAbstract: {p.summary}\n---\n"
+        try:
+            result_list = normalize_list(self.llm.chat_json(system_prompt, user_content))
+        except Exception as e:
+            logger.error(f"❌ Triage batch failed, all {len(batch)} papers go to the strong model: {e}")
+            return 0
+
+        scored = 0
+        for r in result_list:
+            try:
+                p = batch[int(r.get('id'))]
+                p.triage_score = float(r.get('score'))
+                scored += 1
+            except (TypeError, ValueError, IndexError):
+                continue
+        return scored
+
+    def score(self, papers: List[Paper], rescore: Callable[[List[Paper]], List[Paper]]) -> List[Paper]:
+        """
+        rescore 是强模型打分函数 (单机批量打分或队列打分)，原地回填 score / reason / summary_zh。
+        """
+        system_prompt = self._prompt()
+        num_batches = math.ceil(len(papers) / self.batch_size)
+        logger.info(f"🪜 Cascade tier 1: {len(papers)} papers in {num_batches} batches "
+                    f"(fast model: {self.llm.model}).")
+        for i in range(0, len(papers), self.batch_size):
+            with log_context(batch=f"triage-{i // self.batch_size + 1}"):
+                self._triage_batch(papers[i : i + self.batch_size], system_prompt)
+
+        unscored, below, band, above = [], [], [], []
+        for p in papers:
+            if p.triage_score is None:
+                unscored.append(p)
+            elif p.triage_score < self.band_low:
+                below.append(p)
+            elif p.triage_score <= self.band_high:
+                band.append(p)
+            else:
+                above.append(p)
+
+        audited = [p for p in below if random.random() < self.audit_rate]
+        audited_ids = {id(p) for p in audited}
+        for p in below:
+            if id(p) not in audited_ids:
+                p.score = p.triage_score
+                p.reason = "Triage: below uncertainty band"
+
+        to_rescore = unscored + band + (above if self.rescore_above else []) + audited
+        if not self.rescore_above:
+            for p in above:
+                p.score = p.triage_score
+                p.reason = "Triage: above uncertainty band"
+
+        logger.info(f"🪜 Cascade tier 2: {len(to_rescore)}/{len(papers)} papers to the strong model "
+                    f"(band {len(band)}, above {len(above) if self.rescore_above else 0}, "
+                    f"unscored {len(unscored)}, audit {len(audited)}).")
+        if to_rescore:
+            rescore(to_rescore)
+
+        # 强模型失败时退回快速模型的分数，而不是 0 分
+        for p in to_rescore:
+            if p.triage_score is not None and _strong_failed(p):
+                p.score = p.triage_score
+
+        ok = [p for p in to_rescore if p.triage_score is not None and not _strong_failed(p)]
+        thresholds = self.flow.thresholds
+        band_ids = {id(p) for p in band}
+        audit_ok = [p for p in ok if id(p) in audited_ids]
+        self.last_report = {
+            "band": [self.band_low, self.band_high],
+            "counts": {"total": len(papers), "below": len(below), "band": len(band), "above": len(above),
+                       "unscored": len(unscored), "audited": len(audited), "rescored": len(to_rescore)},
+            "strong_calls_saved": round(1 - len(to_rescore) / len(papers), 3) if papers else 0.0,
+            "agreement": agreement_stats([(p.triage_score, p.score) for p in ok], thresholds),
+            "band_agreement": agreement_stats([(p.triage_score, p.score) for p in ok if id(p) in band_ids], thresholds),
+            "audit": {
+                "n": len(audit_ok),
+                "missed_send": sum(p.score >= thresholds["send_threshold"] for p in audit_ok),
+                "missed_download": sum(p.score >= thresholds["download_threshold"] for p in audit_ok),
+            },
+        }
+        self._log_report()
+        return papers
+
+    def _log_report(self):
+        r = self.last_report
+        a = r["agreement"]
+        logger.info(f"🪜 Cascade saved {r['strong_calls_saved']:.0%} of strong-model scoring: {r['counts']}")
+        if a.get("n"):
+            logger.info(f"   Agreement (n={a['n']}): MAE={a['mae']} bias={a['bias']} "
+                        f"within±1={a['within_1']:.0%} download-decision={a['decision_download']:.0%}")
+            for bucket, v in a["by_triage"].items():
+                logger.info(f"   triage≈{bucket}: strong mean {v['strong_mean']} (n={v['n']})")
+        au = r["audit"]
+        if au["n"]:
+            level = logging.WARNING if au["missed_send"] else logging.INFO
+            logger.log(level, f"   Audit of below-band papers: {au['missed_send']}/{au['n']} would have been "
+                              f"sent by the strong model (lower band_low if this stays > 0)")
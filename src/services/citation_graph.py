@@ -0,0 +1,246 @@
+# src/services/citation_graph.py
+import re
+import sqlite3
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Iterable
+
+from src.core.config import GlobalConfig
+from src.core.exceptions import StorageError
+from src.core.models import Paper, load_papers
+from src.drivers.pdf import PDFDriver
+from src.services.inbox_index import InboxIndex, INBOX_NAME
+from src.utils.file_utils import ensure_dir
+from src.utils.text_utils import arxiv_id_from_url, title_hash
+
+logger = logging.getLogger("service.citations")
+
+# 参考文献段落的标题 (取全文中最后一次出现的位置，避免命中目录里的 "References")
+_REF_HEADING = re.compile(r"^\s*(?:\d+\.?\s*)?(references|bibliography|reference list)\s*$",
+                          re.IGNORECASE | re.MULTILINE)
+# 单条参考文献的起始：[12] / 12. / (12)
+_REF_SPLIT = re.compile(r"(?m)^\s*(?:\[\d{1,3}\]|\(\d{1,3}\)|\d{1,3}\.)\s+")
+# 新式 (2401.12345) 与旧式 (cs/0112017) Arxiv ID
+_ARXIV_ID = re.compile(
+    r"(?:arxiv[:\s]*|arxiv\.org/(?:abs|pdf)/)(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v\d+)?",
+    re.IGNORECASE)
+# 引号里的标题 (很多引用格式会给标题加引号)
+_QUOTED = re.compile(r"[\"“]([^\"”]{15,300})[\"”]")
+
+# 单条语句里 IN (...) 的参数个数上限 (旧版 SQLite 默认最多 999 个绑定变量)
+_MAX_VARS = 900
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    arxiv_id   TEXT PRIMARY KEY,
+    title_hash TEXT,
+    title      TEXT,
+    score      REAL,
+    day        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_papers_title ON papers(title_hash);
+CREATE INDEX IF NOT EXISTS idx_papers_score ON papers(score);
+CREATE TABLE IF NOT EXISTS edges (
+    src TEXT NOT NULL,
+    dst TEXT NOT NULL,
+    via TEXT,
+    PRIMARY KEY (src, dst)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_edges_dst ON edges(dst);
+CREATE TABLE IF NOT EXISTS sources (
+    path  TEXT PRIMARY KEY,
+    src   TEXT,
+    mtime REAL,
+    refs  INTEGER
+);
+CREATE TABLE IF NOT EXISTS meta_files (
+    name  TEXT PRIMARY KEY,
+    mtime REAL
+);
+"""
+
+
+def extract_references(text: str) -> List[str]:
+    """把全文末尾的参考文献段落切成一条条引用 (启发式，够用就好)"""
+    if not text:
+        return []
+    headings = list(_REF_HEADING.finditer(text))
+    # 找不到标题时退化为扫描最后 30%，引用里的 arXiv ID 仍然能抓到
+    tail = text[headings[-1].end():] if headings else text[int(len(text) * 0.7):]
+    parts = [" ".join(p.split()) for p in _REF_SPLIT.split(tail)]
+    return [p for p in parts if len(p) > 20]
+
+
+def reference_keys(ref: str):
+    """
+    从一条引用里抽出可用于匹配的键：
+    - ('id', arxiv_id)：显式写出的 Arxiv ID，最可靠；
+    - ('title', hash)：引号里的标题，以及按 '. ' 切出来的较长片段 (作者. 标题. 会议.)。
+    """
+    for m in _ARXIV_ID.finditer(ref):
+        yield "id", m.group(1)
+    candidates = [m.group(1) for m in _QUOTED.finditer(ref)]
+    candidates += [seg for seg in re.split(r"\.\s+", ref) if 25 <= len(seg) <= 300]
+    for c in candidates:
+        h = title_hash(c)
+        if h:
+            yield "title", h
+
+
+class CitationGraph:
+    """
+    本地引用图：收件箱 PDF 的参考文献 -> 本地论文库 (daily_meta 历史) 的有向边。
+    存在 SQLite 里 (edges 按 src/dst 双向有索引)，"今天的命中引用了哪些我打过 5 分的论文"
+    这类查询是毫秒级的；建图是增量的，已处理且未变化的 PDF 不会重复抽取。
+    """
+    def __init__(self, db_path: Path = None, inbox_dir: Path = None):
+        self.config = GlobalConfig
+        self.inbox_dir = inbox_dir or self.config.data_path / "inbox"
+        self.reports_dir = self.config.data_path / "reports" / "daily_meta"
+        self.db_path = db_path or self.config.data_path / "index" / "citations.db"
+        ensure_dir(self.db_path.parent)
+        self.pdf = PDFDriver()
+        try:
+            self.conn = sqlite3.connect(str(self.db_path))
+            self.conn.executescript(_SCHEMA)
+        except sqlite3.Error as e:
+            raise StorageError(f"Failed to open citation graph: {e}", storage_type="sqlite",
+                               resource_path=str(self.db_path))
+
+    def close(self):
+        self.conn.close()
+
+    # ------------------------------------------------------------------
+    # 本地论文库
+    # ------------------------------------------------------------------
+    def add_papers(self, papers: Iterable[Paper], day: str = None):
+        """登记 (或更新) 已打分的论文，作为引用解析的目标"""
+        self.conn.executemany(
+            "INSERT INTO papers (arxiv_id, title_hash, title, score, day) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(arxiv_id) DO UPDATE SET score = excluded.score, title = excluded.title, "
+            "title_hash = excluded.title_hash, day = COALESCE(excluded.day, papers.day)",
+            [(p.arxiv_id, title_hash(p.title), p.title, p.score, day) for p in papers])
+
+    def _sync_store(self) -> int:
+        """增量导入 daily_meta：只读取新增或修改过的存档文件"""
+        if not self.reports_dir.exists():
+            return 0
+        seen = dict(self.conn.execute("SELECT name, mtime FROM meta_files"))
+        imported = 0
+        for path in sorted(self.reports_dir.glob("*.json")):
+            mtime = path.stat().st_mtime
+            if seen.get(path.name) == mtime:
+                continue
+            try:
+                papers = load_papers(path)
+            except Exception as e:
+                logger.warning(f"⚠️ Skip unreadable report {path.name}: {e}")
+                continue
+            self.add_papers(papers, day=path.name[:10])
+            self.conn.execute("INSERT OR REPLACE INTO meta_files (name, mtime) VALUES (?, ?)", (path.name, mtime))
+            imported += len(papers)
+        return imported
+
+    # ------------------------------------------------------------------
+    # 建图
+    # ------------------------------------------------------------------
+    def _resolve(self, refs: List[str]) -> Dict[str, str]:
+        """引用 -> 本地 arxiv_id。显式 ID 即使本地还没有也保留 (以后打过分就能连上)"""
+        targets: Dict[str, str] = {}
+        for ref in refs:
+            for kind, key in reference_keys(ref):
+                if kind == "id":
+                    targets.setdefault(key, "id")
+                    break
+                row = self.conn.execute("SELECT arxiv_id FROM papers WHERE title_hash = ?", (key,)).fetchone()
+                if row:
+                    targets.setdefault(row[0], "title")
+                    break
+        return targets
+
+    def update(self, index: InboxIndex = None) -> Dict[str, int]:
+        """
+        增量更新：同步论文库，然后只处理新增 / 变化过的 PDF。
+        传入 InboxIndex 时优先复用索引里已解析的文本，不再重新解析 PDF。
+        """
+        stats = {"papers": self._sync_store(), "sources": 0, "edges": 0}
+        done = dict(self.conn.execute("SELECT path, mtime FROM sources"))
+
+        files = sorted(self.inbox_dir.glob("*.pdf")) if self.inbox_dir.exists() else []
+        for pdf_path in files:
+            mtime = pdf_path.stat().st_mtime
+            if done.get(str(pdf_path)) == mtime:
+                continue
+            m = INBOX_NAME.match(pdf_path.name)
+            if not m:
+                continue
+            src = arxiv_id_from_url(m.group("id"))
+            try:
+                text = index.document_text(pdf_path) if index else None
+                if text is None:
+                    text = self.pdf.parse_text(pdf_path)
+            except Exception as e:
+                logger.error(f"❌ Reference extraction failed for {pdf_path.name}: {e}")
+                continue
+
+            targets = self._resolve(extract_references(text))
+            targets.pop(src, None)  # 不要自环
+            self.conn.execute("DELETE FROM edges WHERE src = ?", (src,))
+            self.conn.executemany("INSERT OR IGNORE INTO edges (src, dst, via) VALUES (?, ?, ?)",
+                                  [(src, dst, via) for dst, via in targets.items()])
+            self.conn.execute("INSERT OR REPLACE INTO sources (path, src, mtime, refs) VALUES (?, ?, ?, ?)",
+                              (str(pdf_path), src, mtime, len(targets)))
+            stats["sources"] += 1
+            stats["edges"] += len(targets)
+
+        self.conn.commit()
+        logger.info(f"🕸️ Citation graph updated: {stats}")
+        return stats
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def cited_high_scores(self, src_ids: Iterable[str], min_score: float = 5.0) -> Dict[str, List[Dict[str, Any]]]:
+        """src_ids 中每篇论文引用了哪些 score >= min_score 的本地论文"""
+        src_ids = list(dict.fromkeys(src_ids))
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        # 回填一次可能有上万篇，分块查询，避免超出 SQLite 的绑定变量上限；同一个 src 只会落在一个分块里
+        for i in range(0, len(src_ids), _MAX_VARS):
+            chunk = src_ids[i:i + _MAX_VARS]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT e.src, p.arxiv_id, p.title, p.score, p.day FROM edges e "
+                f"JOIN papers p ON p.arxiv_id = e.dst "
+                f"WHERE e.src IN ({placeholders}) AND p.score >= ? ORDER BY p.score DESC",
+                (*chunk, min_score)).fetchall()
+            for src, dst, title, score, day in rows:
+                result.setdefault(src, []).append({"arxiv_id": dst, "title": title, "score": score, "day": day})
+        return result
+
+    def references(self, arxiv_id: str) -> List[str]:
+        return [r[0] for r in self.conn.execute("SELECT dst FROM edges WHERE src = ?", (arxiv_id,))]
+
+    def cited_by(self, arxiv_id: str) -> List[str]:
+        return [r[0] for r in self.conn.execute("SELECT src FROM edges WHERE dst = ?", (arxiv_id,))]
+
+    def boost_scores(self, papers: Iterable[Paper], min_score: float, boost: float, max_boost: float) -> int:
+        """
+        引用了高分论文的论文加分 (每条 +boost，总加分不超过 max_boost，总分不超过 5)。
+        不需要额外的 LLM 调用。返回被加分的论文数。
+        """
+        if boost <= 0:
+            return 0
+        papers = list(papers)
+        hits = self.cited_high_scores((p.arxiv_id for p in papers), min_score=min_score)
+        boosted = 0
+        for p in papers:
+            cited = hits.get(p.arxiv_id)
+            if not cited:
+                continue
+            bonus = min(max_boost, boost * len(cited))
+            new_score = min(5.0, p.score + bonus)
+            if new_score > p.score:
+                logger.info(f"   🔗 Boost +{new_score - p.score:.1f}: {p.title[:60]} (cites {len(cited)} high-score papers)")
+                p.score = new_score
+                boosted += 1
+        return boosted
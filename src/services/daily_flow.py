@@ -1,27 +1,58 @@
 import time
+import datetime
 import logging
 import json
 import math
-from typing import List, Dict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List
 from jinja2 import Environment, FileSystemLoader
 
 from src.core.config import GlobalConfig
+from src.core.logger import log_context, get_run_id
+from src.core.models import Paper, dump_papers, group_duplicates
+from src.core.profiler import StageProfiler, profile_dir_name
 from src.drivers.arxiv import ArxivDriver
+from src.drivers.oai import ArxivOAIDriver
 from src.drivers.llm import DeepSeekDriver
 from src.drivers.email import EmailDriver
 from src.drivers.pdf import PDFDriver
+from src.services.inbox_index import InboxIndex
+from src.services.citation_graph import CitationGraph
+from src.services.analytics import load_thresholds
+from src.services.cascade import ScoringCascade
+from src.services.dedup import NearDuplicateIndex
+from src.services.digest import DigestBuilder
+from src.services.watchlist import Watchlist
+from src.services.worker import (QueueWorker, SCORE, DOWNLOAD, batch_key,
+                                 merge_score_results, merge_download_results)
 from src.utils.file_utils import sanitize_filename, ensure_dir
 from src.utils.text_utils import normalize_list
 
 logger = logging.getLogger("service.daily")
 
 class DailyFlow:
-    def __init__(self):
+    def __init__(self, offline: bool = False, distributed: bool = None, profile: bool = False):
         self.config = GlobalConfig
-        self.arxiv = ArxivDriver()
+        # --profile：逐阶段 cProfile / tracemalloc / 峰值 RSS，产物写在当天 daily_meta 旁边
+        self.profiler = StageProfiler(
+            enabled=profile,
+            top_n=int(self.config.get('profile.top_n', 25)),
+            nframes=int(self.config.get('profile.tracemalloc_frames', 5)),
+        )
+        # 分布式模式：打分批次 / PDF 下载写入持久化队列，由任意数量的 `main.py worker` 领取执行
+        self.distributed = bool(self.config.get('queue.enabled', False)) if distributed is None else distributed
+        self.arxiv = ArxivDriver(offline=offline)
+        self.oai = ArxivOAIDriver()
         self.llm = DeepSeekDriver()
         self.email = EmailDriver()
         self.pdf = PDFDriver()
+        # 级联打分：快速模型初筛，强模型只复评不确定区间
+        self.cascade = ScoringCascade(self) if self.config.get('llm.cascade.enabled', False) else None
+        # 两阶段输出：打分只要 id / score，reason / summary_zh 只给邮件里会渲染的论文补
+        self.two_phase = bool(self.config.get('llm.two_phase.enabled', True))
+        # 作者 / 关键词监控名单：命中 include / exclude 的论文不进 LLM
+        self.watchlist = Watchlist() if self.config.get('watchlist.enabled', True) else None
         
         # 路径定义
         self.assets_dir = self.config.assets_path
@@ -34,12 +65,24 @@ class DailyFlow:
         ensure_dir(self.inbox_dir)
         ensure_dir(self.cache_dir)
 
+        # 阈值：settings.yaml 为默认值，analytics --apply 校准过的结果优先
+        self.thresholds = self._load_thresholds()
+
         # 模板引擎
         self.jinja_env = Environment(
             loader=FileSystemLoader(str(self.assets_dir)),
             autoescape=False # Prompt 不需要 HTML 转义
         )
 
+    def _load_thresholds(self) -> dict:
+        return load_thresholds()
+
+    @contextmanager
+    def _stage(self, name: str):
+        """日志上下文 + (启用时) 阶段性能采集"""
+        with log_context(stage=name), self.profiler.stage(name):
+            yield
+
     def _render(self, template_name: str, context: dict) -> str:
         """统一渲染函数"""
         try:
@@ -49,12 +92,18 @@ class DailyFlow:
             logger.error(f"❌ Template error ({template_name}): {e}")
             return ""
 
-    def _save_checkpoint(self, papers: List[Dict], date_str: str):
+    def _save_cascade_report(self, run: str):
+        """级联一致性统计单独存档，调区间时可以横向对比多天"""
+        out_dir = self.config.data_path / "reports" / "cascade"
+        ensure_dir(out_dir)
+        with open(out_dir / f"{run}_cascade.json", 'w', encoding='utf-8') as f:
+            json.dump(self.cascade.last_report, f, ensure_ascii=False, indent=2)
+
+    def _save_checkpoint(self, papers: List[Paper], date_str: str):
         ckpt_path = self.cache_dir / f"checkpoint_{date_str}.json"
-        with open(ckpt_path, 'w', encoding='utf-8') as f:
-            json.dump(papers, f, ensure_ascii=False, indent=2)
+        dump_papers(papers, ckpt_path)
 
-    def _batch_score_papers(self, papers: List[Dict], batch_size=30) -> List[Dict]:
+    def _scoring_prompt(self) -> str:
         context = {
             "user_profile": self.config.get('daily_news.user_profile', "General Computer Science"),
             "rubric": {
@@ -65,7 +114,11 @@ class DailyFlow:
                 "score_1": self.config.get('rubric.score_1', "N/A"),
             }
         }
-        system_prompt = self._render("prompts/daily_score.md.j2", context)
+        template = "prompts/daily_rank.md.j2" if self.two_phase else "prompts/daily_score.md.j2"
+        return self._render(template, context)
+
+    def _batch_score_papers(self, papers: List[Paper], batch_size=30) -> List[Paper]:
+        system_prompt = self._scoring_prompt()
 
         total_papers = len(papers)
         scored_results = []
@@ -76,63 +129,197 @@ class DailyFlow:
         for i in range(0, total_papers, batch_size):
             batch = papers[i : i + batch_size]
             batch_idx = i // batch_size + 1
-            
-            logger.info(f"⚡ Batch {batch_idx}/{num_batches} -> Start")
-            
-            # titles_preview = " | ".join([p['title'][:30]+"..." for p in batch])
-            # logger.info(f"⚡ Batch {batch_idx}/{num_batches} -> Processing: {titles_preview}")
+            with log_context(batch=batch_idx):
+                scored_results.extend(self._score_batch(batch, batch_idx, num_batches, system_prompt))
+            time.sleep(1.0)
 
-            user_content = "Please analyze these papers:\n\n"
-            for j, p in enumerate(batch):
-                user_content += f"ID: {j} | Title: {p['title']}\nAbstract: {p['summary']}\n---\n"
-            
+        return scored_results
+
+    def _score_batch(self, batch: List[Paper], batch_idx: int, num_batches: int, system_prompt: str) -> List[Paper]:
+        """给一个批次打分 (原地回填 score / reason / summary_zh)，失败时整批记 0 分"""
+        logger.info(f"⚡ Batch {batch_idx}/{num_batches} -> Start")
+
+        # titles_preview = " | ".join([p.title[:30]+"..." for p in batch])
+        # logger.info(f"⚡ Batch {batch_idx}/{num_batches} -> Processing: {titles_preview}")
+
+        try:
+            self._review_batch(batch, system_prompt)
+        except Exception as e:
+            logger.error(f"❌ Batch {batch_idx} failed: {e}")
+            # 出错也要保留原始数据，分数为0
+            self._mark_batch_failed(batch, str(e))
+
+        return batch
+
+    @staticmethod
+    def _mark_batch_failed(batch: List[Paper], error: str):
+        for p in batch:
+            p.score = 0.0
+            p.reason = f"Batch Error: {error}"
+
+    def _review_batch(self, batch: List[Paper], system_prompt: str) -> List[Paper]:
+        """调用 LLM 给一个批次打分并原地回填；LLM 调用失败直接抛出 (由调用方决定记 0 分还是交回队列重试)"""
+        user_content = "Please analyze these papers:\n\n"
+        for j, p in enumerate(batch):
+            user_content += f"ID: {j} | Title: {p.title}\nAbstract: {p.summary}\n---\n"
+
+        raw_json = self.llm.chat_json(system_prompt, user_content)
+        result_list = normalize_list(raw_json)
+
+        review_map = {}
+        for r in result_list:
+            raw_id = r.get('id')
             try:
-                raw_json = self.llm.chat_json(system_prompt, user_content)
-                result_list = normalize_list(raw_json)
-                
-                review_map = {}
-                for r in result_list:
-                    raw_id = r.get('id')
-                    try:
-                        if raw_id is not None:
-                            review_map[int(raw_id)] = r
-                    except ValueError:
-                        continue
-                
-                for local_id, p in enumerate(batch):
-                    review = review_map.get(local_id)
-                    if review:
-                        # 再次防护：防止 score 是 string
-                        try:
-                            p['score'] = float(review.get('score', 0))
-                        except ValueError:
-                            p['score'] = 0.0
-                            
-                        p['reason'] = review.get('reason', 'N/A')
-                        p['summary_zh'] = review.get('summary_zh', 'N/A')
-                        
-                        if p['score'] >= 4.0:
-                            logger.info(f"   🌟 HIT [{p['score']}]: {p['title']}")
-                    else:
-                        p['score'] = 0.0
-                        p['reason'] = "LLM missed this paper"
-                    
-                    scored_results.append(p)
+                if raw_id is not None:
+                    review_map[int(raw_id)] = r
+            except ValueError:
+                continue
 
-            except Exception as e:
-                logger.error(f"❌ Batch {batch_idx} failed: {e}")
-                # 出错也要保留原始数据，分数为0
-                for p in batch:
-                    p['score'] = 0.0
-                    p['reason'] = f"Batch Error: {str(e)}"
-                    scored_results.append(p)
-            
-            time.sleep(1.0)
+        for local_id, p in enumerate(batch):
+            review = review_map.get(local_id)
+            if review:
+                # 再次防护：防止 score 是 string
+                try:
+                    p.score = float(review.get('score', 0))
+                except ValueError:
+                    p.score = 0.0
 
-        return scored_results
+                p.reason = review.get('reason', 'N/A')
+                p.summary_zh = review.get('summary_zh', 'N/A')
 
-    def _download_high_scores(self, papers: List[Dict], threshold=4.0):
-        targets = [p for p in papers if p.get('score', 0) >= threshold]
+                if p.score >= self.thresholds["download_threshold"]:
+                    logger.info(f"   🌟 HIT [{p.score}]: {p.title}")
+            else:
+                p.score = 0.0
+                p.reason = "LLM missed this paper"
+
+        return batch
+
+    def _explain_high_scores(self, papers: List[Paper], eligible: List[Paper] = None):
+        """
+        两阶段打分的第二阶段：只给邮件里会渲染成卡片的论文补 reason / summary_zh，多批并发。
+        即去重后按分数排在前 top_k、且达到 min(report_threshold, send_threshold) 的代表；
+        eligible 给定时只补其中的论文。簇成员沿用代表的说明。失败只影响说明文字，分数保持不变。
+        """
+        threshold = min(self.thresholds["report_threshold"], self.thresholds["send_threshold"])
+        wanted = None if eligible is None else {id(p) for p in eligible}
+        primary, clusters = group_duplicates(papers)
+        rendered = sorted(primary, key=lambda p: p.score, reverse=True)[:self.thresholds["top_k"]]
+        todo = [p for p in rendered
+                if p.score >= threshold and p.summary_zh in (None, "", "N/A")
+                and not (p.reason or "").startswith("Batch Error")
+                and (wanted is None or id(p) in wanted)]
+        if not todo:
+            return
+
+        batch_size = int(self.config.get('llm.two_phase.explain_batch_size', 10))
+        batches = [todo[i : i + batch_size] for i in range(0, len(todo), batch_size)]
+        system_prompt = self._render("prompts/daily_explain.md.j2", {
+            "user_profile": self.config.get('daily_news.user_profile', "General Computer Science"),
+        })
+        logger.info(f"📝 Explain pass: {len(todo)}/{len(papers)} papers (top {len(rendered)} >= {threshold}) "
+                    f"in {len(batches)} batches.")
+
+        concurrency = int(self.config.get('llm.two_phase.concurrency', 4))
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as pool:
+            futures = {pool.submit(self._explain_batch, batch, idx, system_prompt): idx
+                       for idx, batch in enumerate(batches, 1)}
+            for fut in as_completed(futures):
+                try:
+                    fut.result()
+                except Exception as e:
+                    logger.error(f"❌ Explain batch {futures[fut]} failed (scores kept): {e}")
+
+        for p in todo:
+            for m in clusters.get(p.arxiv_id, []):
+                m.reason, m.summary_zh = p.reason, p.summary_zh
+
+    def _explain_batch(self, batch: List[Paper], batch_idx: int, system_prompt: str) -> List[Paper]:
+        with log_context(stage="score", batch=f"explain-{batch_idx}"):
+            user_content = "Explain these selected papers:\n\n"
+            for j, p in enumerate(batch):
+                user_content += f"ID: {j} | Score: {p.score} | Title: {p.title}\nAbstract: {p.summary}\n---\n"
+
+            for r in normalize_list(self.llm.chat_json(system_prompt, user_content)):
+                try:
+                    p = batch[int(r.get('id'))]
+                except (TypeError, ValueError, IndexError):
+                    continue
+                reason = r.get('reason', p.reason)
+                # 保留 LLM 之前的定分来源 (watchlist 命中词条)
+                p.reason = f"{p.reason} | {reason}" if (p.reason or "").startswith("Watchlist") else reason
+                p.summary_zh = r.get('summary_zh', p.summary_zh)
+        return batch
+
+    # ------------------------------------------------------------------
+    # 分布式模式 (协调者)
+    # ------------------------------------------------------------------
+    def _queue_score_papers(self, papers: List[Paper], run: str, worker: QueueWorker, batch_size=30) -> List[Paper]:
+        """
+        把打分批次写进队列，等所有批次结束后按 arxiv_id 合并结果。
+        批次键由论文 ID 决定：协调者中途崩溃后重跑，已完成的批次直接复用，不会重复消耗 Token。
+        """
+        system_prompt = self._scoring_prompt()
+        batches = {}
+        for i in range(0, len(papers), batch_size):
+            batch = papers[i : i + batch_size]
+            batches[batch_key(batch)] = batch
+        num_batches = len(batches)
+        items = [(key, {"batch_idx": idx, "num_batches": num_batches, "system_prompt": system_prompt,
+                        "papers": [p.to_dict() for p in batch]})
+                 for idx, (key, batch) in enumerate(batches.items(), 1)]
+
+        queue = worker.queue
+        queue.reset_failed(run, SCORE)
+        added = queue.enqueue(run, SCORE, items, max_attempts=int(self.config.get('queue.max_attempts', 3)))
+        logger.info(f"🧠 Scoring via queue: {len(papers)} papers in {num_batches} batches "
+                    f"({added} new jobs, run={run}).")
+
+        counts = worker.drain(run, SCORE, participate=self.config.get('queue.coordinator_works', True))
+        merge_score_results(papers, batches, queue.results(run, SCORE))
+        logger.info(f"✅ Scoring jobs finished: {counts}")
+        return papers
+
+    def _queue_download_high_scores(self, papers: List[Paper], run: str, worker: QueueWorker, threshold=4.0):
+        targets = [p for p in papers if p.score >= threshold]
+        if not targets:
+            logger.info("😴 No high-scoring papers to download.")
+            return
+
+        queue = worker.queue
+        queue.reset_failed(run, DOWNLOAD)
+        added = queue.enqueue(run, DOWNLOAD, [(p.arxiv_id, p.to_dict()) for p in targets],
+                              max_attempts=int(self.config.get('queue.max_attempts', 3)))
+        logger.info(f"📥 Downloading {len(targets)} high-score papers via queue ({added} new jobs)...")
+
+        worker.drain(run, DOWNLOAD, participate=self.config.get('queue.coordinator_works', True))
+        success_count = merge_download_results(targets, queue.results(run, DOWNLOAD))
+        logger.info(f"✅ Download Summary: {success_count}/{len(targets)} success.")
+
+    def _start_early_downloads(self, papers: List[Paper], run: str, worker: QueueWorker = None):
+        """
+        watchlist 收录的论文不等打分就开始下载：队列模式直接入队 (worker 空闲即可领取)，
+        单机模式在后台线程里下载，返回 Future；下载阶段先等它结束，已落盘的论文会被跳过。
+        """
+        if not papers:
+            return None
+        if worker:
+            added = worker.queue.enqueue(run, DOWNLOAD, [(p.arxiv_id, p.to_dict()) for p in papers],
+                                         max_attempts=int(self.config.get('queue.max_attempts', 3)))
+            logger.info(f"📥 Watchlist: {added} download jobs enqueued ahead of scoring.")
+            return None
+
+        def download():
+            with log_context(stage="download", batch="watchlist"):
+                self._download_high_scores(papers, threshold=float("-inf"))
+
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="watchlist-dl")
+        future = pool.submit(download)
+        pool.shutdown(wait=False)
+        return future
+
+    def _download_high_scores(self, papers: List[Paper], threshold=4.0):
+        targets = [p for p in papers if p.score >= threshold]
         
         if not targets:
             logger.info("😴 No high-scoring papers to download.")
@@ -142,42 +329,88 @@ class DailyFlow:
         
         success_count = 0
         for i, p in enumerate(targets):
-            arxiv_id = p['arxiv_url'].split('/')[-1]
-            safe_title = sanitize_filename(p['title'])
-            filename = f"[{arxiv_id}] {safe_title}.pdf"
-            save_path = self.inbox_dir / filename
-            
             prefix = f"[{i+1}/{len(targets)}]"
-            
             try:
-                if save_path.exists():
-                     logger.info(f"   ⏭️ {prefix} Skipped (Exists): {filename[:50]}...")
-                     p['local_path'] = str(save_path)
-                     success_count += 1
-                     continue
-
-                logger.info(f"   ⬇️ {prefix} Downloading: {filename[:50]}...")
-                final_path = self.pdf.download(p['pdf_url'], save_path)
-                
-                if final_path:
-                    p['local_path'] = str(final_path)
-                    success_count += 1
+                if self._download_one(p, prefix):
                     time.sleep(1)
-                    
+                success_count += 1
             except Exception as e:
                 logger.error(f"   ❌ {prefix} Failed: {e}")
 
         logger.info(f"✅ Download Summary: {success_count}/{len(targets)} success.")
 
+    def _inbox_path(self, p: Paper):
+        arxiv_id = p.arxiv_url.split('/')[-1]
+        safe_title = sanitize_filename(p.title)
+        return self.inbox_dir / f"[{arxiv_id}] {safe_title}.pdf"
+
+    def _download_one(self, p: Paper, prefix: str = "") -> bool:
+        """下载单篇到收件箱并回填 local_path。已存在返回 False，真正下载了返回 True；失败抛异常"""
+        save_path = self._inbox_path(p)
+        filename = save_path.name
+        if save_path.exists():
+            logger.info(f"   ⏭️ {prefix} Skipped (Exists): {filename[:50]}...")
+            p.local_path = str(save_path)
+            return False
+
+        logger.info(f"   ⬇️ {prefix} Downloading: {filename[:50]}...")
+        p.local_path = str(self.pdf.download(p.pdf_url, save_path))
+        return True
+
+    def _post_download(self, papers: List[Paper], date_str: str):
+        """
+        下载后的本地加工：全文索引增量更新 -> 引用图增量更新 -> 引用加分。
+        任何一步失败都只记日志，不影响日报。
+        """
+        index = None
+        try:
+            if self.config.get('index.auto_update', True):
+                index = InboxIndex(inbox_dir=self.inbox_dir)
+                index.update()
+
+            if self.config.get('citations.enabled', True):
+                graph = CitationGraph(inbox_dir=self.inbox_dir)
+                try:
+                    graph.add_papers(papers, day=date_str)
+                    graph.update(index=index)
+                    boosted = graph.boost_scores(
+                        papers,
+                        min_score=float(self.config.get('citations.min_score', 5.0)),
+                        boost=float(self.config.get('citations.boost', 0.0)),
+                        max_boost=float(self.config.get('citations.max_boost', 1.0))
+                    )
+                    if boosted:
+                        logger.info(f"🔗 Citation boost applied to {boosted} papers.")
+                finally:
+                    graph.close()
+        except Exception as e:
+            logger.error(f"❌ Post-download processing failed: {e}")
+        finally:
+            if index is not None:
+                index.close()
+
     def run(self, days_back=1, force_email=False, max_limit=None):
-        logger.info(f"🚀 === Daily Flow Started (Days: {days_back}) ===")
-        
+        logger.info(f"🚀 === Daily Flow Started (Days: {days_back}, Run: {get_run_id()}) ===")
+        date_str = time.strftime("%Y-%m-%d")
+        try:
+            self._run_daily(date_str, days_back, force_email, max_limit)
+        finally:
+            # 抓取失败 / 提前退出时也保留已经采到的阶段，方便定位
+            self.profiler.write(self.reports_dir / profile_dir_name(date_str, get_run_id(), "daily"),
+                                meta={"run_id": get_run_id(), "days_back": days_back, "limit": max_limit})
+
+    def _run_daily(self, date_str: str, days_back: int, force_email: bool, max_limit):
         # 1. Fetch
         subjects = self.config.get('daily_news.subjects', ['cs.CR'])
         query = " OR ".join([f"cat:{s}" for s in subjects])
+        fetch_mode = self.config.get('arxiv.fetch_mode', 'single')
         
         try:
-            papers = self.arxiv.search(query=query, days_back=days_back, limit=max_limit)
+            with self._stage("fetch"):
+                if fetch_mode == "sharded":
+                    papers = self.arxiv.search_sharded(subjects=subjects, days_back=days_back, limit=max_limit)
+                else:
+                    papers = self.arxiv.search(query=query, days_back=days_back, limit=max_limit)
         except Exception as e:
             logger.error(f"🛑 Fetch failed: {e}")
             return
@@ -186,48 +419,178 @@ class DailyFlow:
             logger.info("📭 No new papers found today.")
             return
 
+        self._process_papers(papers, date_str=date_str, meta_name=f"{date_str}_daily.json",
+                             force_email=force_email, max_limit=max_limit)
+
+        # 5. 当天结果并入本周 / 本月汇总 (只读今天的日报，之前的天不重算)
+        if self.config.get('digest.auto_update', True):
+            with self._stage("digest"):
+                try:
+                    DigestBuilder().update_all(datetime.date.fromisoformat(date_str))
+                except Exception as e:
+                    logger.error(f"❌ Digest update failed: {e}")
+
+        logger.info("🎉 === Daily Flow Complete ===")
+
+    def run_backfill(self, date_from: str, date_until: str, incremental=False, score=True,
+                     force_email=False, max_limit=None):
+        """
+        OAI-PMH 批量回填：抓取 (或复用已落盘的) 区间元数据，然后走与 daily 完全相同的打分/下载/存档流程。
+        回填默认不发邮件 (除非 force_email)，结果存为 {from}_{until}_backfill.json。
+        """
+        logger.info(f"🚀 === Backfill Started ({date_from or 'watermark'} ~ {date_until or 'today'}) ===")
+        try:
+            self._run_backfill(date_from, date_until, incremental, score, force_email, max_limit)
+        finally:
+            self.profiler.write(
+                self.reports_dir / profile_dir_name(time.strftime("%Y-%m-%d"), get_run_id(), "backfill"),
+                meta={"run_id": get_run_id(), "from": date_from, "until": date_until,
+                      "incremental": incremental, "limit": max_limit})
+
+    def _run_backfill(self, date_from: str, date_until: str, incremental: bool, score: bool,
+                      force_email: bool, max_limit):
+        subjects = self.config.get('daily_news.subjects', ['cs.CR'])
+
+        try:
+            with self._stage("fetch"):
+                if incremental:
+                    date_from, date_until = self.oai.harvest_incremental(date_until=date_until)
+                papers = self.oai.search_range(date_from, date_until, subjects=subjects)
+        except Exception as e:
+            logger.error(f"🛑 Harvest failed: {e}")
+            return
+
+        if not papers:
+            logger.info("📭 No papers in the requested range.")
+            return
+        if not score:
+            logger.info(f"💾 Harvest only: {len(papers)} papers kept on disk, scoring skipped.")
+            return
+
+        self._process_papers(papers, date_str=f"{date_from}_{date_until}",
+                             meta_name=f"{date_from}_{date_until}_backfill.json",
+                             force_email=force_email, max_limit=max_limit, send_email=force_email)
+
+        logger.info("🎉 === Backfill Complete ===")
+
+    def _process_papers(self, papers: List[Paper], date_str: str, meta_name: str,
+                        force_email=False, max_limit=None, send_email=True):
+        """打分 -> 下载 -> 存档 -> 邮件。daily 与 backfill 共用。"""
         # 防止后面 LLM 崩溃导致数据丢失，不需要重新爬 Arxiv
-        self._save_checkpoint(papers, time.strftime("%Y-%m-%d"))
+        self._save_checkpoint(papers, date_str)
         # logger.info(f"💾 Checkpoint saved: {len(papers)} papers cached.")
 
         if max_limit:
              papers = papers[:max_limit]
              logger.warning(f"✂️ DEV MODE: Limiting to {max_limit} papers.")
 
-        # 2. Score
-        logger.info("--- 🧠 Stage 2: Semantic Scoring ---")
-        scored_papers = self._batch_score_papers(papers, batch_size=30)
+        worker = QueueWorker(self) if self.distributed else None
+        dedup = None
+        try:
+            run = meta_name.rsplit(".", 1)[0]
+            if worker:
+                worker.queue.purge(float(self.config.get('queue.retention_days', 14)))
+
+            # 1.2 Watchlist: 命中 include / exclude 的论文直接定分，不进 LLM；include 的不等打分立刻开始下载
+            decisions, included, early = {}, [], None
+            candidates = papers
+            if self.watchlist:
+                with self._stage("watchlist"):
+                    included, excluded, decisions = self.watchlist.screen(papers)
+                    pinned = {id(p) for p in included + excluded}
+                    candidates = [p for p in papers if id(p) not in pinned]
+                    early = self._start_early_downloads(included, run, worker)
+
+            # 1.5 Near-duplicate clustering: 每个簇只给代表打分
+            dedup = NearDuplicateIndex() if self.config.get('dedup.enabled', True) else None
+            clusters = None
+            to_score = candidates
+            if dedup:
+                with self._stage("dedup"):
+                    clusters = dedup.cluster(candidates, day=date_str)
+                    to_score = dedup.to_score(clusters)
+
+            # 2. Score
+            with self._stage("score"):
+                logger.info("--- 🧠 Stage 2: Semantic Scoring ---")
+                if worker:
+                    strong = lambda ps: self._queue_score_papers(ps, run, worker, batch_size=30)
+                else:
+                    strong = lambda ps: self._batch_score_papers(ps, batch_size=30)
+                if not to_score:
+                    logger.info("♻️ Every paper was resolved from history or the watchlist, nothing to score.")
+                elif self.cascade:
+                    self.cascade.score(to_score, rescore=strong)
+                    self._save_cascade_report(run)
+                else:
+                    strong(to_score)
+                if dedup:
+                    dedup.apply(clusters)
+                # 历史里只存 LLM 给的分，不存 watchlist 加分 (否则明天的近重复会把加分当成 LLM 的分继承)
+                base_scores = {id(p): p.score for p in papers}
+                if decisions:
+                    # 簇成员也按自己的命中加分 (作者可能只出现在被替代的那个版本上)
+                    boosted = self.watchlist.apply_boosts(papers, decisions)
+                    if boosted:
+                        logger.info(f"👀 Watchlist boost applied to {boosted} papers.")
+                # 分数全部落定 (含历史 / 簇成员) 后才知道哪些论文会进邮件；
+                # watchlist 收录的论文没经过 LLM，关闭两阶段时也需要补 reason / summary_zh
+                self._explain_high_scores(papers, eligible=None if self.two_phase else included)
 
-        # 3. Download
-        logger.info("--- 📥 Stage 3: Asset Acquisition ---")
-        self._download_high_scores(scored_papers, threshold=4.0)
+            if dedup:
+                # 只记今天 LLM 真正打过分的簇；clusters 由 candidates 聚成，watchlist 定分的论文
+                # 不会进历史 (名单改了以后，它们的近重复版本应该重新交给 LLM)
+                dedup.remember(clusters, day=date_str, scores=base_scores)
+            scored_papers = papers
+
+            # 3. Download (当天簇内的重复成员不单独下载，邮件里挂在代表的卡片下)
+            downloadable, _ = group_duplicates(scored_papers)
+            with self._stage("download"):
+                logger.info("--- 📥 Stage 3: Asset Acquisition ---")
+                if early is not None:
+                    early.result()
+                if worker:
+                    self._queue_download_high_scores(downloadable, run, worker,
+                                                     threshold=self.thresholds["download_threshold"])
+                else:
+                    self._download_high_scores(downloadable, threshold=self.thresholds["download_threshold"])
+                # 内存模式的异步写盘 / 解析全部结束后再建索引
+                failed = set(self.pdf.flush())
+                for p in scored_papers:
+                    if p.local_path in failed:
+                        p.local_path = None
+                self._post_download(scored_papers, date_str)
+        finally:
+            # 任何阶段抛异常都要释放历史库和队列的连接
+            if dedup:
+                dedup.close()
+            if worker:
+                worker.queue.close()
 
         # 4. Report
-        scored_papers.sort(key=lambda x: x.get('score', 0), reverse=True)
-        
-        # Save Metadata
-        date_str = time.strftime("%Y-%m-%d")
-        meta_file = self.reports_dir / f"{date_str}_daily.json"
-        with open(meta_file, 'w', encoding='utf-8') as f:
-            json.dump(scored_papers, f, ensure_ascii=False, indent=2)
-        # logger.info(f"💾 Metadata saved to: {meta_file.name}")
-
-        # Email
-        high_quality_papers = [p for p in scored_papers if p.get('score', 0) >= 2.5]
-        if high_quality_papers or force_email:
-            logger.info(f"--- 📧 Stage 4: Reporting ({len(high_quality_papers)} candidates) ---")
-            self._send_daily_report(scored_papers)
-        else:
-            logger.info("--- 📧 Stage 4: Skipped (No high scores) ---")
+        with self._stage("report"):
+            scored_papers.sort(key=lambda x: x.score, reverse=True)
 
-        logger.info("🎉 === Daily Flow Complete ===")
+            # Save Metadata
+            meta_file = self.reports_dir / meta_name
+            dump_papers(scored_papers, meta_file)
+            # logger.info(f"💾 Metadata saved to: {meta_file.name}")
+
+            # Email
+            high_quality_papers = [p for p in scored_papers if p.score >= self.thresholds["report_threshold"]]
+            if send_email and (high_quality_papers or force_email):
+                logger.info(f"--- 📧 Stage 4: Reporting ({len(high_quality_papers)} candidates) ---")
+                self._send_daily_report(scored_papers)
+            else:
+                logger.info("--- 📧 Stage 4: Skipped (No high scores) ---")
 
-    def _send_daily_report(self, all_papers: List[Dict]):
-        send_threshold = self.email.conf.get('send_threshold', 3.0)
-        top_k = self.email.conf.get('top_k', 15)
+    def _send_daily_report(self, all_papers: List[Paper]):
+        send_threshold = self.thresholds["send_threshold"]
+        top_k = self.thresholds["top_k"]
         
-        display_papers = all_papers[:top_k]
-        hidden_count = len(all_papers) - len(display_papers)
+        primary, clusters = group_duplicates(all_papers)
+        display_papers = primary[:top_k]
+        hidden_count = len(primary) - len(display_papers)
         
         # 渲染邮件模板
         # 注意：templates/email_daily.html 的路径是相对于 assets 的
@@ -235,9 +598,10 @@ class DailyFlow:
             "date_str": time.strftime("%Y-%m-%d"),
             "total_count": len(all_papers),
             "display_papers": display_papers,
-            "hidden_count": hidden_count
+            "hidden_count": hidden_count,
+            "clusters": clusters
         })
         
-        subject = f"ScholarCore Daily: {len([p for p in all_papers if p.get('score',0)>=send_threshold])} Papers Selected"
+        subject = f"ScholarCore Daily: {len([p for p in all_papers if p.score>=send_threshold])} Papers Selected"
         
         self.email.send(subject, html)
\ No newline at end of file
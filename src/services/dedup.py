@@ -0,0 +1,279 @@
+# src/services/dedup.py
+import re
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from src.core.config import GlobalConfig
+from src.core.exceptions import StorageError
+from src.core.models import Paper
+from src.utils.file_utils import ensure_dir
+
+logger = logging.getLogger("service.dedup")
+
+_WORD = re.compile(r"[a-z0-9]+")
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    arxiv_id   TEXT PRIMARY KEY,
+    day        TEXT,
+    title      TEXT,
+    score      REAL,
+    reason     TEXT,
+    summary_zh TEXT,
+    sig        BLOB,
+    added_at   REAL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    band     INTEGER NOT NULL,
+    bucket   INTEGER NOT NULL,
+    arxiv_id TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, arxiv_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_bands_paper ON bands(arxiv_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def shingle_hashes(text: str, k: int = 3) -> np.ndarray:
+    """小写单词 k-gram 的 32 位哈希 (去重后)。crc32 跨进程稳定，历史库里的签名才能复用"""
+    words = _WORD.findall(text.lower())
+    if len(words) < k:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams)))
+
+
+class MinHasher:
+    """num_perm 个 (a*x + b) mod p 形式的哈希函数；种子固定，保证不同进程 / 不同天的签名可比"""
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, _MERSENNE, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, _MERSENNE, size=num_perm, dtype=np.uint64)
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        if len(hashes) == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        # [shingles, num_perm]，uint64 乘法溢出按模 2^64 回绕 (与 datasketch 的做法一致)
+        phv = ((np.outer(hashes, self.a) + self.b) % _MERSENNE) & _MAX_HASH
+        return phv.min(axis=0).astype(np.uint32)
+
+
+def estimated_jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.mean(sig_a == sig_b))
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+class Cluster:
+    """一组近重复论文：representative 参与打分，其余成员共享它的分数"""
+    __slots__ = ("representative", "members", "history")
+
+    def __init__(self, representative: Paper, members: List[Paper], history: Optional[Dict[str, Any]] = None):
+        self.representative = representative
+        self.members = members
+        self.history = history
+
+
+class NearDuplicateIndex:
+    """
+    标题 + 摘要 shingle 的 MinHash / LSH 近重复检测。
+    - 当天：LSH 分桶找候选对，签名估计的 Jaccard >= threshold 才合并 (并查集)，整体近似线性；
+    - 历史：最近 window_days 天打过分的论文的签名和 LSH 桶存在 SQLite 里，
+      命中历史的簇直接沿用历史分数，不再调用 LLM (v2 重发、workshop / 完整版等)。
+    """
+    def __init__(self, db_path: Path = None):
+        self.config = GlobalConfig
+        self.threshold = float(self.config.get('dedup.threshold', 0.7))
+        self.shingle_k = int(self.config.get('dedup.shingle_size', 3))
+        self.window_days = float(self.config.get('dedup.window_days', 30))
+        num_perm = int(self.config.get('dedup.num_perm', 128))
+        self.bands = int(self.config.get('dedup.bands', 16))
+        if num_perm % self.bands:
+            raise ValueError(f"dedup.num_perm ({num_perm}) must be divisible by dedup.bands ({self.bands})")
+        self.rows = num_perm // self.bands
+        self.hasher = MinHasher(num_perm)
+
+        self.db_path = db_path or self.config.data_path / "index" / "near_dup.db"
+        ensure_dir(self.db_path.parent)
+        try:
+            self.conn = sqlite3.connect(str(self.db_path))
+            self.conn.executescript(_SCHEMA)
+        except sqlite3.Error as e:
+            raise StorageError(f"Failed to open near-duplicate index: {e}", storage_type="sqlite",
+                               resource_path=str(self.db_path))
+        self._check_params(num_perm)
+
+    def close(self):
+        self.conn.close()
+
+    def _check_params(self, num_perm: int):
+        """签名参数变了，旧签名就不可比了：清空历史"""
+        params = f"{num_perm}/{self.bands}/{self.shingle_k}"
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+        if row and row[0] != params:
+            logger.warning(f"⚠️ MinHash parameters changed ({row[0]} -> {params}), resetting history.")
+            self.conn.execute("DELETE FROM papers")
+            self.conn.execute("DELETE FROM bands")
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('params', ?)", (params,))
+        self.conn.commit()
+
+    # ------------------------------------------------------------------
+    # 签名 / 分桶
+    # ------------------------------------------------------------------
+    def signature(self, p: Paper) -> np.ndarray:
+        return self.hasher.signature(shingle_hashes(f"{p.title} {p.summary}", self.shingle_k))
+
+    def _band_keys(self, sig: np.ndarray) -> List[int]:
+        """每个 band 的桶号 (有符号 64 位，直接存 SQLite INTEGER)"""
+        keys = []
+        for b in range(self.bands):
+            digest = hashlib.blake2b(sig[b * self.rows:(b + 1) * self.rows].tobytes(), digest_size=8).digest()
+            keys.append(int.from_bytes(digest, "big", signed=True))
+        return keys
+
+    # ------------------------------------------------------------------
+    # 聚类
+    # ------------------------------------------------------------------
+    def cluster(self, papers: List[Paper], day: str) -> List[Cluster]:
+        """把当天的论文聚成簇 (单篇也是一个簇)，并尝试匹配历史。day 相同的历史记录不参与匹配 (重跑当天)"""
+        start = time.time()
+        sigs = [self.signature(p) for p in papers]
+        keys = [self._band_keys(s) for s in sigs]
+
+        uf = _UnionFind(len(papers))
+        buckets: Dict[tuple, List[int]] = {}
+        for i, ks in enumerate(keys):
+            for b, k in enumerate(ks):
+                bucket = buckets.setdefault((b, k), [])
+                for j in bucket:
+                    if uf.find(i) != uf.find(j) and estimated_jaccard(sigs[i], sigs[j]) >= self.threshold:
+                        uf.union(i, j)
+                bucket.append(i)
+
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(papers)):
+            groups.setdefault(uf.find(i), []).append(i)
+
+        clusters = []
+        for idx in groups.values():
+            # 代表选最新提交的那篇 (通常是完整版 / 最新修订)
+            rep_i = max(idx, key=lambda i: papers[i].published_date or "")
+            members = [papers[i] for i in idx if i != rep_i]
+            history = self._match_history([(sigs[i], keys[i]) for i in idx], day)
+            clusters.append(Cluster(papers[rep_i], members, history))
+
+        dup = sum(len(c.members) for c in clusters)
+        hist = sum(1 for c in clusters if c.history)
+        logger.info(f"🧬 Near-duplicates: {len(papers)} papers -> {len(clusters)} clusters "
+                    f"({dup} in-day duplicates, {hist} matched history) in {time.time() - start:.2f}s")
+        return clusters
+
+    def _match_history(self, items: List[tuple], day: str) -> Optional[Dict[str, Any]]:
+        """簇内任一成员命中历史即可；返回 Jaccard 最高的那条历史记录"""
+        candidates = set()
+        for _sig, ks in items:
+            for b, k in enumerate(ks):
+                candidates.update(r[0] for r in self.conn.execute(
+                    "SELECT arxiv_id FROM bands WHERE band = ? AND bucket = ?", (b, k)))
+        if not candidates:
+            return None
+
+        best, best_j = None, self.threshold
+        placeholders = ",".join("?" * len(candidates))
+        for row in self.conn.execute(
+                f"SELECT arxiv_id, day, title, score, reason, summary_zh, sig FROM papers "
+                f"WHERE arxiv_id IN ({placeholders}) AND day != ?", (*candidates, day)):
+            hist_sig = np.frombuffer(row[6], dtype=np.uint32)
+            j = max(estimated_jaccard(sig, hist_sig) for sig, _ks in items)
+            if j >= best_j:
+                best, best_j = row, j
+        if best is None:
+            return None
+        return {"arxiv_id": best[0], "day": best[1], "title": best[2], "score": best[3],
+                "reason": best[4], "summary_zh": best[5], "jaccard": round(best_j, 3)}
+
+    @staticmethod
+    def to_score(clusters: List[Cluster]) -> List[Paper]:
+        """需要交给 LLM 的论文：没有命中历史的簇的代表"""
+        return [c.representative for c in clusters if not c.history]
+
+    @staticmethod
+    def apply(clusters: List[Cluster]):
+        """打分完成后：命中历史的簇沿用历史分数，簇成员共享代表的分数"""
+        for c in clusters:
+            rep = c.representative
+            if c.history:
+                # 历史上同一篇 (多天窗口重叠) 只复用分数；不同的论文记下来源，邮件里注明
+                h = c.history
+                rep.score = float(h["score"] or 0.0)
+                rep.reason = h["reason"]
+                rep.summary_zh = h["summary_zh"]
+                if h["arxiv_id"] != rep.arxiv_id:
+                    rep.duplicate_of = h["arxiv_id"]
+            for m in c.members:
+                m.score = rep.score
+                m.reason = rep.reason
+                m.summary_zh = rep.summary_zh
+                m.duplicate_of = rep.arxiv_id
+
+    # ------------------------------------------------------------------
+    # 历史窗口
+    # ------------------------------------------------------------------
+    def remember(self, clusters: List[Cluster], day: str, scores: Dict[int, float] = None):
+        """
+        把今天 LLM 打过分的簇 (代表 + 当天成员) 写入历史，并清理窗口外的记录。
+        命中历史的簇不再写入：否则 added_at 被刷新、day 被改成今天，旧分数会在窗口里无限续命。
+        打分失败的不记，免得把 0 分传下去。scores ({id(paper): 分数}) 给定时存它而不是 p.score (加分之前的分)。
+        """
+        now = time.time()
+        rows, band_rows = [], []
+        for p in (p for c in clusters if not c.history for p in [c.representative, *c.members]):
+            reason = p.reason or ""
+            if reason.startswith("Batch Error") or reason == "LLM missed this paper":
+                continue
+            sig = self.signature(p)
+            score = scores.get(id(p), p.score) if scores else p.score
+            rows.append((p.arxiv_id, day, p.title, score, p.reason, p.summary_zh, sig.tobytes(), now))
+            band_rows.extend((b, k, p.arxiv_id) for b, k in enumerate(self._band_keys(sig)))
+
+        self.conn.executemany("DELETE FROM bands WHERE arxiv_id = ?", [(r[0],) for r in rows])
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO papers (arxiv_id, day, title, score, reason, summary_zh, sig, added_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.executemany("INSERT OR IGNORE INTO bands (band, bucket, arxiv_id) VALUES (?, ?, ?)", band_rows)
+
+        cutoff = now - self.window_days * 86400
+        expired = [r[0] for r in self.conn.execute("SELECT arxiv_id FROM papers WHERE added_at < ?", (cutoff,))]
+        self.conn.executemany("DELETE FROM bands WHERE arxiv_id = ?", [(a,) for a in expired])
+        self.conn.execute("DELETE FROM papers WHERE added_at < ?", (cutoff,))
+        self.conn.commit()
+        logger.info(f"🧬 History updated: +{len(rows)} papers, -{len(expired)} expired "
+                    f"(window {self.window_days:g} days)")
@@ -0,0 +1,246 @@
+# src/services/digest.py
+import re
+import json
+import time
+import datetime as dt
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from jinja2 import Environment, FileSystemLoader
+
+from src.core.config import GlobalConfig
+from src.core.models import Paper, load_papers, group_duplicates
+from src.drivers.email import EmailDriver
+from src.services.analytics import load_thresholds
+from src.utils.file_utils import ensure_dir
+
+logger = logging.getLogger("service.digest")
+
+WEEK, MONTH = "week", "month"
+_DAILY_FILE = re.compile(r"^(\d{4}-\d{2}-\d{2})_daily\.json$")
+_STATE_VERSION = 1
+
+
+def period_of(day: dt.date, period: str) -> Tuple[str, dt.date, dt.date]:
+    """(周期键, 起始日, 结束日)。周按 ISO 周 (周一开始)，如 2026-W42；月如 2026-10"""
+    if period == WEEK:
+        year, week, weekday = day.isocalendar()
+        start = day - dt.timedelta(days=weekday - 1)
+        return f"{year}-W{week:02d}", start, start + dt.timedelta(days=6)
+    if period == MONTH:
+        start = day.replace(day=1)
+        end = (start + dt.timedelta(days=32)).replace(day=1) - dt.timedelta(days=1)
+        return f"{day.year}-{day.month:02d}", start, end
+    raise ValueError(f"Unknown digest period: {period}")
+
+
+class DigestBuilder:
+    """
+    从 data/reports/daily_meta 的日报存档增量汇总周报 / 月报，不重新抓取、不重新打分。
+
+    每个周期一个状态文件 (data/reports/digest/<key>.state.json)：
+    - days：已并入的日报及其 (mtime, size)。新的一天只读那一个文件；已并入的日报被改写过才整期重建；
+    - daily / categories：逐日、逐分类的计数与分数和；
+    - seen：本期出现过的 arxiv_id，重复出现 (--days N 重叠、重跑) 的论文只计一次；
+    - pool：达到 report_threshold 且有说明的候选 (同一篇保留最高分那次)，top_k 从这里选。
+    """
+    def __init__(self):
+        self.config = GlobalConfig
+        self.reports_dir = self.config.data_path / "reports" / "daily_meta"
+        self.output_dir = self.config.data_path / "reports" / "digest"
+        ensure_dir(self.output_dir)
+        self.thresholds = load_thresholds()
+        self.pool_limit = int(self.config.get('digest.pool_limit', 500))
+        self.jinja_env = Environment(loader=FileSystemLoader(str(self.config.assets_path)), autoescape=False)
+
+    # ------------------------------------------------------------------
+    # 增量状态
+    # ------------------------------------------------------------------
+    def _state_path(self, key: str) -> Path:
+        return self.output_dir / f"{key}.state.json"
+
+    def _empty_state(self, period: str, key: str, start: dt.date, end: dt.date) -> Dict[str, Any]:
+        return {"version": _STATE_VERSION, "period": period, "key": key,
+                "start": start.isoformat(), "end": end.isoformat(),
+                "days": {}, "daily": {}, "categories": {}, "seen": [], "pool": {}}
+
+    def _load_state(self, period: str, key: str, start: dt.date, end: dt.date) -> Dict[str, Any]:
+        path = self._state_path(key)
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get("version") == _STATE_VERSION:
+                    return state
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Digest state unreadable ({path.name}), rebuilding: {e}")
+        return self._empty_state(period, key, start, end)
+
+    def _save_state(self, state: Dict[str, Any]):
+        path = self._state_path(state["key"])
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        tmp.replace(path)
+
+    def _daily_files(self, start: dt.date, end: dt.date) -> Dict[str, Path]:
+        files = {}
+        for f in self.reports_dir.glob("*_daily.json"):
+            m = _DAILY_FILE.match(f.name)
+            if m and start.isoformat() <= m.group(1) <= end.isoformat():
+                files[m.group(1)] = f
+        return dict(sorted(files.items()))
+
+    @staticmethod
+    def _signature(path: Path) -> List[float]:
+        st = path.stat()
+        return [st.st_mtime, st.st_size]
+
+    def _fold_day(self, state: Dict[str, Any], day: str, path: Path, seen: set):
+        """把一天的日报并入状态"""
+        papers = load_papers(path)
+        send_t = self.thresholds["send_threshold"]
+        download_t = self.thresholds["download_threshold"]
+        pool_min = float(self.config.get('digest.min_score', self.thresholds["report_threshold"]))
+
+        stats = {"total": 0, "hits": 0, "downloads": 0, "score_sum": 0.0, "repeats": 0}
+        categories = state["categories"]
+        pool = state["pool"]
+        for p in papers:
+            pid = p.arxiv_id
+            # 两阶段打分只给当天邮件里的卡片补了说明，没有说明的论文不进候选池 (卡片会是 N/A)
+            explained = p.summary_zh not in (None, "", "N/A")
+            if p.score >= pool_min and explained and (pid not in pool or p.score > pool[pid]["score"]):
+                pool[pid] = {**p.to_dict(), "day": pool.get(pid, {}).get("day", day)}
+            if pid in seen:
+                stats["repeats"] += 1
+                continue
+            seen.add(pid)
+            stats["total"] += 1
+            stats["score_sum"] += p.score
+            stats["hits"] += p.score >= send_t
+            stats["downloads"] += p.score >= download_t
+            for c in p.categories:
+                cat = categories.setdefault(c, {"total": 0, "hits": 0, "score_sum": 0.0})
+                cat["total"] += 1
+                cat["hits"] += p.score >= send_t
+                cat["score_sum"] += p.score
+
+        if len(pool) > self.pool_limit:
+            keep = sorted(pool.items(), key=lambda kv: kv[1]["score"], reverse=True)[:self.pool_limit]
+            state["pool"] = dict(keep)
+        state["daily"][day] = stats
+        state["days"][day] = self._signature(path)
+
+    def update(self, period: str, day: dt.date = None, rebuild: bool = False) -> Dict[str, Any]:
+        """并入周期内尚未处理的日报，返回最新状态"""
+        day = day or dt.date.today()
+        key, start, end = period_of(day, period)
+        state = self._empty_state(period, key, start, end) if rebuild else self._load_state(period, key, start, end)
+
+        files = self._daily_files(start, end)
+        changed = [d for d, f in files.items() if d in state["days"] and state["days"][d] != self._signature(f)]
+        removed = [d for d in state["days"] if d not in files]
+        if changed or removed:
+            logger.info(f"♻️ Digest {key}: {len(changed) + len(removed)} daily report(s) changed since folded, rebuilding.")
+            state = self._empty_state(period, key, start, end)
+
+        new_days = [d for d in files if d not in state["days"]]
+        if not new_days:
+            logger.info(f"📚 Digest {key}: up to date ({len(state['days'])} days).")
+            return state
+
+        seen = set(state["seen"])
+        for d in new_days:
+            self._fold_day(state, d, files[d], seen)
+        state["seen"] = sorted(seen)
+        state["updated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        self._save_state(state)
+        logger.info(f"📚 Digest {key}: folded {len(new_days)} new day(s) "
+                    f"({len(state['days'])} days, {len(seen)} papers, pool {len(state['pool'])}).")
+        return state
+
+    def update_all(self, day: dt.date = None):
+        """日报结束后调用：把当天并入本周和本月"""
+        for period in (WEEK, MONTH):
+            self.update(period, day)
+
+    # ------------------------------------------------------------------
+    # 汇总 / 渲染
+    # ------------------------------------------------------------------
+    def _previous_state(self, period: str, start: dt.date) -> Optional[Dict[str, Any]]:
+        key, _, _ = period_of(start - dt.timedelta(days=1), period)
+        path = self._state_path(key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def summarize(self, state: Dict[str, Any], top_k: int = None) -> Dict[str, Any]:
+        period = state["period"]
+        top_k = top_k or int(self.config.get(f'digest.top_k.{period}', 20 if period == WEEK else 40))
+        num_days = max(len(state["days"]), 1)
+
+        papers = sorted((Paper.from_dict(d) for d in state["pool"].values()), key=lambda p: p.score, reverse=True)
+        primary, clusters = group_duplicates(papers)
+
+        prev = self._previous_state(period, dt.date.fromisoformat(state["start"]))
+        prev_cats = prev["categories"] if prev else {}
+        prev_days = max(len(prev["days"]), 1) if prev else 1
+        categories = []
+        for name, c in state["categories"].items():
+            hits_per_day = c["hits"] / num_days
+            p = prev_cats.get(name)
+            categories.append({
+                "name": name, "total": c["total"], "hits": c["hits"],
+                "mean": c["score_sum"] / c["total"] if c["total"] else 0.0,
+                "hits_per_day": hits_per_day,
+                "delta": (hits_per_day - (p["hits"] / prev_days if p else 0.0)) if prev else None,
+            })
+        categories.sort(key=lambda c: (c["hits"], c["total"]), reverse=True)
+
+        days = [{"day": d, "total": s["total"], "hits": s["hits"], "downloads": s["downloads"],
+                 "mean": s["score_sum"] / s["total"] if s["total"] else 0.0}
+                for d, s in sorted(state["daily"].items())]
+        return {
+            "period": period,
+            "period_title": "Weekly" if period == WEEK else "Monthly",
+            "period_key": state["key"],
+            "start": state["start"],
+            "end": state["end"],
+            "previous_key": prev["key"] if prev else None,
+            "send_threshold": self.thresholds["send_threshold"],
+            "total_count": len(state["seen"]),
+            "hit_count": sum(s["hits"] for s in state["daily"].values()),
+            "merged_count": sum(s["repeats"] for s in state["daily"].values()) + sum(map(len, clusters.values())),
+            "display_papers": primary[:top_k],
+            "clusters": clusters,
+            "categories": categories,
+            "days": days,
+        }
+
+    def render(self, summary: Dict[str, Any]) -> str:
+        return self.jinja_env.get_template("templates/email_digest.html").render(**summary)
+
+    def run(self, period: str, day: dt.date = None, rebuild: bool = False, send: bool = False,
+            top_k: int = None) -> Optional[Path]:
+        state = self.update(period, day, rebuild=rebuild)
+        if not state["days"]:
+            logger.info(f"📭 No daily reports in {state['key']} yet.")
+            return None
+
+        summary = self.summarize(state, top_k=top_k)
+        out_path = self.output_dir / f"{state['key']}_digest.html"
+        out_path.write_text(self.render(summary), encoding='utf-8')
+        logger.info(f"📰 Digest {state['key']}: {len(summary['display_papers'])} papers, "
+                    f"{len(summary['categories'])} categories -> {out_path}")
+
+        if send:
+            subject = (f"ScholarCore {summary['period_title']} {state['key']}: "
+                       f"Top {len(summary['display_papers'])} of {summary['total_count']} Papers")
+            EmailDriver().send(subject, out_path.read_text(encoding='utf-8'))
+        return out_path
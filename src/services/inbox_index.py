@@ -0,0 +1,202 @@
+# src/services/inbox_index.py
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from src.core.config import GlobalConfig
+from src.core.exceptions import StorageError
+from src.drivers.pdf import PDFDriver
+from src.utils.file_utils import ensure_dir
+
+logger = logging.getLogger("service.index")
+
+# 收件箱文件名格式：[2401.12345v1] Some Title.pdf (见 DailyFlow._download_high_scores)
+INBOX_NAME = re.compile(r"^\[(?P<id>[^\]]+)\]\s*(?P<title>.*)\.pdf$", re.IGNORECASE)
+# 每篇文档最多占用的 rowid 区间：pages_fts.rowid = doc_id * PAGE_STRIDE + page
+PAGE_STRIDE = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id     INTEGER PRIMARY KEY,
+    path       TEXT UNIQUE NOT NULL,
+    arxiv_id   TEXT,
+    title      TEXT,
+    mtime      REAL,
+    size       INTEGER,
+    sha1       TEXT,
+    pages      INTEGER,
+    indexed_at REAL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    title, body, doc_id UNINDEXED, page UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def _file_sha1(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class InboxIndex:
+    """
+    收件箱 PDF 的全文索引 (SQLite FTS5)。
+    - 以页为单位存倒排，查询用 BM25 排序并返回高亮片段；
+    - 增量更新：mtime/size 没变直接跳过，变了再比对 sha1，只有内容变了才重新解析；
+    - 查询时只读索引，绝不重新解析 PDF。
+    """
+    def __init__(self, db_path: Path = None, inbox_dir: Path = None):
+        self.config = GlobalConfig
+        self.inbox_dir = inbox_dir or self.config.data_path / "inbox"
+        self.db_path = db_path or self.config.data_path / "index" / "inbox.db"
+        ensure_dir(self.db_path.parent)
+        self.pdf = PDFDriver()
+        try:
+            self.conn = sqlite3.connect(str(self.db_path))
+            self.conn.executescript(_SCHEMA)
+        except sqlite3.Error as e:
+            raise StorageError(f"Failed to open search index: {e}", storage_type="sqlite",
+                               resource_path=str(self.db_path))
+
+    def close(self):
+        self.conn.close()
+
+    # ------------------------------------------------------------------
+    # 建索引
+    # ------------------------------------------------------------------
+    def _delete_pages(self, doc_id: int):
+        lo = doc_id * PAGE_STRIDE
+        self.conn.execute("DELETE FROM pages_fts WHERE rowid BETWEEN ? AND ?", (lo, lo + PAGE_STRIDE - 1))
+
+    def index_file(self, pdf_path: Path, known: Optional[tuple] = None) -> str:
+        """
+        索引单个 PDF。返回 'new' / 'updated' / 'touched' (只改了 mtime) / 'skipped'。
+        known 是 documents 表里的现有记录 (没有就是 None)。
+        """
+        stat = pdf_path.stat()
+        if known and known[1] == stat.st_mtime and known[2] == stat.st_size:
+            return "skipped"
+
+        # 内存模式下载时已经从缓冲区解析过，直接用，不再从磁盘读回
+        handoff = PDFDriver.take_handoff(pdf_path, stat.st_size)
+        sha1 = handoff[0] if handoff else _file_sha1(pdf_path)
+        if known and known[3] == sha1:
+            self.conn.execute("UPDATE documents SET mtime = ?, size = ? WHERE doc_id = ?",
+                              (stat.st_mtime, stat.st_size, known[0]))
+            return "touched"
+
+        m = INBOX_NAME.match(pdf_path.name)
+        arxiv_id, title = (m.group("id"), m.group("title")) if m else (None, pdf_path.stem)
+
+        pages = (handoff[1] if handoff else self.pdf.parse_pages(pdf_path))[:PAGE_STRIDE]
+
+        if known:
+            doc_id = known[0]
+            self._delete_pages(doc_id)
+            self.conn.execute(
+                "UPDATE documents SET arxiv_id=?, title=?, mtime=?, size=?, sha1=?, pages=?, indexed_at=? "
+                "WHERE doc_id=?",
+                (arxiv_id, title, stat.st_mtime, stat.st_size, sha1, len(pages), time.time(), doc_id))
+        else:
+            cur = self.conn.execute(
+                "INSERT INTO documents (path, arxiv_id, title, mtime, size, sha1, pages, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(pdf_path), arxiv_id, title, stat.st_mtime, stat.st_size, sha1, len(pages), time.time()))
+            doc_id = cur.lastrowid
+
+        self.conn.executemany(
+            "INSERT INTO pages_fts (rowid, title, body, doc_id, page) VALUES (?, ?, ?, ?, ?)",
+            [(doc_id * PAGE_STRIDE + i, title if i == 0 else "", text, doc_id, i + 1)
+             for i, text in enumerate(pages)])
+        return "updated" if known else "new"
+
+    def update(self, rebuild: bool = False) -> Dict[str, int]:
+        """增量同步整个收件箱：新增 / 变化的重建，被删掉的文件从索引移除"""
+        if rebuild:
+            self.conn.execute("DELETE FROM pages_fts")
+            self.conn.execute("DELETE FROM documents")
+
+        known = {row[0]: row[1:] for row in self.conn.execute(
+            "SELECT path, doc_id, mtime, size, sha1 FROM documents")}
+        stats = {"new": 0, "updated": 0, "touched": 0, "skipped": 0, "removed": 0, "failed": 0}
+
+        files = sorted(self.inbox_dir.glob("*.pdf")) if self.inbox_dir.exists() else []
+        for pdf_path in files:
+            try:
+                result = self.index_file(pdf_path, known.pop(str(pdf_path), None))
+                stats[result] += 1
+                if result in ("new", "updated"):
+                    self.conn.commit()  # 每个文件提交一次，中途中断也不丢已完成的部分
+            except Exception as e:
+                stats["failed"] += 1
+                logger.error(f"❌ Index failed for {pdf_path.name}: {e}")
+
+        for path, (doc_id, *_rest) in known.items():
+            self._delete_pages(doc_id)
+            self.conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            stats["removed"] += 1
+
+        self.conn.commit()
+        logger.info(f"🗂️ Index updated: {stats}")
+        return stats
+
+    def document_text(self, pdf_path: Path) -> Optional[str]:
+        """
+        从索引里取回已解析的全文 (文件未变化时)，给引用抽取等下游复用，避免二次解析 PDF。
+        索引里没有或文件已变化则返回 None。
+        """
+        row = self.conn.execute("SELECT doc_id, mtime, size FROM documents WHERE path = ?",
+                                (str(pdf_path),)).fetchone()
+        if row is None:
+            return None
+        stat = pdf_path.stat()
+        if row[1] != stat.st_mtime or row[2] != stat.st_size:
+            return None
+        lo = row[0] * PAGE_STRIDE
+        bodies = self.conn.execute("SELECT body FROM pages_fts WHERE rowid BETWEEN ? AND ? ORDER BY rowid",
+                                   (lo, lo + PAGE_STRIDE - 1)).fetchall()
+        return "\n".join(b[0] for b in bodies)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _quote(query: str) -> str:
+        """把用户输入转成安全的 FTS5 查询：每个词当作短语，隐式 AND"""
+        return " ".join('"{}"'.format(t.replace('"', '""')) for t in query.split())
+
+    def search(self, query: str, limit: int = 10, highlight=("[", "]")) -> List[Dict[str, Any]]:
+        """
+        BM25 排序 (标题权重 10，正文 1)，每篇文档只保留得分最高的一页。
+        先按原样当 FTS5 语法执行 (支持 AND/OR/NEAR/前缀*)，语法错误时退化为逐词短语匹配。
+        """
+        sql = (
+            "SELECT d.path, d.arxiv_id, d.title, p.page, bm25(pages_fts, 10.0, 1.0) AS rank, "
+            "snippet(pages_fts, 1, ?, ?, '…', 16) "
+            "FROM pages_fts p JOIN documents d ON d.doc_id = p.doc_id "
+            "WHERE pages_fts MATCH ? ORDER BY rank LIMIT ?"
+        )
+        params = (highlight[0], highlight[1])
+        try:
+            rows = self.conn.execute(sql, params + (query, limit * 5)).fetchall()
+        except sqlite3.OperationalError:
+            rows = self.conn.execute(sql, params + (self._quote(query), limit * 5)).fetchall()
+
+        results, seen = [], set()
+        for path, arxiv_id, title, page, rank, snippet in rows:
+            if path in seen:
+                continue
+            seen.add(path)
+            results.append({"path": path, "arxiv_id": arxiv_id, "title": title, "page": page,
+                            "score": round(-rank, 3), "snippet": " ".join(snippet.split())})
+            if len(results) >= limit:
+                break
+        return results
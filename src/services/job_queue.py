@@ -0,0 +1,206 @@
+# src/services/job_queue.py
+import json
+import time
+import sqlite3
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable
+
+from src.core.config import GlobalConfig
+from src.core.exceptions import StorageError
+from src.utils.file_utils import ensure_dir
+
+logger = logging.getLogger("service.queue")
+
+PENDING, LEASED, DONE, FAILED = "pending", "leased", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY,
+    run          TEXT NOT NULL,
+    kind         TEXT NOT NULL,
+    key          TEXT NOT NULL,
+    payload      TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'pending',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    lease_owner  TEXT,
+    lease_until  REAL NOT NULL DEFAULT 0,
+    result       TEXT,
+    error        TEXT,
+    created_at   REAL,
+    updated_at   REAL,
+    UNIQUE (run, kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, lease_until);
+CREATE INDEX IF NOT EXISTS idx_jobs_run ON jobs(run, kind, status);
+"""
+
+
+class Job:
+    """从队列里领到的一个任务 (只读快照)"""
+    __slots__ = ("id", "run", "kind", "key", "payload", "attempts", "max_attempts")
+
+    def __init__(self, id: int, run: str, kind: str, key: str, payload: Dict[str, Any],
+                 attempts: int, max_attempts: int):
+        self.id = id
+        self.run = run
+        self.kind = kind
+        self.key = key
+        self.payload = payload
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.kind}:{self.key}, run={self.run}, try {self.attempts}/{self.max_attempts})"
+
+
+class JobQueue:
+    """
+    基于 SQLite 的持久化任务队列 (租约 / 可见性超时)。
+    - 入队幂等：(run, kind, key) 唯一，协调者重启后重复入队不会产生重复任务，已完成的结果直接复用；
+    - 领取任务在 BEGIN IMMEDIATE 事务里完成，多个进程 (或共享存储上的多台机器) 不会领到同一个任务；
+    - 租约到期未完成 (worker 崩溃 / 断网) 的任务自动重新可见；
+    - complete / fail 只对仍持有租约的 worker 生效，迟到的结果被丢弃，保证每个任务只落一次结果。
+    """
+    def __init__(self, db_path: Path = None):
+        self.config = GlobalConfig
+        self.db_path = db_path or self.config.data_path / self.config.get('queue.db', 'queue/jobs.db')
+        ensure_dir(self.db_path.parent)
+        try:
+            # isolation_level=None：事务由我们显式 BEGIN，避免 sqlite3 模块隐式开事务
+            self.conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            self.conn.execute(f"PRAGMA journal_mode={self.config.get('queue.journal_mode', 'WAL')}")
+            self.conn.execute("PRAGMA busy_timeout=30000")
+            self.conn.executescript(_SCHEMA)
+        except sqlite3.Error as e:
+            raise StorageError(f"Failed to open job queue: {e}", storage_type="sqlite",
+                               resource_path=str(self.db_path))
+
+    def close(self):
+        self.conn.close()
+
+    # ------------------------------------------------------------------
+    # 协调者
+    # ------------------------------------------------------------------
+    def enqueue(self, run: str, kind: str, items: Iterable[tuple], max_attempts: int = 3) -> int:
+        """批量入队 [(key, payload), ...]。已存在的 (run, kind, key) 保持原样。返回新增数量"""
+        now = time.time()
+        rows = [(run, kind, key, json.dumps(payload, ensure_ascii=False), max_attempts, now, now)
+                for key, payload in items]
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (run, kind, key, payload, max_attempts, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            added = self.conn.total_changes - before
+            self.conn.execute("COMMIT")
+        except sqlite3.Error:
+            self.conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def counts(self, run: str, kind: str = None) -> Dict[str, int]:
+        sql = "SELECT status, COUNT(*) FROM jobs WHERE run = ?"
+        params = [run]
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(self.conn.execute(sql + " GROUP BY status", params)))
+        return counts
+
+    def results(self, run: str, kind: str) -> Dict[str, Dict[str, Any]]:
+        """key -> {"status", "result", "error"}，只含已结束 (done / failed) 的任务"""
+        out = {}
+        for key, status, result, error in self.conn.execute(
+                "SELECT key, status, result, error FROM jobs WHERE run = ? AND kind = ? AND status IN (?, ?)",
+                (run, kind, DONE, FAILED)):
+            out[key] = {"status": status, "result": json.loads(result) if result else None, "error": error}
+        return out
+
+    def reset_failed(self, run: str, kind: str = None) -> int:
+        """把失败任务放回队列 (重新给满重试次数)，用于协调者重跑"""
+        sql = "UPDATE jobs SET status = ?, attempts = 0, error = NULL, updated_at = ? WHERE run = ? AND status = ?"
+        params = [PENDING, time.time(), run, FAILED]
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        return self.conn.execute(sql, params).rowcount
+
+    def purge(self, older_than_days: float) -> int:
+        """清理早已结束的任务，防止队列库无限增长"""
+        cutoff = time.time() - older_than_days * 86400
+        return self.conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                                 (DONE, FAILED, cutoff)).rowcount
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def claim(self, worker_id: str, lease_seconds: float, kinds: Optional[List[str]] = None,
+              run: str = None) -> Optional[Job]:
+        """领取一个可见的任务 (pending 且已到可见时间，或租约过期的 leased)，没有则返回 None"""
+        now = time.time()
+        where = "((status = ? AND lease_until <= ?) OR (status = ? AND lease_until < ?))"
+        params: list = [PENDING, now, LEASED, now]
+        if kinds:
+            where += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params += list(kinds)
+        if run:
+            where += " AND run = ?"
+            params.append(run)
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 租约过期且次数已用完的任务 (worker 反复崩在同一个任务上) 直接判失败，不再派发
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, error = COALESCE(error, 'lease expired'), updated_at = ? "
+                "WHERE status = ? AND lease_until < ? AND attempts >= max_attempts",
+                (FAILED, now, LEASED, now))
+            row = self.conn.execute(
+                f"SELECT id, run, kind, key, payload, attempts, max_attempts FROM jobs "
+                f"WHERE {where} ORDER BY id LIMIT 1", params).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_until = ?, "
+                "updated_at = ? WHERE id = ?",
+                (LEASED, worker_id, now + lease_seconds, now, row[0]))
+            self.conn.execute("COMMIT")
+        except sqlite3.Error:
+            self.conn.execute("ROLLBACK")
+            raise
+        job_id, run_, kind, key, payload, attempts, max_attempts = row
+        return Job(job_id, run_, kind, key, json.loads(payload), attempts + 1, max_attempts)
+
+    def heartbeat(self, job: Job, worker_id: str, lease_seconds: float) -> bool:
+        """续租。返回 False 表示租约已经丢了 (被别的 worker 接手)"""
+        cur = self.conn.execute(
+            "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+            (time.time() + lease_seconds, time.time(), job.id, LEASED, worker_id))
+        return cur.rowcount == 1
+
+    def complete(self, job: Job, worker_id: str, result: Any) -> bool:
+        cur = self.conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = 0, updated_at = ? "
+            "WHERE id = ? AND status = ? AND lease_owner = ?",
+            (DONE, json.dumps(result, ensure_ascii=False), time.time(), job.id, LEASED, worker_id))
+        if cur.rowcount != 1:
+            logger.warning(f"⚠️ Lost lease on {job}, result discarded (another worker owns it).")
+            return False
+        return True
+
+    def fail(self, job: Job, worker_id: str, error: str, retryable: bool = True, delay: float = 0.0) -> bool:
+        """
+        记录失败。可重试且还有次数时放回队列，delay 秒后才重新可见 (退避 / Retry-After)；
+        否则判定为最终失败。
+        """
+        final = not retryable or job.attempts >= job.max_attempts
+        cur = self.conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_until = ?, updated_at = ? "
+            "WHERE id = ? AND status = ? AND lease_owner = ?",
+            (FAILED if final else PENDING, error, 0 if final else time.time() + delay, time.time(),
+             job.id, LEASED, worker_id))
+        return cur.rowcount == 1
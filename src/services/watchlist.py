@@ -0,0 +1,236 @@
+# src/services/watchlist.py
+import re
+import logging
+import unicodedata
+from bisect import bisect_right
+from collections import deque
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+from src.core.config import GlobalConfig
+from src.core.models import Paper
+
+logger = logging.getLogger("service.watchlist")
+
+INCLUDE, EXCLUDE, BOOST = "include", "exclude", "boost"
+FIELDS = ("title", "abstract", "authors")
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+# 字段之间 / 作者之间的分隔符：归一化后的文本里不会出现，词条也不会跨过它
+_FIELD_SEP, _AUTHOR_SEP = " \x01 ", " \x02 "
+
+
+def normalize(text: str) -> str:
+    """去重音、小写、非字母数字折叠为单个空格，首尾补空格 (词条两端的空格即词边界："rpki" 不会命中 "rpkix")"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return f" {_NON_WORD.sub(' ', text).strip()} "
+
+
+class AhoCorasick:
+    """
+    多模式串匹配自动机：所有词条建一棵 trie 加失败指针，一次扫描文本找出全部 (可重叠的) 命中，
+    耗时与文本长度和命中数成正比，与词条数量无关。
+    """
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Any]] = [[]]
+        self._built = False
+
+    def __len__(self):
+        return len(self._goto)
+
+    def add(self, word: str, value: Any):
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(value)
+        self._built = False
+
+    def build(self):
+        """BFS 计算失败指针，并把失败链上的输出合并到每个节点"""
+        queue = deque(self._goto[0].values())
+        for child in queue:
+            self._fail[child] = 0
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                fallback = self._goto[f].get(ch, 0)
+                self._fail[child] = fallback if fallback != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+        self._built = True
+
+    def iter(self, text: str) -> Iterator[Tuple[int, Any]]:
+        """产出 (命中结束位置, value)"""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for value in out[node]:
+                yield i, value
+
+
+class WatchRule:
+    __slots__ = ("name", "action", "fields", "boost")
+
+    def __init__(self, name: str, action: str, fields: Tuple[str, ...], boost: float = 0.0):
+        self.name = name
+        self.action = action
+        self.fields = fields
+        self.boost = boost
+
+
+class WatchDecision:
+    """一篇论文的匹配结果：action 为 include / exclude / None，boost 为命中的 boost 规则之和"""
+    __slots__ = ("action", "boost", "hits")
+
+    def __init__(self):
+        self.action: Optional[str] = None
+        self.boost = 0.0
+        self.hits: List[Tuple[str, str, str]] = []  # (规则名, 词条, 字段)
+
+    def terms(self, action: str = None) -> str:
+        return ", ".join(sorted({t for name, t, _ in self.hits if action is None or name.startswith(action)}))
+
+
+class Watchlist:
+    """
+    作者 / 关键词监控名单。settings.yaml 的 watchlist.rules 里每条规则：
+      action: include | exclude | boost
+      fields: [title, abstract, authors]    # 默认 title + abstract
+      terms:  [...]                          # 直接写词条
+      file:   "watchlists/authors.txt"       # 或者从 config/ 下的文件读 (一行一个，# 开头为注释)，适合上千条
+      boost:  0.5                            # 仅 boost
+    所有规则的所有词条编译进同一个 Aho–Corasick 自动机，每篇论文只扫描一遍。
+    include / exclude 在 LLM 之前生效 (直接定分，不进打分队列)，exclude 优先；boost 在 LLM 打分之后叠加。
+    """
+    def __init__(self, rules: List[Dict[str, Any]] = None):
+        self.config = GlobalConfig
+        self.include_score = float(self.config.get('watchlist.include_score', 5.0))
+        self.exclude_score = float(self.config.get('watchlist.exclude_score', 0.0))
+        self.max_score = float(self.config.get('watchlist.max_score', 5.0))
+        self.rules: List[WatchRule] = []
+        self.automaton = AhoCorasick()
+        self.num_terms = 0
+
+        for i, spec in enumerate(rules if rules is not None else (self.config.get('watchlist.rules') or [])):
+            self._add_rule(i, spec)
+        self.automaton.build()
+        if self.num_terms:
+            logger.info(f"👀 Watchlist: {self.num_terms} terms in {len(self.rules)} rules "
+                        f"({len(self.automaton)} automaton states).")
+
+    def __bool__(self):
+        return self.num_terms > 0
+
+    def _add_rule(self, idx: int, spec: Dict[str, Any]):
+        action = spec.get("action", BOOST)
+        if action not in (INCLUDE, EXCLUDE, BOOST):
+            logger.warning(f"⚠️ Watchlist rule #{idx}: unknown action '{action}', skipped.")
+            return
+        fields = tuple(f for f in (spec.get("fields") or ("title", "abstract")) if f in FIELDS)
+        rule = WatchRule(f"{action}:{spec.get('name', idx)}", action, fields, float(spec.get("boost", 0.0)))
+
+        terms = list(spec.get("terms") or [])
+        if spec.get("file"):
+            path = self.config.root_path / "config" / spec["file"]
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    terms += [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+            except OSError as e:
+                logger.warning(f"⚠️ Watchlist file unreadable ({path}): {e}")
+
+        self.rules.append(rule)
+        for term in terms:
+            key = normalize(term)
+            if key.strip():
+                self.automaton.add(key, (rule, term))
+                self.num_terms += 1
+
+    @staticmethod
+    def _document(p: Paper) -> Tuple[str, List[int]]:
+        """三个字段拼成一个文本，返回 (文本, 各字段起始位置)，命中位置用二分查回字段"""
+        parts = [normalize(p.title), normalize(p.summary), _AUTHOR_SEP.join(normalize(a) for a in p.authors)]
+        starts, pos = [], 0
+        for part in parts:
+            starts.append(pos)
+            pos += len(part) + len(_FIELD_SEP)
+        return _FIELD_SEP.join(parts), starts
+
+    def match(self, p: Paper) -> Optional[WatchDecision]:
+        """没有命中返回 None"""
+        if not self.num_terms:
+            return None
+        text, starts = self._document(p)
+        decision = None
+        seen, boosted = set(), set()
+        for end, (rule, term) in self.automaton.iter(text):
+            field = FIELDS[bisect_right(starts, end) - 1]
+            if field not in rule.fields or (rule.name, term) in seen:
+                continue
+            seen.add((rule.name, term))
+            decision = decision or WatchDecision()
+            decision.hits.append((rule.name, term, field))
+            if rule.action == EXCLUDE:
+                decision.action = EXCLUDE
+            elif rule.action == INCLUDE:
+                if decision.action != EXCLUDE:
+                    decision.action = INCLUDE
+            elif rule.name not in boosted:
+                # 同一条 boost 规则命中多个词条只加一次
+                boosted.add(rule.name)
+                decision.boost += rule.boost
+        return decision
+
+    def screen(self, papers: List[Paper]) -> Tuple[List[Paper], List[Paper], Dict[int, WatchDecision]]:
+        """
+        LLM 之前：命中 include / exclude 的论文直接定分。
+        返回 (强制收录, 强制排除, {id(paper): decision})；其余论文照常打分。
+        """
+        included, excluded, decisions = [], [], {}
+        for p in papers:
+            d = self.match(p)
+            if d is None:
+                continue
+            decisions[id(p)] = d
+            if d.action == EXCLUDE:
+                p.score = self.exclude_score
+                p.reason = f"Watchlist exclude: {d.terms(EXCLUDE)}"
+                excluded.append(p)
+            elif d.action == INCLUDE:
+                p.score = self.include_score
+                p.reason = f"Watchlist include: {d.terms(INCLUDE)}"
+                included.append(p)
+                logger.info(f"   👀 WATCH [{p.score}]: {p.title} ({d.terms(INCLUDE)})")
+        if decisions:
+            logger.info(f"👀 Watchlist matched {len(decisions)}/{len(papers)} papers: "
+                        f"{len(included)} force-included, {len(excluded)} force-excluded, "
+                        f"{sum(1 for d in decisions.values() if d.boost)} boosted.")
+        return included, excluded, decisions
+
+    def apply_boosts(self, papers: List[Paper], decisions: Dict[int, WatchDecision]) -> int:
+        """LLM 打分之后叠加 boost (上限 max_score)，返回加分篇数。打分失败的论文不加分"""
+        boosted = 0
+        for p in papers:
+            d = decisions.get(id(p))
+            if d is None or not d.boost or d.action or (p.reason or "").startswith("Batch Error"):
+                continue
+            p.score = min(self.max_score, p.score + d.boost)
+            boosted += 1
+            logger.debug(f"👀 Boost {d.boost:+.1f} -> {p.score}: {p.title} ({d.terms(BOOST)})")
+        return boosted
@@ -0,0 +1,184 @@
+# src/services/worker.py
+import os
+import time
+import socket
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+
+from src.core.config import GlobalConfig
+from src.core.logger import log_context
+from src.core.exceptions import FileWriteError
+from src.core.models import Paper
+from src.core.resilience import is_retryable, retry_after_of
+from src.services.job_queue import JobQueue, Job, DONE, FAILED
+
+logger = logging.getLogger("service.worker")
+
+SCORE, DOWNLOAD = "score", "download"
+
+
+def batch_key(papers: List[Paper]) -> str:
+    """打分批次的幂等键：同一批论文 (按 ID) 永远对应同一个任务"""
+    return hashlib.sha1("|".join(p.arxiv_id for p in papers).encode("utf-8")).hexdigest()[:16]
+
+
+class QueueWorker:
+    """
+    从 JobQueue 领取任务并执行。任务处理逻辑复用 DailyFlow (打分 / 下载)，
+    所以 worker 与单机流程的结果完全一致；不同主机各自用自己 .env 里的 API Key。
+
+    执行期间后台线程定期续租；handler 抛出的异常按 resilience 的分类决定交回队列重试还是判定失败。
+    """
+    def __init__(self, flow, queue: JobQueue = None, worker_id: str = None):
+        self.config = GlobalConfig
+        self.flow = flow
+        self.queue = queue or JobQueue()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = float(self.config.get('queue.lease_seconds', 300))
+        self.poll_interval = float(self.config.get('queue.poll_interval', 2.0))
+        self.handlers = {
+            SCORE: self._handle_score,
+            DOWNLOAD: self._handle_download,
+        }
+        self.stats = {"done": 0, "retried": 0, "failed": 0}
+
+    # ------------------------------------------------------------------
+    # 任务处理
+    # ------------------------------------------------------------------
+    def _handle_score(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        batch = [Paper.from_dict(d) for d in payload["papers"]]
+        logger.info(f"⚡ Batch {payload.get('batch_idx', '?')}/{payload.get('num_batches', '?')} -> Start "
+                    f"({len(batch)} papers)")
+        self.flow._review_batch(batch, payload["system_prompt"])
+        return [{"arxiv_id": p.arxiv_id, "score": p.score, "reason": p.reason, "summary_zh": p.summary_zh}
+                for p in batch]
+
+    def _handle_download(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        paper = Paper.from_dict(payload)
+        self.flow._download_one(paper)
+        # 协调者拿到结果时文件必须已经落盘
+        if self.flow.pdf.flush():
+            raise FileWriteError("Async PDF write failed", file_path=paper.local_path)
+        return {"local_path": paper.local_path}
+
+    @contextmanager
+    def _keepalive(self, job: Job):
+        """后台续租 (每 1/3 个租期一次)。SQLite 连接不能跨线程共享，续租线程单独开一个连接"""
+        stop = threading.Event()
+
+        def beat():
+            queue = JobQueue(self.queue.db_path)
+            try:
+                while not stop.wait(self.lease_seconds / 3):
+                    if not queue.heartbeat(job, self.worker_id, self.lease_seconds):
+                        logger.warning(f"⚠️ Lease lost for {job}")
+                        return
+            finally:
+                queue.close()
+
+        thread = threading.Thread(target=beat, name=f"lease-{job.id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def process_one(self, kinds: Optional[List[str]] = None, run: str = None) -> bool:
+        """领取并处理一个任务。队列里没有可做的任务返回 False"""
+        job = self.queue.claim(self.worker_id, self.lease_seconds, kinds=kinds, run=run)
+        if job is None:
+            return False
+
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            self.queue.fail(job, self.worker_id, f"Unknown job kind: {job.kind}", retryable=False)
+            self.stats["failed"] += 1
+            return True
+
+        with log_context(stage=f"worker.{job.kind}"), self._keepalive(job):
+            try:
+                result = handler(job.payload)
+            except Exception as e:
+                retryable = is_retryable(e)
+                delay = retry_after_of(e) or min(60.0, 2.0 ** job.attempts)
+                final = not retryable or job.attempts >= job.max_attempts
+                logger.error(f"❌ {job} failed ({'final' if final else f'retry in {delay:.0f}s'}): {e}")
+                self.queue.fail(job, self.worker_id, str(e), retryable=retryable, delay=delay)
+                self.stats["failed" if final else "retried"] += 1
+                return True
+
+        if self.queue.complete(job, self.worker_id, result):
+            self.stats["done"] += 1
+        return True
+
+    def run(self, kinds: Optional[List[str]] = None, idle_exit: float = None, max_jobs: int = None):
+        """
+        持续处理任务。idle_exit 秒内领不到任务就退出 (None = 一直等)；max_jobs 处理够数量后退出。
+        """
+        logger.info(f"👷 Worker {self.worker_id} started (kinds: {kinds or 'all'}, queue: {self.queue.db_path})")
+        idle_since = time.monotonic()
+        handled = 0
+        while max_jobs is None or handled < max_jobs:
+            if self.process_one(kinds=kinds):
+                handled += 1
+                idle_since = time.monotonic()
+                continue
+            if idle_exit is not None and time.monotonic() - idle_since >= idle_exit:
+                break
+            time.sleep(self.poll_interval)
+        logger.info(f"👷 Worker {self.worker_id} exiting: {self.stats}")
+        return self.stats
+
+    # ------------------------------------------------------------------
+    # 协调者等待
+    # ------------------------------------------------------------------
+    def drain(self, run: str, kind: str, participate: bool = True, progress_every: float = 30.0):
+        """
+        等 run 下某类任务全部结束 (done / failed)。
+        participate=True 时协调者自己也领任务干活，没有其它 worker 时退化为单机处理。
+        """
+        last_log = time.monotonic()
+        while True:
+            counts = self.queue.counts(run, kind)
+            if counts["pending"] + counts["leased"] == 0:
+                return counts
+            if time.monotonic() - last_log >= progress_every:
+                logger.info(f"⏳ [{run}] {kind}: {counts}")
+                last_log = time.monotonic()
+            if not (participate and self.process_one(kinds=[kind], run=run)):
+                time.sleep(self.poll_interval)
+
+
+def merge_score_results(papers: List[Paper], batches: Dict[str, List[Paper]], results: Dict[str, Dict[str, Any]]):
+    """把队列里的打分结果按 arxiv_id 回填到论文上；失败批次整批记 0 分 (与单机模式一致)"""
+    by_id = {p.arxiv_id: p for p in papers}
+    for key, batch in batches.items():
+        entry = results.get(key)
+        if entry is None or entry["status"] != DONE:
+            error = entry["error"] if entry else "job missing"
+            for p in batch:
+                p.score = 0.0
+                p.reason = f"Batch Error: {error}"
+            continue
+        for r in entry["result"]:
+            p = by_id.get(r["arxiv_id"])
+            if p is not None:
+                p.score = r["score"]
+                p.reason = r["reason"]
+                p.summary_zh = r["summary_zh"]
+
+
+def merge_download_results(papers: List[Paper], results: Dict[str, Dict[str, Any]]) -> int:
+    ok = 0
+    for p in papers:
+        entry = results.get(p.arxiv_id)
+        if entry and entry["status"] == DONE:
+            p.local_path = entry["result"]["local_path"]
+            ok += 1
+        elif entry and entry["status"] == FAILED:
+            logger.error(f"   ❌ Download failed: {p.title[:50]}... ({entry['error']})")
+    return ok
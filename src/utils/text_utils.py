@@ -1,4 +1,5 @@
 import json
+import hashlib
 import re
 import logging
 from src.core.exceptions import LLMParseError
@@ -54,3 +55,37 @@ def normalize_list(data: any) -> list:
         # 如果找不到，就把 dict 当作 list 的唯一元素
         return [data]
     return []
+
+def arxiv_id_from_url(url: str, keep_version: bool = False) -> str:
+    """
+    从 Arxiv 链接中提取论文 ID。
+    'http://arxiv.org/abs/2401.12345v2' -> '2401.12345' (keep_version=True 时保留 'v2')
+    兼容旧式 ID，如 'http://arxiv.org/abs/cs/0112017v1' -> 'cs/0112017'
+    """
+    if not url:
+        return ""
+    tail = url.strip().rstrip('/')
+    for marker in ("/abs/", "/pdf/"):
+        if marker in tail:
+            tail = tail.split(marker, 1)[1]
+            break
+    else:
+        tail = tail.split('/')[-1]
+    if tail.endswith(".pdf"):
+        tail = tail[:-4]
+    if not keep_version:
+        tail = re.sub(r"v\d+$", "", tail)
+    return tail
+
+def normalize_title(title: str) -> str:
+    """标题归一化：小写、去标点、合并空白。用于跨来源比对同一篇论文。"""
+    if not title:
+        return ""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", title.lower()).split())
+
+def title_hash(title: str) -> str:
+    """归一化标题的短哈希 (16 位 hex)，空标题返回空串"""
+    norm = normalize_title(title)
+    if not norm:
+        return ""
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()[:16]
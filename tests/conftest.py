@@ -0,0 +1,81 @@
+# tests/conftest.py
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+# GlobalConfig 按相对路径读 config/settings.yaml，测试统一在仓库根目录下跑
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """把 GlobalConfig.data_path 指到临时目录，服务类的数据库 / 报告不落进仓库的 data/"""
+    from src.core.config import Config
+
+    path = tmp_path / "data"
+    monkeypatch.setattr(Config, "data_path", property(lambda self: path))
+    return path
+
+
+class FakeEndpoint:
+    """
+    本地假服务端：handler(method, path, query, body) -> (status, headers, body)。
+    requests 记录每次收到的 (method, path, query, body)，便于断言请求序列。
+    """
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        endpoint = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def _serve(self):
+                parts = urlsplit(self.path)
+                query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                endpoint.requests.append((self.command, parts.path, query, body))
+                status, headers, payload = endpoint.handler(self.command, parts.path, query, body)
+                payload = payload.encode() if isinstance(payload, str) else payload
+                self.send_response(status)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _serve
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_endpoint():
+    servers = []
+
+    def start(handler) -> FakeEndpoint:
+        server = FakeEndpoint(handler)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
@@ -0,0 +1,42 @@
+# tests/test_citation_graph.py
+import sqlite3
+
+import pytest
+
+from src.core.models import Paper
+from src.services.citation_graph import CitationGraph
+
+
+@pytest.fixture
+def graph(data_dir):
+    g = CitationGraph()
+    # 模拟旧版 SQLite 的默认上限
+    g.conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    g.conn.execute("INSERT INTO papers (arxiv_id, title, score, day) VALUES ('2501.00001', 'Seminal', 5.0, '2026-01-01')")
+    g.conn.execute("INSERT INTO papers (arxiv_id, title, score, day) VALUES ('2501.00002', 'Meh', 2.0, '2026-01-01')")
+    yield g
+    g.close()
+
+
+def _papers(n):
+    return [Paper(title=f"Paper {i}", authors=["A"], summary="", published_date="2026-02-01",
+                  arxiv_url=f"http://arxiv.org/abs/2602.{i:05d}", pdf_url="", score=3.0)
+            for i in range(n)]
+
+
+def test_cited_high_scores_handles_more_ids_than_sqlite_variables(graph):
+    papers = _papers(2500)
+    graph.conn.executemany("INSERT INTO edges (src, dst) VALUES (?, ?)",
+                           [(p.arxiv_id, dst) for p in papers for dst in ("2501.00001", "2501.00002")])
+
+    hits = graph.cited_high_scores([p.arxiv_id for p in papers], min_score=5.0)
+    assert len(hits) == 2500
+    assert all([c["arxiv_id"] for c in cited] == ["2501.00001"] for cited in hits.values())
+
+    assert graph.boost_scores(papers, min_score=5.0, boost=0.5, max_boost=1.0) == 2500
+    assert {p.score for p in papers} == {3.5}
+
+
+def test_zero_boost_skips_the_query(graph, monkeypatch):
+    monkeypatch.setattr(graph, "cited_high_scores", lambda *a, **k: pytest.fail("should not query"))
+    assert graph.boost_scores(_papers(3), min_score=5.0, boost=0.0, max_boost=1.0) == 0
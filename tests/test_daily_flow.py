@@ -0,0 +1,55 @@
+# tests/test_daily_flow.py
+import re
+import sqlite3
+
+import pytest
+
+from src.core.models import Paper
+from src.services.watchlist import Watchlist
+
+ABSTRACT = ("We measure route leaks in the global routing table and show how RPKI and ASPA "
+            "deployment changes the blast radius of misconfigured BGP announcements. ") * 3
+
+
+def _paper(i, published, authors=("Alice Smith",), summary=ABSTRACT):
+    return Paper(title="Route leaks at Internet scale", authors=list(authors), summary=summary,
+                 published_date=published, arxiv_url=f"http://arxiv.org/abs/2601.{i:05d}", pdf_url="")
+
+
+@pytest.fixture
+def flow(data_dir):
+    from src.services.daily_flow import DailyFlow
+
+    f = DailyFlow(distributed=False)
+    f.cascade = None
+    f.two_phase = True
+    f._download_high_scores = lambda *a, **k: None
+    f._post_download = lambda *a, **k: None
+
+    def chat_json(system_prompt, user_content):
+        ids = [int(x) for x in re.findall(r"ID: (\d+)", user_content)]
+        if "Explain" in user_content:
+            return [{"id": i, "reason": "relevant", "summary_zh": "摘要"} for i in ids]
+        return [{"id": i, "score": 3.0} for i in ids]
+
+    f.llm.chat_json = chat_json
+    return f
+
+
+def test_boost_on_cluster_member_is_kept_and_not_remembered(flow, data_dir):
+    flow.watchlist = Watchlist(rules=[{"action": "boost", "fields": ["authors"], "terms": ["Jane Doe"], "boost": 1.0}])
+    # 较新的 v2 是代表；作者 Jane Doe 只出现在被替代的旧版本上
+    rep = _paper(1, "2026-01-02")
+    member = _paper(2, "2026-01-01", authors=("Alice Smith", "Jane Doe"))
+    other = _paper(3, "2026-01-02", summary="An unrelated study of sparse attention kernels on GPUs.")
+
+    flow._process_papers([rep, member, other], date_str="2026-01-02", meta_name="2026-01-02_daily.json",
+                         send_email=False)
+
+    assert member.duplicate_of == rep.arxiv_id
+    assert (rep.score, member.score, other.score) == (3.0, 4.0, 3.0)
+
+    # 历史里只有 LLM 给的分
+    with sqlite3.connect(str(data_dir / "index" / "near_dup.db")) as conn:
+        stored = dict(conn.execute("SELECT arxiv_id, score FROM papers"))
+    assert stored == {rep.arxiv_id: 3.0, member.arxiv_id: 3.0, other.arxiv_id: 3.0}
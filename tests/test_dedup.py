@@ -0,0 +1,42 @@
+# tests/test_dedup.py
+from src.core.models import Paper
+from src.services.dedup import NearDuplicateIndex
+
+ABSTRACT = ("We measure route leaks in the global routing table and show how RPKI and ASPA "
+            "deployment changes the blast radius of misconfigured BGP announcements. ") * 3
+
+
+def _paper(i, published, summary=ABSTRACT):
+    return Paper(title="Route leaks at Internet scale", authors=["A"], summary=summary,
+                 published_date=published, arxiv_url=f"http://arxiv.org/abs/2601.{i:05d}", pdf_url="")
+
+
+def test_near_duplicates_cluster_under_newest_version(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "near_dup.db")
+    old, new = _paper(1, "2026-01-01"), _paper(2, "2026-01-02", ABSTRACT + " Extended version.")
+    other = _paper(3, "2026-01-02", "Sparse attention kernels for long-context transformers on GPUs.")
+
+    clusters = index.cluster([old, new, other], day="2026-01-02")
+    assert sorted(len(c.members) for c in clusters) == [0, 1]
+    assert {c.representative.arxiv_id for c in clusters} == {new.arxiv_id, other.arxiv_id}
+    assert [p.arxiv_id for p in index.to_score(clusters)] == [new.arxiv_id, other.arxiv_id]
+    index.close()
+
+
+def test_history_is_reused_next_day_and_not_refreshed(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "near_dup.db")
+    first = _paper(1, "2026-01-01")
+    clusters = index.cluster([first], day="2026-01-01")
+    first.score, first.reason, first.summary_zh = 4.0, "good", "摘要"
+    index.remember(clusters, day="2026-01-01")
+
+    revised = _paper(2, "2026-01-02", ABSTRACT + " Camera-ready.")
+    clusters = index.cluster([revised], day="2026-01-02")
+    assert index.to_score(clusters) == []
+    index.apply(clusters)
+    assert (revised.score, revised.summary_zh, revised.duplicate_of) == (4.0, "摘要", first.arxiv_id)
+
+    # 沿用历史的簇不再写回，原记录的 day 不变
+    index.remember(clusters, day="2026-01-02")
+    assert list(index.conn.execute("SELECT arxiv_id, day FROM papers")) == [(first.arxiv_id, "2026-01-01")]
+    index.close()
@@ -0,0 +1,43 @@
+# tests/test_inbox_index.py
+import os
+
+import fitz
+import pytest
+
+from src.services.inbox_index import InboxIndex
+
+
+def _write_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+
+
+@pytest.fixture
+def inbox(data_dir):
+    path = data_dir / "inbox"
+    path.mkdir(parents=True)
+    return path
+
+
+def test_incremental_update_and_search(inbox):
+    a = inbox / "[2601.00001] Route leaks.pdf"
+    b = inbox / "[2601.00002] Sparse attention.pdf"
+    _write_pdf(a, ["Introduction to interdomain routing", "Route leak detection with ASPA"])
+    _write_pdf(b, ["Sparse attention kernels"])
+
+    index = InboxIndex()
+    assert index.update()["new"] == 2
+    (hit,) = index.search("ASPA")
+    assert (hit["arxiv_id"], hit["page"]) == ("2601.00001", 2)
+
+    # 没变的文件跳过；只改 mtime 的只更新元数据；删掉的从索引移除
+    os.utime(a, (1, 1))
+    b.unlink()
+    stats = index.update()
+    assert (stats["touched"], stats["removed"], stats["new"]) == (1, 1, 0)
+    assert index.search("attention") == []
+    assert index.update()["skipped"] == 1
+    index.close()
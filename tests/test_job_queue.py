@@ -0,0 +1,129 @@
+# tests/test_job_queue.py
+import types
+
+import pytest
+
+from src.core.exceptions import FetchError
+from src.services import job_queue as job_queue_module
+from src.services.job_queue import JobQueue, DONE, FAILED, PENDING
+from src.services.worker import QueueWorker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可控的时钟：租约 / 可见性都按它计算"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(job_queue_module, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(tmp_path / "jobs.db")
+    yield q
+    q.close()
+
+
+def test_enqueue_is_idempotent(queue):
+    assert queue.enqueue("r1", "score", [("a", {"n": 1}), ("b", {"n": 2})]) == 2
+    assert queue.enqueue("r1", "score", [("a", {"n": 9}), ("c", {"n": 3})]) == 1
+    assert queue.counts("r1")[PENDING] == 3
+
+
+def test_expired_lease_is_redelivered_and_late_result_discarded(queue, clock):
+    queue.enqueue("r1", "score", [("a", {"n": 1})])
+    first = queue.claim("w1", lease_seconds=60)
+    assert first.attempts == 1
+    # 租约有效期内别人领不到
+    assert queue.claim("w2", lease_seconds=60) is None
+
+    clock[0] += 61
+    second = queue.claim("w2", lease_seconds=60)
+    assert (second.id, second.attempts) == (first.id, 2)
+
+    # w1 迟到的结果被丢弃，只有当前租约持有者能落结果
+    assert not queue.complete(first, "w1", {"from": "w1"})
+    assert queue.complete(second, "w2", {"from": "w2"})
+    assert queue.results("r1", "score")["a"] == {"status": DONE, "result": {"from": "w2"}, "error": None}
+
+
+def test_heartbeat_keeps_the_lease(queue, clock):
+    queue.enqueue("r1", "score", [("a", {})])
+    job = queue.claim("w1", lease_seconds=60)
+    clock[0] += 50
+    assert queue.heartbeat(job, "w1", lease_seconds=60)
+    clock[0] += 50
+    assert queue.claim("w2", lease_seconds=60) is None
+
+
+def test_lease_expiry_with_no_attempts_left_is_dead_lettered(queue, clock):
+    queue.enqueue("r1", "download", [("a", {})], max_attempts=2)
+    for _ in range(2):
+        assert queue.claim("w1", lease_seconds=10) is not None
+        clock[0] += 11  # worker 崩在这个任务上
+
+    assert queue.claim("w1", lease_seconds=10) is None
+    assert queue.results("r1", "download")["a"]["status"] == FAILED
+    assert queue.results("r1", "download")["a"]["error"] == "lease expired"
+
+
+def test_retryable_failure_is_delayed_then_retried(queue, clock):
+    queue.enqueue("r1", "score", [("a", {})])
+    job = queue.claim("w1", lease_seconds=60)
+    assert queue.fail(job, "w1", "429", retryable=True, delay=30)
+
+    assert queue.claim("w1", lease_seconds=60) is None
+    clock[0] += 31
+    assert queue.claim("w1", lease_seconds=60).attempts == 2
+
+
+def test_non_retryable_failure_is_final(queue):
+    queue.enqueue("r1", "score", [("a", {})])
+    job = queue.claim("w1", lease_seconds=60)
+    queue.fail(job, "w1", "400 bad request", retryable=False)
+    assert queue.counts("r1")[FAILED] == 1
+    assert queue.claim("w1", lease_seconds=60) is None
+
+
+@pytest.fixture
+def worker(queue):
+    w = QueueWorker(flow=None, queue=queue, worker_id="w1")
+    w.lease_seconds = 60
+    return w
+
+
+def test_worker_retries_retryable_errors_until_max_attempts(worker, queue, clock):
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload)
+        raise FetchError("503 from upstream", status_code=503, retry_after=5)
+
+    worker.handlers["score"] = flaky
+    queue.enqueue("r1", "score", [("a", {"n": 1})], max_attempts=2)
+
+    assert worker.process_one()
+    assert worker.stats["retried"] == 1 and queue.counts("r1")[PENDING] == 1
+    # Retry-After 之前不可见
+    assert not worker.process_one()
+    clock[0] += 6
+    assert worker.process_one()
+    assert worker.stats["failed"] == 1 and len(calls) == 2
+    assert queue.results("r1", "score")["a"]["status"] == FAILED
+
+
+def test_worker_fails_fast_on_programming_errors(worker, queue):
+    worker.handlers["score"] = lambda payload: payload["missing"]
+    queue.enqueue("r1", "score", [("a", {})], max_attempts=3)
+
+    assert worker.process_one()
+    assert worker.stats == {"done": 0, "retried": 0, "failed": 1}
+
+
+def test_worker_completes_jobs(worker, queue):
+    worker.handlers["score"] = lambda payload: {"double": payload["n"] * 2}
+    queue.enqueue("r1", "score", [("a", {"n": 21})])
+
+    assert worker.process_one()
+    assert queue.results("r1", "score")["a"]["result"] == {"double": 42}
+    assert not worker.process_one()
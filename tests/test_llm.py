@@ -0,0 +1,106 @@
+# tests/test_llm.py
+import json
+import time
+import uuid
+import logging
+
+import pytest
+
+from src.core.exceptions import LLMError
+from src.core.logger import ContextFilter, log_context
+from src.drivers import llm as llm_module
+from src.drivers.llm import DeepSeekDriver
+
+
+def _completion(content: str) -> str:
+    return json.dumps({
+        "id": "1", "object": "chat.completion", "created": 0, "model": "fake",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    })
+
+
+def _backend(name: str, delay: float = 0.0, status: int = 200):
+    def handler(method, path, query, body):
+        time.sleep(delay)
+        if status != 200:
+            return status, {"Content-Type": "application/json"}, json.dumps({"error": {"message": "boom"}})
+        return 200, {"Content-Type": "application/json"}, _completion(json.dumps({"from": name}))
+    return handler
+
+
+@pytest.fixture
+def make_driver(fake_endpoint):
+    def make(*backends, request_timeout: float = 5.0, hedge_delay: float = 0.2) -> DeepSeekDriver:
+        specs = []
+        for name, handler in backends:
+            server = fake_endpoint(handler)
+            # 熔断器按端点名进程内共享，每个用例用独立的名字
+            specs.append({"name": f"{name}-{uuid.uuid4().hex[:8]}", "base_url": server.url + "/v1",
+                          "model": "fake", "api_key": "test-key"})
+        driver = DeepSeekDriver(endpoints=specs)
+        driver.request_timeout = request_timeout
+        driver.hedge_min_delay = driver.hedge_default_delay = hedge_delay
+        return driver
+    return make
+
+
+@pytest.fixture
+def records():
+    captured = []
+
+    class _Capture(logging.Handler):
+        def emit(self, record):
+            captured.append(record)
+
+    handler = _Capture()
+    handler.addFilter(ContextFilter())
+    llm_logger = logging.getLogger("driver.llm")
+    old_level = llm_logger.level
+    llm_logger.setLevel(logging.INFO)
+    llm_logger.addHandler(handler)
+    yield captured
+    llm_logger.removeHandler(handler)
+    llm_logger.setLevel(old_level)
+
+
+def test_hedge_wins_over_slow_primary(make_driver, records):
+    driver = make_driver(("slow", _backend("slow", delay=2.0)), ("fast", _backend("fast")))
+    slow = driver.endpoints[0]
+
+    start = time.monotonic()
+    with log_context(stage="score", batch=7):
+        content = driver._hedged_call(slow, [{"role": "user", "content": "hi"}], json_mode=True)
+
+    assert json.loads(content) == {"from": "fast"}
+    assert time.monotonic() - start < 1.5
+    # 池线程里发出的日志也带着调用方的 stage / batch
+    responded = [r for r in records if "Responded" in r.getMessage()]
+    assert responded and all((r.stage, r.batch) == ("score", 7) for r in responded)
+
+
+def test_failover_to_next_endpoint(make_driver, monkeypatch):
+    driver = make_driver(("broken", _backend("broken", status=500)), ("healthy", _backend("healthy")))
+    # 固定先选第一个 (坏的) 端点
+    monkeypatch.setattr(llm_module.random, "choices", lambda population, weights, k: [population[0]])
+
+    assert driver.chat_json("sys", "hi") == {"from": "healthy"}
+
+
+def test_non_retryable_error_is_not_failed_over(make_driver, monkeypatch):
+    driver = make_driver(("bad-request", _backend("bad-request", status=400)), ("healthy", _backend("healthy")))
+    monkeypatch.setattr(llm_module.random, "choices", lambda population, weights, k: [population[0]])
+
+    with pytest.raises(LLMError) as exc:
+        driver._call_api([{"role": "user", "content": "hi"}])
+    assert exc.value.status_code == 400
+
+
+def test_deadline_exceeded(make_driver):
+    driver = make_driver(("stuck", _backend("stuck", delay=3.0)), request_timeout=0.5)
+    driver.hedge_enabled = False
+
+    start = time.monotonic()
+    with pytest.raises(LLMError, match="Deadline exceeded"):
+        driver._hedged_call(driver.endpoints[0], [{"role": "user", "content": "hi"}], json_mode=False)
+    assert time.monotonic() - start < 2.0
@@ -0,0 +1,183 @@
+# tests/test_oai.py
+import json
+
+import pytest
+
+from src.core.exceptions import FetchError
+from src.drivers import oai as oai_module
+from src.drivers.oai import ArxivOAIDriver
+from src.core.rate_limiter import RateLimiter, RateLimitedSession
+
+
+def _record(arxiv_id: str, created: str = "2026-01-02") -> str:
+    return f"""
+    <record><header><identifier>oai:arXiv.org:{arxiv_id}</identifier></header>
+      <metadata><arXiv xmlns="http://arxiv.org/OAI/arXiv/">
+        <id>{arxiv_id}</id><created>{created}</created>
+        <authors><author><keyname>Doe</keyname><forenames>Jane</forenames></author></authors>
+        <title>Paper {arxiv_id}</title><categories>cs.NI</categories><abstract>Abstract.</abstract>
+      </arXiv></metadata>
+    </record>"""
+
+
+def _page(ids, token=None) -> str:
+    token_el = f"<resumptionToken>{token}</resumptionToken>" if token else "<resumptionToken/>"
+    return (f'<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/"><ListRecords>'
+            f'{"".join(_record(i) for i in ids)}{token_el}</ListRecords></OAI-PMH>')
+
+
+def _error(code: str) -> str:
+    return f'<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/"><error code="{code}">x</error></OAI-PMH>'
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waits = []
+    monkeypatch.setattr(oai_module.time, "sleep", waits.append)
+    return waits
+
+
+@pytest.fixture
+def make_driver(tmp_path):
+    def make(server) -> ArxivOAIDriver:
+        driver = ArxivOAIDriver()
+        driver.base_url = server.url + "/oai"
+        driver.root_dir = tmp_path / "oai"
+        driver.session = RateLimitedSession(RateLimiter(0))
+        return driver
+    return make
+
+
+def test_harvest_follows_resumption_tokens(fake_endpoint, make_driver, sleeps):
+    pages = {None: _page(["2601.00001", "2601.00002"], "t1"), "t1": _page(["2601.00003"])}
+    server = fake_endpoint(lambda m, p, q, b: (200, {}, pages[q.get("resumptionToken")]))
+    driver = make_driver(server)
+
+    harvest_dir = driver.harvest("2026-01-01", "2026-01-03")
+
+    state = json.loads((harvest_dir / "state.json").read_text())
+    assert state["complete"] and state["chunks"] == 2 and state["records"] == 3
+    assert [p.arxiv_id for p in driver.iter_papers(harvest_dir)] == ["2601.00001", "2601.00002", "2601.00003"]
+    assert server.requests[0][2]["metadataPrefix"] == "arXiv"
+    assert server.requests[1][2] == {"verb": "ListRecords", "resumptionToken": "t1"}
+
+    # 已完成的区间不再联网
+    driver.harvest("2026-01-01", "2026-01-03")
+    assert len(server.requests) == 2
+
+
+def test_harvest_resumes_from_saved_token(fake_endpoint, make_driver, sleeps):
+    calls = {"t1": 0}
+
+    def handler(m, p, q, b):
+        token = q.get("resumptionToken")
+        if token is None:
+            return 200, {}, _page(["2601.00001"], "t1")
+        calls[token] += 1
+        if calls[token] == 1:
+            return 500, {}, "boom"
+        return 200, {}, _page(["2601.00002"])
+
+    server = fake_endpoint(handler)
+    driver = make_driver(server)
+    with pytest.raises(FetchError):
+        driver.harvest("2026-01-01", "2026-01-03")
+
+    harvest_dir = driver.harvest("2026-01-01", "2026-01-03")
+    assert [q.get("resumptionToken") for _, _, q, _ in server.requests] == [None, "t1", "t1"]
+    assert json.loads((harvest_dir / "state.json").read_text())["records"] == 2
+
+
+def test_retry_after_is_honoured(fake_endpoint, make_driver, sleeps):
+    responses = [(503, {"Retry-After": "7"}, ""), (200, {}, _page(["2601.00001"]))]
+    server = fake_endpoint(lambda m, p, q, b: responses.pop(0))
+    driver = make_driver(server)
+
+    driver.harvest("2026-01-01", "2026-01-03")
+    assert sleeps == [7]
+    assert len(server.requests) == 2
+
+
+def test_bad_resumption_token_restarts_are_bounded(fake_endpoint, make_driver, sleeps):
+    def handler(m, p, q, b):
+        if "resumptionToken" in q:
+            return 200, {}, _error("badResumptionToken")
+        return 200, {}, _page(["2601.00001"], "t1")
+
+    server = fake_endpoint(handler)
+    driver = make_driver(server)
+    driver.max_restarts = 2
+
+    with pytest.raises(FetchError):
+        driver.harvest("2026-01-01", "2026-01-03")
+    # 首次 + 2 次重来，每次都是 "从头一页 + 过期 token 一页"
+    assert len(server.requests) == 2 * (driver.max_restarts + 1)
+    assert not driver._harvest_dir("2026-01-01", "2026-01-03").exists()
+
+
+def test_bad_resumption_token_recovers_after_restart(fake_endpoint, make_driver, sleeps):
+    expired = {"t1"}
+
+    def handler(m, p, q, b):
+        token = q.get("resumptionToken")
+        if token in expired:
+            expired.discard(token)
+            return 200, {}, _error("badResumptionToken")
+        if token is None:
+            return 200, {}, _page(["2601.00001"], "t1")
+        return 200, {}, _page(["2601.00002"])
+
+    server = fake_endpoint(handler)
+    driver = make_driver(server)
+
+    harvest_dir = driver.harvest("2026-01-01", "2026-01-03")
+    state = json.loads((harvest_dir / "state.json").read_text())
+    assert state["complete"] and state["chunks"] == 2 and state["records"] == 2
+
+
+def test_incremental_harvest_advances_watermark(fake_endpoint, make_driver, sleeps):
+    server = fake_endpoint(lambda m, p, q, b: (200, {}, _page(["2601.00001"])))
+    driver = make_driver(server)
+
+    assert driver.harvest_incremental("2026-01-05", default_days=2) == ("2026-01-03", "2026-01-05")
+    watermark = json.loads((driver.root_dir / "cs" / "watermark.json").read_text())
+    assert watermark["until"] == "2026-01-05"
+
+    # 下一次从上次的 until 开始 (重叠一天)
+    assert driver.harvest_incremental("2026-01-07") == ("2026-01-05", "2026-01-07")
+    assert server.requests[-1][2]["from"] == "2026-01-05"
+
+
+def test_failed_incremental_harvest_keeps_watermark(fake_endpoint, make_driver, sleeps):
+    server = fake_endpoint(lambda m, p, q, b: (200, {}, _page(["2601.00001"])))
+    driver = make_driver(server)
+    driver.harvest_incremental("2026-01-05")
+
+    server.handler = lambda m, p, q, b: (200, {}, _error("badArgument"))
+    with pytest.raises(FetchError):
+        driver.harvest_incremental("2026-01-07")
+    watermark = json.loads((driver.root_dir / "cs" / "watermark.json").read_text())
+    assert watermark["until"] == "2026-01-05"
+
+
+def test_incremental_backfill_harvests_once(fake_endpoint, make_driver, sleeps, data_dir):
+    from datetime import datetime, timezone
+    from src.services.daily_flow import DailyFlow
+
+    today = datetime.now(timezone.utc).date().isoformat()
+
+    def handler(m, p, q, b):
+        page = _page(["2601.00001", "2601.00002"])
+        return 200, {}, page.replace("<created>2026-01-02</created>", f"<created>{today}</created>")
+
+    server = fake_endpoint(handler)
+    flow = DailyFlow()
+    flow.oai = make_driver(server)
+    processed = []
+    flow._process_papers = lambda papers, **kwargs: processed.extend(papers)
+
+    # CLI 默认 until = 今天：区间仍然"开着"，但同一次运行里刚抓完的不能再抓一遍
+    flow.run_backfill(date_from=None, date_until=today, incremental=True)
+
+    assert len(server.requests) == 1
+    assert sorted(p.arxiv_id for p in processed) == ["2601.00001", "2601.00002"]
@@ -0,0 +1,77 @@
+# tests/test_pdf.py
+import gzip
+
+import fitz
+import pytest
+
+from src.drivers.pdf import PDFDriver
+
+
+@pytest.fixture(scope="module")
+def pdf_bytes() -> bytes:
+    doc = fitz.open()
+    for i in range(3):
+        doc.new_page().insert_text((72, 72), f"Border gateway protocol page {i + 1}")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def driver():
+    d = PDFDriver()
+    d.in_memory = True
+    d.chunk_size = 1024
+    yield d
+    d.flush()
+    PDFDriver._handoff.clear()
+
+
+def test_in_memory_download_hands_off_parsed_pages(fake_endpoint, driver, pdf_bytes, tmp_path):
+    server = fake_endpoint(lambda m, p, q, b: (200, {"Content-Type": "application/pdf"}, pdf_bytes))
+    save_path = tmp_path / "a.pdf"
+
+    driver.parse_in_memory = True
+    driver.download(server.url + "/a.pdf", save_path)
+    assert driver.flush() == []
+    assert save_path.read_bytes() == pdf_bytes
+
+    sha1, pages = PDFDriver.take_handoff(save_path, len(pdf_bytes))
+    assert len(pages) == 3 and "page 2" in pages[1]
+
+
+def test_no_parse_when_handoff_is_not_consumed(fake_endpoint, driver, pdf_bytes, tmp_path):
+    server = fake_endpoint(lambda m, p, q, b: (200, {"Content-Type": "application/pdf"}, pdf_bytes))
+    save_path = tmp_path / "a.pdf"
+
+    driver.parse_in_memory = False
+    driver.download(server.url + "/a.pdf", save_path)
+    assert driver.flush() == []
+    assert save_path.read_bytes() == pdf_bytes
+    assert PDFDriver.take_handoff(save_path, len(pdf_bytes)) is None
+    # 只有写盘一路，缓冲区照样还回池子
+    assert driver._pool._free
+
+
+def test_compressed_body_streams_to_disk(fake_endpoint, driver, pdf_bytes, tmp_path):
+    # Content-Length 是压缩后的长度，内存模式按它取缓冲区会永远对不上
+    body = gzip.compress(pdf_bytes)
+    server = fake_endpoint(lambda m, p, q, b: (200, {"Content-Encoding": "gzip"}, body))
+    save_path = tmp_path / "a.pdf"
+
+    driver.download(server.url + "/a.pdf", save_path)
+    assert driver.flush() == []
+    assert save_path.read_bytes() == pdf_bytes
+    assert len(server.requests) == 1
+
+
+def test_body_longer_than_content_length_falls_back_to_disk(driver, pdf_bytes, tmp_path):
+    class _Response:
+        def iter_content(self, chunk_size):
+            for i in range(0, len(pdf_bytes), chunk_size):
+                yield pdf_bytes[i:i + chunk_size]
+
+    save_path = tmp_path / "a.pdf"
+    assert driver._download_to_memory(_Response(), len(pdf_bytes) // 2, "http://x/a.pdf", save_path)
+    assert save_path.read_bytes() == pdf_bytes
+    assert driver._pool._free
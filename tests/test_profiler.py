@@ -0,0 +1,56 @@
+# tests/test_profiler.py
+import json
+import tracemalloc
+
+import pytest
+
+from src.core.profiler import StageProfiler, find_profiles, profile_dir_name, SUMMARY_FILE
+
+
+@pytest.fixture(autouse=True)
+def _stop_tracemalloc():
+    # StageProfiler 启用时会打开 tracemalloc，别拖慢后面的用例
+    yield
+    tracemalloc.stop()
+
+
+def _profile(root, run_id, stages, day="2026-10-18"):
+    profiler = StageProfiler(enabled=True)
+    for name in stages:
+        with profiler.stage(name):
+            sum(range(1000))
+    return profiler.write(root / profile_dir_name(day, run_id, "daily"), meta={"run_id": run_id})
+
+
+def test_rewrite_clears_stale_stages(tmp_path):
+    out = _profile(tmp_path, "aaaa1111", ["fetch", "score"])
+    assert (out / "score.prof").exists()
+
+    # 同一目录再写一次且跳过了 score：上一次的产物不能留下
+    _profile(tmp_path, "aaaa1111", ["fetch"])
+    assert not (out / "score.prof").exists() and not (out / "score.txt").exists()
+    assert [s["stage"] for s in json.loads((out / SUMMARY_FILE).read_text())["stages"]] == ["fetch"]
+
+
+def test_same_day_runs_are_kept_apart(tmp_path):
+    first = _profile(tmp_path, "aaaa1111", ["fetch"])
+    second = _profile(tmp_path, "bbbb2222", ["fetch"])
+    assert first != second
+
+    assert find_profiles(tmp_path, "bbbb2222") == [second]
+    assert find_profiles(tmp_path, "2026-10-18") == [first, second]
+    assert find_profiles(tmp_path, str(first)) == [first]
+    assert find_profiles(tmp_path, "cccc3333") == []
+
+
+def test_backfill_writes_its_profile(data_dir):
+    from src.core.logger import get_run_id
+    from src.services.daily_flow import DailyFlow
+
+    flow = DailyFlow(profile=True)
+    flow.oai.search_range = lambda *args, **kwargs: []
+    flow.run_backfill("2026-01-01", "2026-01-02")
+
+    (out,) = find_profiles(flow.reports_dir, get_run_id())
+    assert out.name.endswith("_backfill_profile")
+    assert "fetch" in [s["stage"] for s in json.loads((out / SUMMARY_FILE).read_text())["stages"]]
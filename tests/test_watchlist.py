@@ -0,0 +1,58 @@
+# tests/test_watchlist.py
+from src.core.models import Paper
+from src.services.watchlist import AhoCorasick, Watchlist, normalize, INCLUDE, EXCLUDE
+
+
+def _paper(title="", summary="", authors=()):
+    return Paper(title=title, authors=list(authors), summary=summary, published_date="2026-01-01",
+                 arxiv_url="http://arxiv.org/abs/2601.00001", pdf_url="")
+
+
+def _fields(decision):
+    return sorted((term, field) for _, term, field in decision.hits)
+
+
+def test_aho_corasick_finds_overlapping_matches():
+    ac = AhoCorasick()
+    for word in ("he", "she", "his", "hers"):
+        ac.add(word, word)
+    assert sorted(v for _, v in ac.iter("ushers")) == ["he", "hers", "she"]
+
+
+def test_normalize_folds_accents_and_punctuation():
+    assert normalize("José  Müller-Ortiz!") == " jose muller ortiz "
+
+
+def test_hits_are_attributed_to_the_right_field_at_boundaries():
+    wl = Watchlist(rules=[{"action": "boost", "fields": ["title", "abstract", "authors"], "boost": 0.5,
+                           "terms": ["routing", "bgp", "jane doe"]}])
+    # "routing" 是标题的最后一个词，"bgp" 是摘要的第一个词，作者在最后一个字段
+    d = wl.match(_paper(title="Secure interdomain routing", summary="BGP hijacks are common.",
+                        authors=["Jane Doe"]))
+    assert _fields(d) == [("bgp", "abstract"), ("jane doe", "authors"), ("routing", "title")]
+
+
+def test_terms_do_not_match_across_field_or_author_boundaries():
+    wl = Watchlist(rules=[{"action": "include", "fields": ["title", "abstract", "authors"],
+                           "terms": ["routing bgp", "jane doe"]}])
+    # 标题末尾 + 摘要开头拼起来、两个作者拼起来都不算命中
+    assert wl.match(_paper(title="Secure routing", summary="BGP hijacks", authors=["Mary Jane", "Doe Smith"])) is None
+
+
+def test_field_restriction_and_word_boundaries():
+    wl = Watchlist(rules=[{"action": "include", "fields": ["title"], "terms": ["RPKI"]}])
+    assert wl.match(_paper(title="Measuring RPKI", summary="")).action == INCLUDE
+    assert wl.match(_paper(title="Routing", summary="RPKI deployment")) is None
+    assert wl.match(_paper(title="RPKIX is not RPKI-free", summary="")).action == INCLUDE
+    assert wl.match(_paper(title="RPKIX tooling", summary="")) is None
+
+
+def test_exclude_wins_over_include_and_boosts_count_once_per_rule():
+    wl = Watchlist(rules=[
+        {"action": "include", "terms": ["route leak"]},
+        {"action": "exclude", "terms": ["vlsi"]},
+        {"action": "boost", "terms": ["rpki", "aspa"], "boost": 0.5},
+    ])
+    d = wl.match(_paper(title="Route leak detection with RPKI and ASPA", summary="A VLSI take."))
+    assert d.action == EXCLUDE
+    assert d.boost == 0.5